@@ -0,0 +1,150 @@
+"""
+Measure CLI startup: import time and time to the first API request.
+
+Launches fresh `main.py` processes, the way cron jobs and serverless
+runtimes do, and reports the median wall time of `--help`, of a dry run and
+until the first chat request reaches a local fake OpenAI server, with and
+without a cached connection check. The import time of the heaviest
+dependencies is read from `python -X importtime`.
+
+Usage:
+    python -m benchmarks.bench_startup [--repeat 5] [--json results.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+from src.schemas.loader import SchemaLoader
+from src.testing.fake_openai import FakeOpenAIServer, schema_responder
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMA = os.path.join(ROOT, "schemas", "default_schema.yaml")
+CONFIG = os.path.join(ROOT, "src", "generators", "config", "generator_config.yaml")
+MODULES = [
+    "main",
+    "yaml",
+    "pydantic",
+    "numpy",
+    "openai",
+    "src.factories.persona_factory",
+]
+
+
+def import_times() -> Dict[str, float]:
+    """
+    Measure the cumulative import time of the heaviest modules.
+
+    Every module is imported in a fresh interpreter, so shared dependencies
+    are counted for each of them.
+
+    Returns:
+        Dict[str, float]: Import time in milliseconds by module
+    """
+    times = {}
+    for module in MODULES:
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        # Lines read "import time: self [us] | cumulative | module"
+        for line in result.stderr.splitlines():
+            parts = line.split("|")
+            if len(parts) == 3 and parts[2].strip() == module:
+                times[module] = int(parts[1]) / 1000
+    return times
+
+
+def median_seconds(run: Callable[[], float], repeat: int) -> float:
+    """Run a measurement `repeat` times and return the median."""
+    return statistics.median(run() for _ in range(repeat))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", metavar="PATH", help="Also write results as JSON")
+    args = parser.parse_args()
+
+    first_request: List[float] = []
+    schema = SchemaLoader(os.path.dirname(SCHEMA)).load_schema("default_schema")
+    respond = schema_responder(schema)
+
+    def responder(body: Dict[str, Any]) -> str:
+        first_request.append(time.monotonic())
+        return respond(body)
+
+    with tempfile.TemporaryDirectory() as work_dir, FakeOpenAIServer(
+        responder
+    ) as server:
+        with open(os.path.join(work_dir, ".env"), "w") as f:
+            f.write("OPENAI_API_KEY=benchmark\n")
+        env = dict(
+            os.environ,
+            PYTHONPATH=ROOT,
+            OPENAI_API_KEY="benchmark",
+            OPENAI_BASE_URL=server.base_url,
+        )
+        command = [sys.executable, os.path.join(ROOT, "main.py")]
+        run_args = ["-s", SCHEMA, "-c", CONFIG, "-o", "export", "-f", "jsonl"]
+
+        def launch(*extra: str) -> float:
+            started = time.monotonic()
+            subprocess.run(
+                command + list(extra),
+                cwd=work_dir,
+                env=env,
+                stdout=subprocess.DEVNULL,
+                check=True,
+            )
+            return time.monotonic() - started
+
+        def first_request_after(*extra: str) -> float:
+            del first_request[:]
+            started = time.monotonic()
+            launch(*run_args, "-n", "1", "--no-journal", *extra)
+            return first_request[0] - started
+
+        cache_path = os.path.join(work_dir, "connection.json")
+        results = {
+            "help_s": median_seconds(lambda: launch("--help"), args.repeat),
+            "dry_run_s": median_seconds(
+                lambda: launch(*run_args, "--dry-run"), args.repeat
+            ),
+            "first_request_s": median_seconds(first_request_after, args.repeat),
+        }
+        first_request_after("--connection-cache", cache_path)
+        results["first_request_cached_check_s"] = median_seconds(
+            lambda: first_request_after("--connection-cache", cache_path),
+            args.repeat,
+        )
+    results["import_ms"] = import_times()
+
+    print()
+    for name in (
+        "help_s",
+        "dry_run_s",
+        "first_request_s",
+        "first_request_cached_check_s",
+    ):
+        print(f"{name:<32} {results[name] * 1000:>8.0f} ms")
+    print()
+    for module, ms in results["import_ms"].items():
+        print(f"import {module:<32} {ms:>8.0f} ms")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=4)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+Measure end-to-end generation throughput against a local fake API.
+
+Runs `PersonaFactory.generate_and_export` for every combination of persona
+count and schema, with a `FakeOpenAIServer` standing in for OpenAI, and
+reports personas/sec, p50/p99 request latency, peak Python memory, parse
+errors and, with --stream, the time to the first valid field.
+
+Usage:
+    python -m benchmarks.bench_throughput [-n 50 200] [-s schemas/default_schema.yaml]
+        [--concurrency 8] [--latency-ms 200 1500] [--error-rate 0.01]
+        [--throttle-rate 0.02] [--malformed-rate 0.01] [--workers 4]
+        [--stream --chunk-delay-ms 5]
+        [--json results.json]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional
+
+from src.factories.persona_factory import PersonaFactory
+from src.factories.work_queue import WorkQueue
+from src.monitoring.metrics import METRICS
+from src.testing.fake_openai import (
+    FakeOpenAIServer,
+    lognormal_latency,
+    schema_responder,
+)
+
+DEFAULT_SCHEMAS = [
+    "schemas/default_schema.yaml",
+    "tests/fixtures/schemas/test_schema.yaml",
+]
+
+
+def run_case(
+    num_personas: int,
+    schema_path: str,
+    config_path: str = "src/generators/config/generator_config.yaml",
+    concurrency: int = 8,
+    batch_size: int = 1,
+    output_format: str = "jsonl",
+    server_options: Optional[Dict[str, Any]] = None,
+    processes: Optional[int] = None,
+    dedup_threshold: Optional[float] = None,
+    workers: int = 1,
+    stream: bool = False,
+) -> Dict[str, Any]:
+    """
+    Generate and export personas once and measure the run.
+
+    Args:
+        num_personas: Number of personas to generate
+        schema_path: Path to the schema file
+        config_path: Path to the generator config file
+        concurrency: Maximum number of requests in flight at once
+        batch_size: Number of personas requested per chat completion
+        output_format: Export format (json, yaml or jsonl)
+        server_options: Keyword arguments of the `FakeOpenAIServer`
+        processes: Number of post-processing worker processes (optional)
+        dedup_threshold: Near-duplicate threshold (optional)
+        workers: Number of workers splitting the job through a work queue;
+            each runs in a thread with its own factory, like separate nodes
+        stream: Stream single-persona completions
+
+    Returns:
+        Dict[str, Any]: The case parameters and its measurements
+    """
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    METRICS.reset()
+    with tempfile.TemporaryDirectory() as output_dir:
+        tracemalloc.start()
+        start = time.perf_counter()
+        factories = [
+            PersonaFactory(
+                schema_path=schema_path,
+                config_path=config_path,
+                output_format=output_format,
+                output_dir=output_dir,
+                processes=processes,
+                dedup_threshold=dedup_threshold,
+                stream=stream,
+            )
+            for _ in range(workers)
+        ]
+        server = FakeOpenAIServer(
+            schema_responder(factories[0].generator.schema), **(server_options or {})
+        )
+        with server:
+            for factory in factories:
+                factory.generator.client = factory.generator.client.with_options(
+                    base_url=server.base_url
+                )
+            if workers == 1:
+                with factories[0]:
+                    factories[0].generate_and_export(
+                        num_personas, concurrency=concurrency, batch_size=batch_size
+                    )
+            else:
+                queue_path = os.path.join(output_dir, "queue.db")
+                with WorkQueue(queue_path) as queue:
+                    queue.submit(num_personas, batch_size)
+
+                def work(index: int) -> None:
+                    with factories[index], WorkQueue(queue_path) as queue:
+                        factories[index].run_worker(
+                            queue, concurrency=concurrency, worker=f"bench-{index}"
+                        )
+
+                threads = [
+                    threading.Thread(target=work, args=(index,))
+                    for index in range(workers)
+                ]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    api = METRICS.histogram("stage_seconds", stage="api")
+    first_field = METRICS.histogram("time_to_first_field_seconds")
+    personas = METRICS.counter("personas_total")
+    return {
+        "schema": schema_path,
+        "requested": num_personas,
+        "personas": int(personas),
+        "seconds": elapsed,
+        "personas_per_sec": personas / elapsed if elapsed else 0.0,
+        "p50_ms": api.quantile(0.5) * 1000 if api else 0.0,
+        "p99_ms": api.quantile(0.99) * 1000 if api else 0.0,
+        "peak_mb": peak / 2**20,
+        "retries": int(METRICS.total("retries_total")),
+        "parse_errors": int(METRICS.total("parse_errors_total")),
+        "first_field_p50_ms": (
+            first_field.quantile(0.5) * 1000 if first_field else None
+        ),
+        "faults": dict(server.faults),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-n", "--num-personas", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("-s", "--schema", nargs="+", default=DEFAULT_SCHEMAS)
+    parser.add_argument(
+        "-c", "--config", default="src/generators/config/generator_config.yaml"
+    )
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--processes", type=int)
+    parser.add_argument("--dedup-threshold", type=float)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument(
+        "--chunk-delay-ms",
+        type=float,
+        default=0.0,
+        help="Delay between streamed chunks of the fake API (default: none)",
+    )
+    parser.add_argument("--format", choices=["json", "yaml", "jsonl"], default="jsonl")
+    parser.add_argument(
+        "--latency-ms",
+        type=float,
+        nargs=2,
+        metavar=("MEDIAN", "P99"),
+        help="Log-normal latency of the fake API (default: none)",
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--completion-tokens", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", metavar="PATH", help="Also write results as JSON")
+    args = parser.parse_args()
+
+    server_options = {
+        "error_rate": args.error_rate,
+        "throttle_rate": args.throttle_rate,
+        "malformed_rate": args.malformed_rate,
+        "completion_tokens": args.completion_tokens,
+        "chunk_delay": args.chunk_delay_ms / 1000,
+        "seed": args.seed,
+    }
+    if args.latency_ms:
+        median, p99 = (value / 1000 for value in args.latency_ms)
+        server_options["latency"] = lognormal_latency(median, p99)
+
+    results: List[Dict[str, Any]] = []
+    for schema_path in args.schema:
+        for num_personas in args.num_personas:
+            results.append(
+                run_case(
+                    num_personas,
+                    schema_path,
+                    config_path=args.config,
+                    concurrency=args.concurrency,
+                    batch_size=args.batch_size,
+                    output_format=args.format,
+                    server_options=server_options,
+                    processes=args.processes,
+                    dedup_threshold=args.dedup_threshold,
+                    workers=args.workers,
+                    stream=args.stream,
+                )
+            )
+
+    print()
+    print(
+        f"{'schema':<40} {'n':>6} {'ok':>6} {'personas/s':>11} "
+        f"{'p50 ms':>8} {'p99 ms':>8} {'peak MB':>8} {'retries':>8} "
+        f"{'parse err':>9}"
+    )
+    for result in results:
+        print(
+            f"{result['schema']:<40} {result['requested']:>6} "
+            f"{result['personas']:>6} {result['personas_per_sec']:>11.1f} "
+            f"{result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f} "
+            f"{result['peak_mb']:>8.1f} {result['retries']:>8} "
+            f"{result['parse_errors']:>9}"
+        )
+    if args.stream:
+        print()
+        for result in results:
+            print(
+                f"{result['schema']:<40} {result['requested']:>6} "
+                f"first valid field p50 {result['first_field_p50_ms'] or 0:.1f} ms"
+            )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=4)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
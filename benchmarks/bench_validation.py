@@ -0,0 +1,93 @@
+"""
+Measure persona validation cost per persona.
+
+Compares the compiled `PersonaValidator` with the field-by-field `if/elif`
+walk it replaced (kept below as `legacy_validate` for reference).
+
+Usage:
+    python -m benchmarks.bench_validation [-n 20000] [-s schemas/default_schema.yaml]
+"""
+
+import argparse
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from src.schemas.loader import SchemaLoader
+from src.schemas.persona_validator import PersonaValidator
+from src.testing.fake_openai import fake_persona
+
+
+def legacy_validate(schema: Any, persona: Dict[str, Any]) -> bool:
+    """The pre-compilation validation loop (first error only, no logging)."""
+    for field_name, field_def in schema.fields.items():
+        if field_def.required and field_name not in persona:
+            return False
+        if field_name in persona:
+            field_value = persona[field_name]
+            if field_def.type == "string" and not isinstance(field_value, str):
+                return False
+            elif field_def.type == "number" and not isinstance(
+                field_value, (int, float)
+            ):
+                return False
+            elif field_def.type == "boolean" and not isinstance(field_value, bool):
+                return False
+            elif field_def.type == "array" and not isinstance(field_value, list):
+                return False
+            elif field_def.type == "object" and not isinstance(field_value, dict):
+                return False
+            if field_def.type == "string" and isinstance(field_value, str):
+                if field_def.min_length and len(field_value) < field_def.min_length:
+                    return False
+                if field_def.max_length and len(field_value) > field_def.max_length:
+                    return False
+            if field_def.options and field_value not in field_def.options:
+                return False
+    return True
+
+
+def best_of(fn: Callable[[], Any], repeat: int = 5) -> float:
+    """Return the fastest of `repeat` timed runs, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-n", "--num-personas", type=int, default=20000)
+    parser.add_argument("-s", "--schema", default="schemas/default_schema.yaml")
+    args = parser.parse_args()
+
+    schema_path = Path(args.schema)
+    schema = SchemaLoader(str(schema_path.parent)).load_schema(schema_path.stem)
+    personas: List[Dict[str, Any]] = [
+        fake_persona(schema, i) for i in range(args.num_personas)
+    ]
+
+    start = time.perf_counter()
+    validator = PersonaValidator(schema)
+    compile_time = time.perf_counter() - start
+
+    cases = {
+        "legacy if/elif walk": lambda: [legacy_validate(schema, p) for p in personas],
+        "compiled is_valid": lambda: [validator.is_valid(p) for p in personas],
+        "compiled errors": lambda: [validator.errors(p) for p in personas],
+        "compiled validate_many": lambda: validator.validate_many(personas),
+    }
+
+    print(
+        f"Schema {schema.name!r}, {len(schema.fields)} fields, {len(personas)} personas"
+    )
+    print(f"Compile time: {compile_time * 1e6:.0f} us")
+    for name, fn in cases.items():
+        per_persona = best_of(fn) / len(personas) * 1e6
+        print(f"{name:<24} {per_persona:6.2f} us/persona")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,51 @@
 import argparse
+import os
 from pathlib import Path
 
-from dotenv import load_dotenv
+# Everything else is imported where it is needed, so --help, argument errors
+# and short-lived workers don't pay for importing openai, pydantic and yaml
 
-from src.factories.persona_factory import PersonaFactory
+# Arguments that define a run, saved in its journal and restored on --resume
+RUN_ARGUMENTS = (
+    "num_personas",
+    "schema",
+    "config",
+    "format",
+    "compact",
+    "shard_records",
+    "shard_mb",
+    "compression",
+    "output_dir",
+    "batch_size",
+    "dedup_threshold",
+    "dedup_fields",
+    "dedup_retries",
+    "coverage",
+    "coverage_weights",
+    "coverage_seed",
+)
 
 
 def load_environment():
     """Load environment variables from .env file."""
+    from dotenv import load_dotenv
+
     env_path = Path(".env")
     if not env_path.exists():
         raise FileNotFoundError(".env file not found in the project root")
     load_dotenv(env_path)
 
 
+def load_weights(path):
+    """Load coverage weights from a YAML file, if one is given."""
+    if not path:
+        return None
+    import yaml
+
+    with open(path) as f:
+        return yaml.safe_load(f) or {}
+
+
 def parse_arguments():
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(description="Generate personas using OpenAI")
@@ -45,9 +77,42 @@ def parse_arguments():
         "-f",
         "--format",
         type=str,
-        choices=["json", "yaml"],
+        choices=["json", "yaml", "jsonl", "parquet"],
         default="json",
-        help="Output format (default: json)",
+        help=(
+            "Output format; jsonl and parquet stream personas to disk as they "
+            "are generated, parquet requires pyarrow (default: json)"
+        ),
+    )
+    parser.add_argument(
+        "--compact",
+        type=str,
+        choices=["json", "yaml"],
+        help="With --format jsonl, also compact the stream into a json or yaml file",
+    )
+    parser.add_argument(
+        "--shard-records",
+        type=int,
+        metavar="N",
+        help="With --format jsonl, split the output into shards of N personas",
+    )
+    parser.add_argument(
+        "--shard-mb",
+        type=float,
+        metavar="MB",
+        help=(
+            "With --format jsonl, split the output into shards of about MB "
+            "megabytes of uncompressed JSON"
+        ),
+    )
+    parser.add_argument(
+        "--compression",
+        type=str,
+        choices=["gzip", "zstd", "none"],
+        help=(
+            "With --format jsonl, compress the shards (zstd requires zstandard); "
+            "a manifest lists every shard (default: gzip when sharding)"
+        ),
     )
     parser.add_argument(
         "-o",
@@ -56,34 +121,355 @@ def parse_arguments():
         default="export",
         help="Directory where exported files will be saved (default: export)",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Maximum number of API requests in flight at once (default: 1)",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        help=(
+            "Parse and validate responses (and compute near-duplicate "
+            "signatures) in this many worker processes, so high-concurrency "
+            "runs can use every core (optional)"
+        ),
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        default=None,
+        help=(
+            "Stream single-persona responses, validate each field as it "
+            "arrives and cancel a response at its first invalid field "
+            "(default: the response.stream setting of the config)"
+        ),
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1,
+        help="Number of personas requested per API call (default: 1)",
+    )
+    parser.add_argument(
+        "--cache",
+        type=str,
+        metavar="PATH",
+        help="SQLite file caching API responses across runs (optional)",
+    )
+    parser.add_argument(
+        "--cache-mode",
+        type=str,
+        choices=["read-through", "record", "replay"],
+        default="read-through",
+        help=(
+            "read-through serves cached responses and stores misses, record "
+            "always calls the API, replay never does (default: read-through)"
+        ),
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=float,
+        help="Evict least recently used responses above this size (optional)",
+    )
+    parser.add_argument(
+        "--dedup-threshold",
+        type=float,
+        help=(
+            "Regenerate personas whose text fields are at least this similar "
+            "(0-1, e.g. 0.8) to an earlier persona of the run (optional)"
+        ),
+    )
+    parser.add_argument(
+        "--dedup-fields",
+        type=str,
+        nargs="+",
+        help="Fields compared for near-duplicates (default: all text fields)",
+    )
+    parser.add_argument(
+        "--dedup-retries",
+        type=int,
+        default=2,
+        help="Regenerations of a near-duplicate before it is dropped (default: 2)",
+    )
+    parser.add_argument(
+        "--coverage",
+        type=str,
+        choices=["stratified", "pairwise"],
+        help=(
+            "Plan schema options and characteristics across the personas up "
+            "front and pass each persona its share as context (optional)"
+        ),
+    )
+    parser.add_argument(
+        "--coverage-weights",
+        type=str,
+        metavar="PATH",
+        help="YAML file of relative value weights by dimension (optional)",
+    )
+    parser.add_argument(
+        "--coverage-seed",
+        type=int,
+        default=0,
+        help="Seed of the coverage plan (default: 0)",
+    )
+    parser.add_argument(
+        "--batch-job",
+        type=str,
+        metavar="JOB_DIR",
+        help=(
+            "Generate through the offline Batch API, keeping job state in "
+            "JOB_DIR; rerun with the same JOB_DIR to resume"
+        ),
+    )
+    parser.add_argument(
+        "--runs-dir",
+        type=str,
+        default="runs",
+        help=(
+            "Directory where run journals are kept, so interrupted runs can be "
+            "resumed (default: runs)"
+        ),
+    )
+    parser.add_argument(
+        "--resume",
+        type=str,
+        metavar="RUN_ID",
+        help=(
+            "Resume an interrupted run with its original settings, generating "
+            "only the personas it is missing"
+        ),
+    )
+    parser.add_argument(
+        "--no-journal",
+        action="store_true",
+        help="Don't journal the run (it cannot be resumed)",
+    )
+    parser.add_argument(
+        "--worker",
+        type=str,
+        metavar="QUEUE_DB",
+        help=(
+            "Generate as one of several workers sharing the SQLite work queue "
+            "QUEUE_DB: the first worker submits the job, later ones join it "
+            "with its settings, and the last one exports the personas"
+        ),
+    )
+    parser.add_argument(
+        "--lease-seconds",
+        type=float,
+        default=60.0,
+        help=(
+            "With --worker, seconds a claimed slot (or the export) stays "
+            "reserved without a heartbeat before other workers take it over "
+            "(default: 60)"
+        ),
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=30.0,
+        help="Seconds between Batch API status checks (default: 30)",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help=(
+            "Load the schema and config and print the run plan, without "
+            "calling the API or journaling the run"
+        ),
+    )
+    parser.add_argument(
+        "--connection-cache",
+        type=str,
+        metavar="PATH",
+        default=os.environ.get("PERSONA_CONNECTION_CACHE"),
+        help=(
+            "Remember successful API connection checks in PATH, so processes "
+            "started within --connection-ttl skip the check (default: "
+            "$PERSONA_CONNECTION_CACHE, if set)"
+        ),
+    )
+    parser.add_argument(
+        "--connection-ttl",
+        type=float,
+        default=3600.0,
+        help="Seconds a successful connection check is remembered (default: 3600)",
+    )
+    parser.add_argument(
+        "--registry-snapshot",
+        type=str,
+        metavar="PATH",
+        help=(
+            "Pickle validated schemas and configs to PATH so later runs skip "
+            "YAML parsing (default: $PERSONA_REGISTRY_SNAPSHOT, if set)"
+        ),
+    )
+    parser.add_argument(
+        "--metrics-out",
+        type=str,
+        metavar="PATH",
+        help=(
+            "Write per-stage timings and token metrics as JSON to PATH and as "
+            "a Prometheus snapshot next to it (optional)"
+        ),
+    )
+    args = parser.parse_args()
+    if args.num_personas < 1:
+        parser.error("--num-personas must be at least 1")
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+    if args.compact and args.format != "jsonl":
+        parser.error("--compact requires --format jsonl")
+    sharded = args.shard_records or args.shard_mb or args.compression
+    if sharded and args.format != "jsonl":
+        parser.error(
+            "--shard-records, --shard-mb and --compression require --format jsonl"
+        )
+    if sharded and args.batch_job:
+        parser.error("Sharded output is not supported with --batch-job")
+    if args.batch_job and (args.coverage or args.dedup_threshold is not None):
+        parser.error(
+            "--coverage and --dedup-threshold are not supported with --batch-job"
+        )
+    if args.resume and (args.batch_job or args.no_journal):
+        parser.error("--resume cannot be combined with --batch-job or --no-journal")
+    if args.worker and (args.batch_job or args.resume):
+        parser.error("--worker cannot be combined with --batch-job or --resume")
+    return args
 
 
 def main():
     """Main application workflow."""
+    args = None
     try:
         # Parse command line arguments
         args = parse_arguments()
 
-        # Step 1: Load environment variables
-        print("Loading environment variables...")
-        load_environment()
+        from src.factories.persona_factory import PersonaFactory
+        from src.factories.run_journal import RunJournal
+        from src.factories.work_queue import WorkQueue
+        from src.schemas.registry import REGISTRY
+
+        # Join a shared job as a worker (the queue keeps its progress), or
+        # resume a journaled run with its original settings, or start one
+        run_params = {name: getattr(args, name) for name in RUN_ARGUMENTS}
+        journal = None
+        queue = None
+        if args.dry_run:
+            if args.resume:
+                vars(args).update(RunJournal.resume(args.runs_dir, args.resume).params)
+        elif args.worker:
+            queue = WorkQueue(args.worker, lease_seconds=args.lease_seconds)
+            params = queue.params
+            if params is None:
+                params = queue.submit(args.num_personas, args.batch_size, run_params)
+            vars(args).update(params)
+            print(
+                f"📋 Worker {WorkQueue.worker_id()} joined queue {args.worker}: "
+                f"{queue.summary()}"
+            )
+        elif args.resume:
+            journal = RunJournal.resume(args.runs_dir, args.resume)
+            if journal.status == "completed":
+                raise ValueError(
+                    f"Run {journal.run_id} already completed; its personas are "
+                    f"in {journal.state.get('export_path')}"
+                )
+            vars(args).update(journal.params)
+        elif not args.batch_job and not args.no_journal:
+            journal = RunJournal.create(args.runs_dir, run_params)
+        if journal is not None:
+            print(
+                f"📝 Run {journal.run_id} is journaled; resume it with "
+                f"--resume {journal.run_id}"
+            )
+
+        # Step 1: Load environment variables (a dry run calls no API)
+        if not args.dry_run:
+            print("Loading environment variables...")
+            load_environment()
 
         # Step 2: Initialize factory and verify connection
         print("Initializing persona factory...")
+        if args.registry_snapshot:
+            REGISTRY.configure_snapshot(args.registry_snapshot)
         factory = PersonaFactory(
             schema_path=args.schema,
             output_format=args.format,
             config_path=args.config,
             output_dir=args.output_dir,
+            cache_path=args.cache,
+            cache_mode=args.cache_mode,
+            cache_max_bytes=(
+                int(args.cache_max_mb * 1024 * 1024) if args.cache_max_mb else None
+            ),
+            dedup_threshold=args.dedup_threshold,
+            dedup_fields=args.dedup_fields,
+            dedup_retries=args.dedup_retries,
+            coverage=args.coverage,
+            coverage_weights=load_weights(args.coverage_weights),
+            coverage_seed=args.coverage_seed,
+            shard_records=args.shard_records,
+            shard_bytes=int(args.shard_mb * 1024 * 1024) if args.shard_mb else None,
+            compression=args.compression,
+            processes=args.processes,
+            stream=args.stream,
         )
-        if not factory.verify_connection():
-            raise ConnectionError("Failed to connect to OpenAI API")
-        print("✅ OpenAI connection verified!")
+        with factory:
+            if args.dry_run:
+                requests = -(-args.num_personas // args.batch_size)
+                pool = factory.generator.pool
+                backends = (
+                    ", ".join(f"{p.name} ({p.model})" for p in pool.providers)
+                    if pool
+                    else factory.generator.model
+                )
+                print(
+                    f"🔎 Dry run: {args.num_personas} persona(s) of schema "
+                    f"{factory.generator.schema.name} in {requests} request(s) "
+                    f"to {backends}, exported as {args.format} to {args.output_dir}"
+                )
+                return
+            if args.cache and args.cache_mode == "replay":
+                print("Replaying cached responses, skipping the connection check")
+            else:
+                if not factory.verify_connection(
+                    args.connection_cache, args.connection_ttl
+                ):
+                    raise ConnectionError("Failed to connect to OpenAI API")
+                print("✅ OpenAI connection verified!")
 
-        # Step 3: Generate and export personas
-        print(f"Generating {args.num_personas} persona(s)...")
-        factory.generate_and_export(args.num_personas)
+            # Step 3: Generate and export personas
+            print(f"Generating {args.num_personas} persona(s)...")
+            if args.batch_job:
+                factory.run_batch_job(
+                    args.num_personas,
+                    args.batch_job,
+                    batch_size=args.batch_size,
+                    poll_interval=args.poll_interval,
+                )
+            elif queue is not None:
+                with queue:
+                    output_path = factory.run_worker(
+                        queue,
+                        concurrency=args.concurrency,
+                        compact_format=args.compact,
+                    )
+                    if output_path is None:
+                        print(
+                            "📋 Another worker exported the personas to "
+                            f"{queue.exported}"
+                        )
+            else:
+                factory.generate_and_export(
+                    args.num_personas,
+                    concurrency=args.concurrency,
+                    batch_size=args.batch_size,
+                    compact_format=args.compact,
+                    journal=journal,
+                )
 
         print("\nApplication workflow completed successfully!")
 
@@ -91,6 +477,13 @@ def main():
         print(f"\n❌ Error: {str(e)}")
         return
 
+    finally:
+        if args is not None and args.metrics_out:
+            from src.monitoring.metrics import METRICS
+
+            json_path, prom_path = METRICS.dump(args.metrics_out)
+            print(f"📈 Metrics written to {json_path} and {prom_path}")
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,310 @@
+import json
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from src.models.schema import FieldDefinition, Schema
+from src.monitoring.metrics import METRICS
+
+# Range of an int64 column
+_MIN_INT64 = -(2**63)
+_MAX_INT64 = 2**63 - 1
+
+
+def import_pyarrow() -> Any:
+    """
+    Import pyarrow on first use, so the other formats work without it.
+
+    Returns:
+        Any: The `pyarrow` module, with `pyarrow.parquet` loaded
+
+    Raises:
+        ImportError: If pyarrow is not installed
+    """
+    try:
+        import pyarrow
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as e:
+        raise ImportError(
+            "The parquet format requires pyarrow: pip install pyarrow"
+        ) from e
+    return pyarrow
+
+
+def _string(value: Any) -> Optional[str]:
+    return value if isinstance(value, str) else None
+
+
+def _number(value: Any) -> Optional[float]:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return None
+
+
+def _integer(value: Any) -> Optional[int]:
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value if _MIN_INT64 <= value <= _MAX_INT64 else None
+    return None
+
+
+def _boolean(value: Any) -> Optional[bool]:
+    return value if isinstance(value, bool) else None
+
+
+def _string_list(value: Any) -> Optional[List[str]]:
+    if not isinstance(value, list):
+        return None
+    return [item if isinstance(item, str) else json.dumps(item) for item in value]
+
+
+def _json_object(value: Any) -> Optional[str]:
+    return json.dumps(value) if isinstance(value, dict) else None
+
+
+def _arrow_field(pa: Any, name: str, field_def: FieldDefinition) -> Any:
+    """Derive the Arrow field of one schema field (see `arrow_schema`)."""
+    metadata = None
+    if field_def.options:
+        arrow_type = pa.dictionary(pa.int32(), pa.string())
+    elif field_def.type == "number":
+        arrow_type = pa.float64()
+    elif field_def.type == "integer":
+        arrow_type = pa.int64()
+    elif field_def.type == "boolean":
+        arrow_type = pa.bool_()
+    elif field_def.type == "array":
+        arrow_type = pa.list_(pa.string())
+    elif field_def.type == "object" and field_def.fields:
+        arrow_type = pa.struct(
+            [
+                _arrow_field(pa, child, child_def)
+                for child, child_def in field_def.fields.items()
+            ]
+        )
+    elif field_def.type == "object":
+        arrow_type = pa.string()
+        metadata = {"encoding": "json"}
+    else:
+        arrow_type = pa.string()
+    return pa.field(name, arrow_type, metadata=metadata)
+
+
+def arrow_schema(schema: Schema) -> Any:
+    """
+    Derive the Arrow schema of a persona schema.
+
+    `options` fields are dictionary-encoded strings, numbers are float64,
+    integers are int64, booleans are bool and arrays are lists of strings
+    (non-string items are JSON-encoded). Objects that declare their `fields`
+    are structs of those fields; free-form objects are JSON strings, tagged
+    with `encoding: json` metadata.
+
+    Args:
+        schema: The persona schema
+
+    Returns:
+        pyarrow.Schema: One nullable column per schema field
+    """
+    pa = import_pyarrow()
+    columns = [
+        _arrow_field(pa, name, field_def) for name, field_def in schema.fields.items()
+    ]
+    return pa.schema(columns, metadata={"persona_schema": schema.name})
+
+
+def _struct(fields: Dict[str, FieldDefinition]) -> Callable[[Any], Any]:
+    """Build the converter of an object with declared fields."""
+    converters = {name: _converter(field_def) for name, field_def in fields.items()}
+
+    def convert(value: Any) -> Optional[Dict[str, Any]]:
+        if not isinstance(value, dict):
+            return None
+        return {
+            name: to_column(value.get(name)) for name, to_column in converters.items()
+        }
+
+    return convert
+
+
+def _converter(field_def: FieldDefinition) -> Callable[[Any], Any]:
+    """Pick the function turning a persona value into its column value."""
+    if field_def.options:
+        return _string
+    if field_def.type == "number":
+        return _number
+    if field_def.type == "integer":
+        return _integer
+    if field_def.type == "boolean":
+        return _boolean
+    if field_def.type == "array":
+        return _string_list
+    if field_def.type == "object" and field_def.fields:
+        return _struct(field_def.fields)
+    if field_def.type == "object":
+        return _json_object
+    return _string
+
+
+class ParquetStreamWriter:
+    """
+    Appends personas to a Parquet file as they are produced.
+
+    Personas are buffered column by column and written as a row group every
+    `row_group_size` personas, so memory stays bounded however long the run.
+    `options` columns are dictionary-encoded. Like `PersonaStreamWriter`, the
+    file is written next to its target as `.part` and atomically renamed on
+    `close`; an aborted stream is closed as a valid file holding the row
+    groups written so far.
+
+    Values that don't match their column type, and fields the schema doesn't
+    declare, are written as null or dropped; the validator rejects such
+    personas before they are exported.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        schema: Schema,
+        row_group_size: int = 10000,
+        compression: str = "zstd",
+    ):
+        """
+        Open the stream.
+
+        Args:
+            path: Final path of the Parquet file
+            schema: Schema of the personas
+            row_group_size: Number of personas per row group
+            compression: Parquet compression codec
+        """
+        self._pa = import_pyarrow()
+        self.path = Path(path)
+        self.part_path = self.path.with_name(self.path.name + ".part")
+        self.schema = arrow_schema(schema)
+        self.row_group_size = max(1, row_group_size)
+        self.count = 0
+        self.dropped = 0
+        self._converters = {
+            name: _converter(field_def) for name, field_def in schema.fields.items()
+        }
+        self._buffer: Dict[str, List[Any]] = {name: [] for name in self._converters}
+        self._writer = self._pa.parquet.ParquetWriter(
+            self.part_path,
+            self.schema,
+            compression=compression,
+            use_dictionary=[
+                name for name, field_def in schema.fields.items() if field_def.options
+            ],
+        )
+        self._closed = False
+
+    def write(self, persona: Dict[str, Any]) -> None:
+        """
+        Append one persona.
+
+        Args:
+            persona: The persona data
+        """
+        for name, convert in self._converters.items():
+            raw = persona.get(name)
+            value = convert(raw)
+            if value is None and raw is not None:
+                self.dropped += 1
+            self._buffer[name].append(value)
+        self.count += 1
+        if len(self._buffer[self.schema.names[0]]) >= self.row_group_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered personas as one row group."""
+        if not self._buffer or not self._buffer[self.schema.names[0]]:
+            return
+        with METRICS.span("export"):
+            table = self._pa.Table.from_pydict(self._buffer, schema=self.schema)
+            self._writer.write_table(table)
+        for values in self._buffer.values():
+            values.clear()
+
+    def close(self) -> Path:
+        """
+        Finalize the file and atomically move it to its final path.
+
+        Returns:
+            Path: Path to the finalized Parquet file
+        """
+        if not self._closed:
+            self._finish()
+            os.replace(self.part_path, self.path)
+        return self.path
+
+    def abort(self) -> None:
+        """Close what was written as a valid file left in the `.part` file."""
+        if not self._closed:
+            self._finish()
+
+    def _finish(self) -> None:
+        """Write the last row group and the file footer."""
+        self.flush()
+        self._writer.close()
+        self._closed = True
+        if self.dropped:
+            print(
+                f"⚠️  {self.dropped} value(s) did not match their column type "
+                "and were written as null"
+            )
+
+    def __enter__(self) -> "ParquetStreamWriter":
+        return self
+
+    def __exit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def iter_parquet(
+    path: Path, columns: Optional[List[str]] = None, batch_size: int = 10000
+) -> Iterator[Dict[str, Any]]:
+    """
+    Read personas back from a Parquet file, one row group slice at a time.
+
+    Only the requested columns are read from disk. Nulls are left out of the
+    personas (and of their structs) and JSON-encoded objects are decoded.
+
+    Args:
+        path: Path to the Parquet file
+        columns: Names of the columns to read (default: all)
+        batch_size: Maximum number of personas decoded at once
+
+    Yields:
+        Dict[str, Any]: One persona per row
+    """
+    pa = import_pyarrow()
+    parquet_file = pa.parquet.ParquetFile(path)
+    decoders = {field.name: _decoder(pa, field) for field in parquet_file.schema_arrow}
+    for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+        for row in batch.to_pylist():
+            yield {
+                name: decoders[name](value) if decoders[name] else value
+                for name, value in row.items()
+                if value is not None
+            }
+
+
+def _decoder(pa: Any, field: Any) -> Optional[Callable[[Any], Any]]:
+    """Build the function restoring a column value, if it needs one."""
+    if field.metadata and field.metadata.get(b"encoding") == b"json":
+        return json.loads
+    if not pa.types.is_struct(field.type):
+        return None
+    children = {child.name: _decoder(pa, child) for child in field.type}
+
+    def decode(value: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            name: children[name](item) if children[name] else item
+            for name, item in value.items()
+            if item is not None
+        }
+
+    return decode
@@ -1,9 +1,152 @@
+import itertools
 import json
+import os
+import textwrap
+import time
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 
 import yaml
 
+from src.exporters.parquet_writer import ParquetStreamWriter, iter_parquet
+from src.exporters.sharded_writer import (
+    MANIFEST_SUFFIX,
+    ShardedStreamWriter,
+    iter_shards,
+)
+from src.models.schema import Schema
+from src.monitoring.metrics import METRICS
+
+
+class PersonaStreamWriter:
+    """
+    Appends personas to a JSONL file as they are produced.
+
+    Records are written to a `.part` file next to the target. The buffer is
+    flushed to the OS every `flush_every` records and the file is fsynced
+    every `fsync_every` records or `fsync_interval` seconds, whichever comes
+    first, so a crash loses at most the records since the last flush. On
+    `close` the file is fsynced and atomically renamed to its final name.
+
+    A `.part` file left behind by a crashed run is never truncated: it is
+    moved aside to `<name>.part.1` (`.part.2`, ...) before the new stream
+    starts. Its lines are complete personas and `PersonaExporter.iter_jsonl`
+    skips a truncated last line, so it can be read back or compacted as is.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        flush_every: int = 16,
+        fsync_every: int = 1000,
+        fsync_interval: float = 10.0,
+    ):
+        """
+        Open the stream.
+
+        Args:
+            path: Final path of the JSONL file
+            flush_every: Number of records between buffer flushes
+            fsync_every: Number of records between fsyncs
+            fsync_interval: Maximum seconds between fsyncs
+        """
+        self.path = Path(path)
+        self.part_path = self.path.with_name(self.path.name + ".part")
+        self.flush_every = max(1, flush_every)
+        self.fsync_every = max(1, fsync_every)
+        self.fsync_interval = fsync_interval
+        self.count = 0
+        self.recovered_path = self._rotate_leftover()
+        self._file = open(self.part_path, "x", buffering=1 << 16)
+        self._last_fsync = time.monotonic()
+        self._unsynced = 0
+
+    def _rotate_leftover(self) -> Optional[Path]:
+        """
+        Move the `.part` file of an interrupted run out of the way.
+
+        Returns:
+            Optional[Path]: Where the leftover records were moved, if any
+        """
+        if not self.part_path.exists():
+            return None
+        for index in itertools.count(1):
+            target = self.part_path.with_name(f"{self.part_path.name}.{index}")
+            if not target.exists():
+                break
+        os.replace(self.part_path, target)
+        print(f"⚠️  Kept records of an interrupted run in {target}")
+        return target
+
+    def write(self, persona: Dict[str, Any]) -> None:
+        """
+        Append one persona.
+
+        Args:
+            persona: The persona data
+        """
+        with METRICS.span("export"):
+            self._file.write(json.dumps(persona) + "\n")
+        self.count += 1
+        self._unsynced += 1
+        if self.count % self.flush_every == 0:
+            self._file.flush()
+        if (
+            self._unsynced >= self.fsync_every
+            or time.monotonic() - self._last_fsync >= self.fsync_interval
+        ):
+            self.sync()
+
+    def sync(self) -> None:
+        """Flush the buffer and fsync the file to disk."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._last_fsync = time.monotonic()
+        self._unsynced = 0
+
+    def close(self) -> Path:
+        """
+        Finalize the stream and atomically move it to its final path.
+
+        Returns:
+            Path: Path to the finalized JSONL file
+        """
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
+            os.replace(self.part_path, self.path)
+            _fsync_dir(self.path.parent)
+        return self.path
+
+    def abort(self) -> None:
+        """Flush what was written and leave it in the `.part` file."""
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
+
+    def __enter__(self) -> "PersonaStreamWriter":
+        return self
+
+    def __exit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def _fsync_dir(directory: Path) -> None:
+    """Persist a rename by fsyncing its directory (no-op where unsupported)."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
 
 class PersonaExporter:
     """Handles exporting persona data to different file formats."""
@@ -69,11 +212,10 @@ class PersonaExporter:
         print(f"Exporting {len(personas)} personas to {output_path}...")
 
         try:
-            if output_format == "json":
-                with open(output_path, "w") as f:
+            with METRICS.span("export"), open(output_path, "w") as f:
+                if output_format == "json":
                     json.dump({"personas": personas}, f, indent=4)
-            else:
-                with open(output_path, "w") as f:
+                else:
                     yaml.safe_dump(
                         {"personas": personas},
                         f,
@@ -86,3 +228,254 @@ class PersonaExporter:
         except Exception as e:
             print(f"❌ Failed to export personas: {str(e)}")
             raise
+
+    def open_stream(
+        self,
+        filename: Optional[str] = None,
+        flush_every: int = 16,
+        fsync_every: int = 1000,
+        fsync_interval: float = 10.0,
+    ) -> PersonaStreamWriter:
+        """
+        Open a JSONL stream that personas can be appended to one at a time.
+
+        Args:
+            filename: Custom filename for the output file (optional)
+            flush_every: Number of records between buffer flushes
+            fsync_every: Number of records between fsyncs
+            fsync_interval: Maximum seconds between fsyncs
+
+        Returns:
+            PersonaStreamWriter: The open stream; close it to finalize the file
+        """
+        if filename is None:
+            filename = "personas.jsonl"
+        elif not filename.endswith(".jsonl"):
+            filename = f"{filename}.jsonl"
+
+        output_path = self.output_dir / filename
+        print(f"Streaming personas to {output_path}...")
+        return PersonaStreamWriter(
+            output_path,
+            flush_every=flush_every,
+            fsync_every=fsync_every,
+            fsync_interval=fsync_interval,
+        )
+
+    def export_jsonl(
+        self, personas: Iterable[Dict[str, Any]], filename: str = None
+    ) -> Path:
+        """
+        Stream personas from any iterable into a JSONL file.
+
+        Args:
+            personas: Personas to export, consumed one at a time
+            filename: Custom filename for the output file (optional)
+
+        Returns:
+            Path: Path to the exported file
+        """
+        with self.open_stream(filename) as stream:
+            for persona in personas:
+                stream.write(persona)
+        print(f"✅ {stream.count} personas exported successfully to {stream.path}!")
+        return stream.path
+
+    def open_shards(
+        self,
+        filename: Optional[str] = None,
+        compression: str = "gzip",
+        max_records: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        schema: Optional[Schema] = None,
+    ) -> ShardedStreamWriter:
+        """
+        Open a sharded, compressed JSONL stream with a manifest.
+
+        Args:
+            filename: Prefix of the shard and manifest names (optional)
+            compression: One of "gzip", "zstd" (requires zstandard) or "none"
+            max_records: Maximum number of personas per shard (optional)
+            max_bytes: Target uncompressed bytes per shard (optional)
+            schema: Schema of the personas, recorded in the manifest
+
+        Returns:
+            ShardedStreamWriter: The open stream; close it to write the manifest
+        """
+        prefix = filename or "personas"
+        print(f"Streaming personas to {self.output_dir / prefix}-*...")
+        return ShardedStreamWriter(
+            self.output_dir,
+            prefix,
+            compression=compression,
+            max_records=max_records,
+            max_bytes=max_bytes,
+            schema=schema,
+        )
+
+    def open_parquet(
+        self,
+        schema: Schema,
+        filename: Optional[str] = None,
+        row_group_size: int = 10000,
+    ) -> ParquetStreamWriter:
+        """
+        Open a Parquet file that personas can be appended to one at a time.
+
+        Requires pyarrow.
+
+        Args:
+            schema: Schema of the personas, from which the columns are derived
+            filename: Custom filename for the output file (optional)
+            row_group_size: Number of personas per row group
+
+        Returns:
+            ParquetStreamWriter: The open stream; close it to finalize the file
+
+        Raises:
+            ImportError: If pyarrow is not installed
+        """
+        if filename is None:
+            filename = "personas.parquet"
+        elif not filename.endswith(".parquet"):
+            filename = f"{filename}.parquet"
+
+        output_path = self.output_dir / filename
+        print(f"Streaming personas to {output_path}...")
+        return ParquetStreamWriter(output_path, schema, row_group_size=row_group_size)
+
+    def export_parquet(
+        self,
+        personas: Iterable[Dict[str, Any]],
+        schema: Schema,
+        filename: str = None,
+    ) -> Path:
+        """
+        Export personas to a Parquet file, one row group at a time.
+
+        Args:
+            personas: Generated persona data, consumed lazily
+            schema: Schema of the personas
+            filename: Custom filename for the output file (optional)
+
+        Returns:
+            Path: Path to the exported file
+
+        Raises:
+            ImportError: If pyarrow is not installed
+        """
+        with self.open_parquet(schema, filename) as stream:
+            for persona in personas:
+                stream.write(persona)
+        print(f"✅ {stream.count} personas exported successfully to {stream.path}!")
+        return stream.path
+
+    @staticmethod
+    def iter_jsonl(path: Path) -> Iterator[Dict[str, Any]]:
+        """
+        Read personas back from a JSONL file one at a time.
+
+        A last line without a trailing newline is read if it parses; if it
+        doesn't, it was truncated by a crash mid-write and is skipped.
+
+        Args:
+            path: Path to the JSONL file
+
+        Yields:
+            Dict[str, Any]: One persona per line
+        """
+        with open(path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                if line.endswith("\n"):
+                    yield json.loads(line)
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    return
+                yield record
+
+    @staticmethod
+    def iter_export(path: Path) -> Iterator[Dict[str, Any]]:
+        """
+        Read personas back from any export.
+
+        JSONL exports are streamed one line at a time, sharded exports
+        (given their manifest) one shard at a time and Parquet exports one
+        row group slice at a time; json and yaml exports (a `personas` list)
+        are parsed in one go.
+
+        Args:
+            path: Path to a .jsonl, .manifest.json, .parquet, .json or .yaml
+                export
+
+        Returns:
+            Iterator[Dict[str, Any]]: One persona per exported record
+
+        Raises:
+            ValueError: If the file extension is not supported
+        """
+        path = Path(path)
+        if path.suffix == ".jsonl":
+            return PersonaExporter.iter_jsonl(path)
+        if path.name.endswith(MANIFEST_SUFFIX):
+            return iter_shards(path)
+        if path.suffix == ".parquet":
+            return iter_parquet(path)
+        if path.suffix not in (".json", ".yaml", ".yml"):
+            raise ValueError("Export must be a .jsonl, .parquet, .json or .yaml file")
+        with open(path, "r") as f:
+            document = json.load(f) if path.suffix == ".json" else yaml.safe_load(f)
+        return iter((document or {}).get("personas", []))
+
+    def compact(
+        self,
+        jsonl_path: Path,
+        output_format: str = "json",
+        filename: str = None,
+    ) -> Path:
+        """
+        Convert a JSONL stream (or sharded export) into a single json or yaml
+        document.
+
+        The result is identical to `export_multiple` with the same personas.
+        JSON is written incrementally; YAML needs the whole list in memory.
+
+        Args:
+            jsonl_path: Path to the JSONL file (or a shard manifest)
+            output_format: Output format (json or yaml)
+            filename: Custom filename for the output file (optional)
+
+        Returns:
+            Path: Path to the compacted file
+
+        Raises:
+            ValueError: If output_format is not supported
+        """
+        if output_format == "yaml":
+            personas = list(self.iter_export(jsonl_path))
+            return self.export_multiple(personas, output_format, filename)
+        if output_format != "json":
+            raise ValueError("Output format must be either 'json' or 'yaml'")
+
+        if filename is None:
+            filename = "personas.json"
+        elif not filename.endswith(".json"):
+            filename = f"{filename}.json"
+
+        output_path = self.output_dir / filename
+        print(f"Compacting {jsonl_path} to {output_path}...")
+        tmp_path = output_path.with_name(output_path.name + ".part")
+        count = 0
+        with METRICS.span("compact"), open(tmp_path, "w") as f:
+            f.write('{\n    "personas": [')
+            for persona in self.iter_export(jsonl_path):
+                f.write(",\n" if count else "\n")
+                f.write(textwrap.indent(json.dumps(persona, indent=4), " " * 8))
+                count += 1
+            f.write("\n    ]\n}" if count else "]\n}")
+        os.replace(tmp_path, output_path)
+        print(f"✅ {count} personas compacted successfully to {output_path}!")
+        return output_path
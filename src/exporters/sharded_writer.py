@@ -0,0 +1,384 @@
+import gzip
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Set
+
+from src.models.schema import Schema
+from src.monitoring.metrics import METRICS
+
+COMPRESSIONS = ("gzip", "zstd", "none")
+
+# Shard file suffix by compression
+_SUFFIXES = {"gzip": ".jsonl.gz", "zstd": ".jsonl.zst", "none": ".jsonl"}
+
+MANIFEST_SUFFIX = ".manifest.json"
+
+# Suffix of shards not yet committed by a complete manifest
+PART_SUFFIX = ".part"
+
+
+def _import_zstandard() -> Any:
+    """Import zstandard on first use, so gzip shards work without it."""
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError(
+            "zstd compression requires zstandard: pip install zstandard"
+        ) from e
+    return zstandard
+
+
+class _HashingFile:
+    """Binary file wrapper hashing and counting the bytes written through it."""
+
+    def __init__(self, file: BinaryIO):
+        self.file = file
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        self.sha256.update(data)
+        self.size += len(data)
+        return self.file.write(data)
+
+    def flush(self) -> None:
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+
+
+class ShardedStreamWriter:
+    """
+    Appends personas to compressed JSONL shards as they are produced.
+
+    A new shard is started once the current one holds `max_records` personas
+    or `max_bytes` bytes of uncompressed JSON. Each shard is compressed as
+    it is written and hashed on the fly. On `close` a manifest listing every
+    shard's record count, compressed size and SHA-256, with the schema
+    version, is written atomically next to the shards; it is the commit
+    point, so a reader never sees a half-written shard. Shards are written
+    under a `.part` name and only renamed when the manifest is, so a rerun
+    with the same prefix never overwrites the shards of the previous
+    export; shards the previous manifest listed and the new one doesn't
+    are removed. An aborted stream still writes a manifest, marked
+    incomplete, listing its `.part` shards.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        prefix: str = "personas",
+        compression: str = "gzip",
+        max_records: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        schema: Optional[Schema] = None,
+    ):
+        """
+        Open the stream.
+
+        Args:
+            directory: Directory receiving the shards and the manifest
+            prefix: Prefix of the shard and manifest names
+            compression: One of "gzip", "zstd" or "none"
+            max_records: Maximum number of personas per shard (optional)
+            max_bytes: Target uncompressed bytes per shard (optional)
+            schema: Schema of the personas, recorded in the manifest
+
+        Raises:
+            ValueError: If the compression is not supported
+            ImportError: If zstd is requested without zstandard installed
+        """
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Compression must be one of {', '.join(COMPRESSIONS)}")
+        if compression == "zstd":
+            self._zstd = _import_zstandard()
+        self.directory = Path(directory)
+        self.prefix = prefix
+        self.compression = compression
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self.schema = schema
+        self.path = self.directory / f"{prefix}{MANIFEST_SUFFIX}"
+        self.count = 0
+        self.shards: List[Dict[str, Any]] = []
+        self._raw: Optional[_HashingFile] = None
+        self._stream: Any = None
+        self._shard_records = 0
+        self._shard_bytes = 0
+        self._closed = False
+
+    def write(self, persona: Dict[str, Any]) -> None:
+        """
+        Append one persona, starting a new shard if the current one is full.
+
+        Args:
+            persona: The persona data
+        """
+        line = (json.dumps(persona) + "\n").encode("utf-8")
+        if self._stream is not None and (
+            (self.max_records and self._shard_records >= self.max_records)
+            or (self.max_bytes and self._shard_bytes + len(line) > self.max_bytes)
+        ):
+            self._close_shard()
+        if self._stream is None:
+            self._open_shard()
+        with METRICS.span("export"):
+            self._stream.write(line)
+        self._shard_records += 1
+        self._shard_bytes += len(line)
+        self.count += 1
+
+    def _open_shard(self) -> None:
+        """Start the next shard file."""
+        name = f"{self.prefix}-{len(self.shards):05d}{_SUFFIXES[self.compression]}"
+        name += PART_SUFFIX
+        self._raw = _HashingFile(open(self.directory / name, "wb"))
+        if self.compression == "gzip":
+            self._stream = gzip.GzipFile(filename="", mode="wb", fileobj=self._raw)
+        elif self.compression == "zstd":
+            self._stream = self._zstd.ZstdCompressor().stream_writer(
+                self._raw, closefd=False
+            )
+        else:
+            self._stream = self._raw
+        self.shards.append({"path": name})
+        self._shard_records = 0
+        self._shard_bytes = 0
+
+    def _close_shard(self) -> None:
+        """Finish the current shard and record it."""
+        if self._stream is not self._raw:
+            self._stream.close()
+        self._raw.close()
+        self.shards[-1].update(
+            records=self._shard_records,
+            bytes=self._raw.size,
+            sha256=self._raw.sha256.hexdigest(),
+        )
+        self._stream = self._raw = None
+
+    def close(self) -> Path:
+        """
+        Finish the last shard and write the manifest.
+
+        Returns:
+            Path: Path to the manifest
+        """
+        return self._finish(complete=True)
+
+    def abort(self) -> None:
+        """Finish the last shard and write a manifest marked incomplete."""
+        self._finish(complete=False)
+
+    def _finish(self, complete: bool) -> Path:
+        """Close the last shard and atomically write the manifest."""
+        if self._closed:
+            return self.path
+        if self._stream is not None:
+            self._close_shard()
+        previous = self._previous_shards() if complete else set()
+        if complete:
+            for shard in self.shards:
+                name = shard["path"][: -len(PART_SUFFIX)]
+                os.replace(self.directory / shard["path"], self.directory / name)
+                shard["path"] = name
+        manifest = {
+            "schema": (
+                {"name": self.schema.name, "version": self.schema.version}
+                if self.schema is not None
+                else None
+            ),
+            "compression": self.compression,
+            "records": self.count,
+            "complete": complete,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "shards": self.shards,
+        }
+        tmp_path = self.path.with_name(self.path.name + ".part")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=4)
+        os.replace(tmp_path, self.path)
+        for name in previous - {shard["path"] for shard in self.shards}:
+            (self.directory / name).unlink(missing_ok=True)
+        self._closed = True
+        return self.path
+
+    def _previous_shards(self) -> Set[str]:
+        """Names of the shards listed by an earlier manifest at the same path."""
+        try:
+            with open(self.path) as f:
+                return {shard["path"] for shard in json.load(f)["shards"]}
+        except (OSError, ValueError, KeyError, TypeError):
+            return set()
+
+    def __enter__(self) -> "ShardedStreamWriter":
+        return self
+
+    def __exit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def load_manifest(manifest_path: Path) -> Dict[str, Any]:
+    """
+    Read a shard manifest.
+
+    Args:
+        manifest_path: Path to the manifest
+
+    Returns:
+        Dict[str, Any]: The manifest, with shard paths made absolute
+    """
+    manifest_path = Path(manifest_path)
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    for shard in manifest["shards"]:
+        shard["path"] = str(manifest_path.parent / shard["path"])
+    return manifest
+
+
+def iter_shard(shard: Dict[str, Any], verify: bool = True) -> Iterator[Dict[str, Any]]:
+    """
+    Read the personas of one shard, decompressing it as a stream.
+
+    Args:
+        shard: The shard's manifest entry (see `load_manifest`)
+        verify: Check the shard's checksum and record count once read
+
+    Yields:
+        Dict[str, Any]: One persona per line
+
+    Raises:
+        ValueError: If the shard doesn't match its manifest entry
+    """
+    path = shard["path"]
+    name = path.removesuffix(PART_SUFFIX)
+    with open(path, "rb") as raw:
+        hashing = _HashingReader(raw)
+        if name.endswith(".gz"):
+            stream = gzip.GzipFile(fileobj=hashing, mode="rb")
+        elif name.endswith(".zst"):
+            stream = _import_zstandard().ZstdDecompressor().stream_reader(hashing)
+        else:
+            stream = hashing
+        count = 0
+        for line in _lines(stream):
+            count += 1
+            yield json.loads(line)
+    if verify:
+        if hashing.sha256.hexdigest() != shard["sha256"]:
+            raise ValueError(f"Checksum mismatch in shard {path}")
+        if count != shard["records"]:
+            raise ValueError(
+                f"Shard {path} holds {count} records, expected {shard['records']}"
+            )
+
+
+class _HashingReader:
+    """Binary file wrapper hashing the bytes read through it."""
+
+    def __init__(self, file: BinaryIO):
+        self.file = file
+        self.sha256 = hashlib.sha256()
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.file.read(size)
+        self.sha256.update(data)
+        return data
+
+    def readable(self) -> bool:
+        return True
+
+
+def _lines(stream: Any, chunk_size: int = 1 << 16) -> Iterator[bytes]:
+    """Split a binary stream into non-empty lines."""
+    pending = b""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        yield from (line for line in lines if line.strip())
+    if pending.strip():
+        yield pending
+
+
+def _shards(manifest_path: Path, allow_incomplete: bool) -> List[Dict[str, Any]]:
+    """Load the shards of a manifest, refusing an incomplete export."""
+    manifest = load_manifest(manifest_path)
+    if not manifest["complete"] and not allow_incomplete:
+        raise ValueError(
+            f"Export {manifest_path} is incomplete (its run was aborted); "
+            "pass allow_incomplete=True to read it anyway"
+        )
+    return manifest["shards"]
+
+
+def iter_shards(
+    manifest_path: Path, verify: bool = True, allow_incomplete: bool = False
+) -> Iterator[Dict[str, Any]]:
+    """
+    Read every persona of a sharded export, shard by shard.
+
+    Args:
+        manifest_path: Path to the manifest
+        verify: Check each shard's checksum and record count
+        allow_incomplete: Read the export of an aborted run too
+
+    Yields:
+        Dict[str, Any]: One persona per record
+
+    Raises:
+        ValueError: If the manifest is marked incomplete and
+            `allow_incomplete` is False, or a shard doesn't match it
+    """
+    for shard in _shards(manifest_path, allow_incomplete):
+        yield from iter_shard(shard, verify)
+
+
+def _map_shard(
+    func: Callable[[Iterator[Dict[str, Any]]], Any], shard: Dict[str, Any], verify: bool
+) -> Any:
+    """Apply a function to the personas of one shard (in a worker process)."""
+    return func(iter_shard(shard, verify))
+
+
+def map_shards(
+    manifest_path: Path,
+    func: Callable[[Iterator[Dict[str, Any]]], Any],
+    processes: Optional[int] = None,
+    verify: bool = True,
+    allow_incomplete: bool = False,
+) -> List[Any]:
+    """
+    Process the shards of an export in parallel, one shard per task.
+
+    Args:
+        manifest_path: Path to the manifest
+        func: Picklable (module-level) function receiving an iterator over
+            the personas of one shard
+        processes: Number of worker processes (default: one per core)
+        verify: Check each shard's checksum and record count
+        allow_incomplete: Process the export of an aborted run too
+
+    Returns:
+        List[Any]: The result of `func` for every shard, in shard order
+
+    Raises:
+        ValueError: If the manifest is marked incomplete and
+            `allow_incomplete` is False
+    """
+    shards = _shards(manifest_path, allow_incomplete)
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [executor.submit(_map_shard, func, shard, verify) for shard in shards]
+        return [future.result() for future in futures]
@@ -0,0 +1,294 @@
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from openai.types.chat import ChatCompletion
+
+from src.exporters.persona_exporter import PersonaExporter
+from src.generators.openai import OpenAIGenerator
+
+TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+class BatchJob:
+    """
+    Offline persona generation through the OpenAI Batch API.
+
+    A job goes through four persisted steps: `prepare` writes the chat
+    requests to a JSONL file, `submit` uploads it and creates the batch,
+    `poll` waits for the batch to finish and `ingest` downloads the results,
+    validates them and exports the personas. The state is saved to
+    `job.json` in the job directory after every step, so `run` can resume an
+    interrupted job where it stopped.
+    """
+
+    STATE_FILE = "job.json"
+    REQUESTS_FILE = "requests.jsonl"
+    RESULTS_FILE = "results.jsonl"
+
+    def __init__(
+        self,
+        generator: OpenAIGenerator,
+        exporter: PersonaExporter,
+        job_dir: str,
+    ):
+        """
+        Initialize the job, loading its state if the job directory exists.
+
+        Args:
+            generator: Generator used to build requests and validate results
+            exporter: Exporter used to write the ingested personas
+            job_dir: Directory holding the job state and files
+        """
+        self.generator = generator
+        self.exporter = exporter
+        self.job_dir = Path(job_dir)
+        self.job_dir.mkdir(parents=True, exist_ok=True)
+        self.state: Dict[str, Any] = self._load_state()
+
+    @property
+    def status(self) -> str:
+        """Current step of the job ('new' if nothing was done yet)."""
+        return self.state.get("status", "new")
+
+    def _load_state(self) -> Dict[str, Any]:
+        """Load the persisted job state, if any."""
+        path = self.job_dir / self.STATE_FILE
+        if not path.exists():
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def _save_state(self, **changes: Any) -> None:
+        """Update the job state and persist it atomically."""
+        self.state.update(changes)
+        path = self.job_dir / self.STATE_FILE
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.state, f, indent=4)
+        tmp_path.replace(path)
+
+    def prepare(self, num_personas: int, batch_size: int = 1) -> Path:
+        """
+        Write the chat requests of the run to a Batch API input file.
+
+        Args:
+            num_personas: Number of personas to generate
+            batch_size: Number of personas requested per chat completion
+
+        Returns:
+            Path: Path to the JSONL input file
+        """
+        if batch_size < 1:
+            raise ValueError("Batch size must be at least 1")
+
+        path = self.job_dir / self.REQUESTS_FILE
+        with open(path, "w") as f:
+            for start in range(0, num_personas, batch_size):
+                count = min(batch_size, num_personas - start)
+                messages = self.generator._build_messages(count=count)
+                request = {
+                    "custom_id": f"personas-{start:08d}-{count}",
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": self.generator._request_body(messages, count),
+                }
+                f.write(json.dumps(request) + "\n")
+
+        self._save_state(
+            status="prepared", num_personas=num_personas, batch_size=batch_size
+        )
+        print(f"✅ Wrote batch requests for {num_personas} personas to {path}")
+        return path
+
+    def submit(self) -> str:
+        """
+        Upload the input file and create the batch.
+
+        Each id is saved as soon as the API returns it. A submit resumed after
+        a crash reuses the uploaded file and, if a batch was already created
+        over it, adopts that batch instead of billing the run twice.
+
+        Returns:
+            str: The batch id
+        """
+        client = self.generator.client
+        input_file_id = self.state.get("input_file_id")
+        if input_file_id is None:
+            with open(self.job_dir / self.REQUESTS_FILE, "rb") as f:
+                input_file_id = client.files.create(file=f, purpose="batch").id
+            self._save_state(input_file_id=input_file_id)
+            batch = None
+        else:
+            batch = self._find_batch(input_file_id)
+
+        if batch is None:
+            batch = client.batches.create(
+                input_file_id=input_file_id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h",
+            )
+            print(f"✅ Submitted batch {batch.id}")
+        else:
+            print(f"✅ Resuming batch {batch.id} created before the interruption")
+        self._save_state(status="submitted", batch_id=batch.id)
+        return batch.id
+
+    def _find_batch(self, input_file_id: str) -> Optional[Any]:
+        """
+        Look for a batch already created over an uploaded input file.
+
+        Args:
+            input_file_id: Id of the uploaded input file
+
+        Returns:
+            Optional[Any]: The batch, or None if there is none
+        """
+        for batch in self.generator.client.batches.list(limit=100):
+            if batch.input_file_id == input_file_id:
+                return batch
+        return None
+
+    def poll(self, interval: float = 30.0, timeout: Optional[float] = None) -> str:
+        """
+        Wait for the batch to reach a terminal status.
+
+        Args:
+            interval: Seconds between status checks
+            timeout: Maximum number of seconds to wait (None waits forever)
+
+        Returns:
+            str: The id of the output file
+
+        Raises:
+            RuntimeError: If the batch fails, expires or is cancelled
+            TimeoutError: If the batch is still running after `timeout`
+        """
+        client = self.generator.client
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            batch = client.batches.retrieve(self.state["batch_id"])
+            print(f"Batch {batch.id} is {batch.status}")
+            if batch.status in TERMINAL_STATUSES:
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"Batch {batch.id} is still {batch.status}")
+            time.sleep(interval)
+
+        if batch.status != "completed" or not batch.output_file_id:
+            self._save_state(status="failed", batch_status=batch.status)
+            raise RuntimeError(f"Batch {batch.id} ended with status {batch.status}")
+
+        self._save_state(
+            status="completed",
+            output_file_id=batch.output_file_id,
+            error_file_id=batch.error_file_id,
+        )
+        return batch.output_file_id
+
+    def ingest(
+        self, output_format: str = "json", filename_prefix: str = "personas"
+    ) -> Path:
+        """
+        Download the batch results, validate them and export the personas.
+
+        The results file is kept in the job directory, so ingesting again
+        does not download it a second time.
+
+        Args:
+            output_format: Output format (json, yaml, jsonl or parquet)
+            filename_prefix: Prefix for the output filename
+
+        Returns:
+            Path: Path to the exported file containing all personas
+        """
+        results_path = self.job_dir / self.RESULTS_FILE
+        if not results_path.exists():
+            content = self.generator.client.files.content(self.state["output_file_id"])
+            results_path.write_bytes(content.read())
+
+        with open(results_path) as f:
+            results = [json.loads(line) for line in f if line.strip()]
+        results.sort(key=lambda result: result["custom_id"])
+        personas = (
+            persona for result in results for persona in self._ingest_result(result)
+        )
+
+        if output_format == "jsonl":
+            output_path = self.exporter.export_jsonl(personas, filename_prefix)
+        elif output_format == "parquet":
+            output_path = self.exporter.export_parquet(
+                personas, self.generator.schema, filename_prefix
+            )
+        else:
+            output_path = self.exporter.export_multiple(
+                list(personas), output_format, filename_prefix
+            )
+        print(f"\n📊 Token usage: {self.generator.usage.summary()}")
+        self._save_state(status="ingested", export_path=str(output_path))
+        return output_path
+
+    def _ingest_result(self, result: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Validate the personas of one batch result line.
+
+        Args:
+            result: One line of the batch output file
+
+        Returns:
+            List[Dict[str, Any]]: The valid personas of the result
+        """
+        custom_id = result["custom_id"]
+        response = result.get("response") or {}
+        if result.get("error") or response.get("status_code") != 200:
+            print(f"⚠️  Warning: Request {custom_id} failed: {result.get('error')}")
+            return []
+
+        count = int(custom_id.rsplit("-", 1)[1])
+        completion = ChatCompletion.model_validate(response["body"])
+        try:
+            if count == 1:
+                return [self.generator._finish_persona(completion)]
+            return self.generator._finish_batch(completion, count)
+        except ValueError as e:
+            print(f"⚠️  Warning: Request {custom_id} failed validation: {e}")
+            return []
+
+    def run(
+        self,
+        num_personas: int,
+        batch_size: int = 1,
+        output_format: str = "json",
+        filename_prefix: str = "personas",
+        poll_interval: float = 30.0,
+    ) -> Path:
+        """
+        Run the job to completion, resuming from the persisted state.
+
+        Args:
+            num_personas: Number of personas to generate (ignored on resume)
+            batch_size: Personas per chat completion (ignored on resume)
+            output_format: Output format (json, yaml, jsonl or parquet)
+            filename_prefix: Prefix for the output filename
+            poll_interval: Seconds between batch status checks
+
+        Returns:
+            Path: Path to the exported file containing all personas
+        """
+        if self.status == "failed":
+            raise RuntimeError(
+                f"Batch job in {self.job_dir} failed "
+                f"({self.state.get('batch_status')}); start a new job"
+            )
+        if self.status == "ingested":
+            print(f"Batch job in {self.job_dir} was already ingested")
+            return Path(self.state["export_path"])
+
+        if self.status == "new":
+            self.prepare(num_personas, batch_size)
+        if self.status == "prepared":
+            self.submit()
+        if self.status == "submitted":
+            self.poll(interval=poll_interval)
+        return self.ingest(output_format, filename_prefix)
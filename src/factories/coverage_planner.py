@@ -0,0 +1,293 @@
+import itertools
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.schemas.loader import SchemaLoader
+
+PLAN_STRATEGIES = ("stratified", "pairwise")
+
+# Candidate rows drawn per pairwise row; more finds better rows, slower
+_CANDIDATES = 64
+
+
+class CoveragePlanner:
+    """
+    Up-front assignment of characteristics and options to the personas of a run.
+
+    Every field with `options` and every characteristic referenced by a field
+    is a dimension whose values (options or catalog examples) are spread over
+    the personas before any request is made:
+
+        stratified: each dimension independently, every value getting its
+            weighted share of the personas (largest remainder rounding)
+        pairwise: every pair of values of every two dimensions appears in
+            at least one persona, using few personas (a greedy covering
+            array); once all pairs are covered a new covering round starts
+
+    Each persona's assignment is rendered as its additional context.
+    """
+
+    def __init__(
+        self,
+        dimensions: Mapping[str, Sequence[str]],
+        weights: Optional[Mapping[str, Mapping[str, float]]] = None,
+        strategy: str = "stratified",
+        seed: Optional[int] = 0,
+        labels: Optional[Mapping[str, str]] = None,
+    ):
+        """
+        Initialize the planner.
+
+        Args:
+            dimensions: Values by dimension name
+            weights: Relative weight of values by dimension (missing values
+                weigh 1)
+            strategy: One of "stratified" or "pairwise"
+            seed: Seed of the sampling, so a run can be planned again
+                identically (None for a fresh plan every time)
+            labels: Human-readable dimension names used in the context
+        """
+        if strategy not in PLAN_STRATEGIES:
+            raise ValueError(
+                f"Coverage strategy must be one of {', '.join(PLAN_STRATEGIES)}"
+            )
+        self.names = [name for name, values in dimensions.items() if values]
+        self.values = [list(dimensions[name]) for name in self.names]
+        self.strategy = strategy
+        self.seed = seed
+        self.labels = dict(labels or {})
+        weights = weights or {}
+        self.probabilities = []
+        for name, values in zip(self.names, self.values):
+            unknown = set(weights.get(name, {})) - set(values)
+            if unknown:
+                raise ValueError(
+                    f"Unknown values weighted for {name}: {', '.join(sorted(unknown))}"
+                )
+            p = np.array([weights.get(name, {}).get(v, 1.0) for v in values], float)
+            if (p < 0).any() or p.sum() <= 0:
+                raise ValueError(
+                    f"Weights of {name} must be non-negative and not all zero"
+                )
+            self.probabilities.append(p / p.sum())
+
+    @classmethod
+    def from_schema(
+        cls,
+        schema: Any,
+        characteristics: Any = None,
+        weights: Optional[Mapping[str, Mapping[str, float]]] = None,
+        strategy: str = "stratified",
+        seed: Optional[int] = 0,
+    ) -> "CoveragePlanner":
+        """
+        Build a planner over the options and characteristics of a schema.
+
+        Args:
+            schema: The persona schema
+            characteristics: The characteristics catalog; characteristic
+                references are skipped without it
+            weights: Relative weight of values by dimension; characteristic
+                dimensions are named by their reference (e.g.
+                "personal.religion")
+            strategy: One of "stratified" or "pairwise"
+            seed: Seed of the sampling
+
+        Returns:
+            CoveragePlanner: The planner
+        """
+        dimensions: Dict[str, List[str]] = {}
+        labels: Dict[str, str] = {}
+        for field_name, field_def in schema.fields.items():
+            if field_def.options:
+                dimensions[field_name] = list(field_def.options)
+                labels[field_name] = field_name.replace("_", " ")
+            for reference in field_def.characteristics or []:
+                characteristic = _lookup(characteristics, reference)
+                if characteristic is not None and reference not in dimensions:
+                    dimensions[reference] = list(characteristic.examples)
+                    labels[reference] = characteristic.description.lower()
+        return cls(dimensions, weights, strategy, seed, labels)
+
+    @classmethod
+    def for_schema_file(
+        cls, schema: Any, schema_path: str, **kwargs: Any
+    ) -> "CoveragePlanner":
+        """
+        Build a planner, reading `characteristics.yaml` next to the schema.
+
+        Args:
+            schema: The persona schema
+            schema_path: Path of the schema file
+            **kwargs: Arguments of `from_schema`
+
+        Returns:
+            CoveragePlanner: The planner
+        """
+        schema_dir = Path(schema_path).parent
+        characteristics = None
+        if (schema_dir / "characteristics.yaml").exists():
+            loader = SchemaLoader(str(schema_dir))
+            characteristics = loader.load_schema("characteristics")
+        return cls.from_schema(schema, characteristics, **kwargs)
+
+    def plan(self, count: int) -> np.ndarray:
+        """
+        Assign a value of every dimension to each of `count` personas.
+
+        Args:
+            count: Number of personas
+
+        Returns:
+            np.ndarray: A (count, dimensions) array of value indices
+        """
+        rng = np.random.default_rng(self.seed)
+        if not self.names or count <= 0:
+            return np.zeros((max(count, 0), len(self.names)), dtype=np.int64)
+        if self.strategy == "pairwise" and len(self.names) > 1:
+            return self._pairwise(count, rng)
+        return self._stratified(count, rng)
+
+    def _stratified(self, count: int, rng: np.random.Generator) -> np.ndarray:
+        """Give every value of every dimension its weighted share of rows."""
+        columns = []
+        for p in self.probabilities:
+            quotas = count * p
+            counts = np.floor(quotas).astype(np.int64)
+            remainder = count - counts.sum()
+            if remainder:
+                # Largest remainders first, ties broken at random
+                order = np.lexsort((rng.random(len(p)), -(quotas - counts)))
+                counts[order[:remainder]] += 1
+            column = np.repeat(np.arange(len(p)), counts)
+            columns.append(rng.permutation(column))
+        return np.stack(columns, axis=1)
+
+    def _pairwise(self, count: int, rng: np.random.Generator) -> np.ndarray:
+        """Greedily build rows covering every uncovered pair of values."""
+        pairs = list(itertools.combinations(range(len(self.names)), 2))
+        uncovered = {pair: self._uncovered_pair(pair) for pair in pairs}
+        rows = np.empty((count, len(self.names)), dtype=np.int64)
+        for row in range(count):
+            if not any(matrix.any() for matrix in uncovered.values()):
+                # Every pair is covered: start a new covering round
+                uncovered = {pair: self._uncovered_pair(pair) for pair in pairs}
+            candidates = np.stack(
+                [rng.choice(len(p), size=_CANDIDATES, p=p) for p in self.probabilities],
+                axis=1,
+            )
+            # Seed every candidate with one uncovered pair, so each row helps
+            (i, j), matrix = max(uncovered.items(), key=lambda item: item[1].sum())
+            a, b = np.argwhere(matrix)[rng.integers(matrix.sum())]
+            candidates[:, i], candidates[:, j] = a, b
+            gains = np.zeros(_CANDIDATES, dtype=np.int64)
+            for (x, y), matrix in uncovered.items():
+                gains += matrix[candidates[:, x], candidates[:, y]]
+            best = candidates[int(np.argmax(gains))]
+            for (x, y), matrix in uncovered.items():
+                matrix[best[x], best[y]] = False
+            rows[row] = best
+        return rows
+
+    def _uncovered_pair(self, pair: Tuple[int, int]) -> np.ndarray:
+        """Matrix of the value pairs of two dimensions to cover (weight > 0)."""
+        i, j = pair
+        return np.outer(self.probabilities[i] > 0, self.probabilities[j] > 0)
+
+    def assignments(self, rows: np.ndarray) -> List[Dict[str, str]]:
+        """
+        Look up the values of a plan.
+
+        Args:
+            rows: A plan, as returned by `plan`
+
+        Returns:
+            List[Dict[str, str]]: Each persona's values by dimension
+        """
+        return [
+            {
+                name: values[index]
+                for name, values, index in zip(self.names, self.values, row)
+            }
+            for row in rows.tolist()
+        ]
+
+    def contexts(self, rows: np.ndarray) -> List[Optional[str]]:
+        """
+        Render each persona's assignment of a plan as its context.
+
+        Args:
+            rows: A plan, as returned by `plan`
+
+        Returns:
+            List[Optional[str]]: One additional context per persona (None if
+                the schema has nothing to plan)
+        """
+        return [self.context(assignment) for assignment in self.assignments(rows)]
+
+    def context(self, assignment: Mapping[str, str]) -> Optional[str]:
+        """
+        Render an assignment as additional context for one persona.
+
+        Args:
+            assignment: Values by dimension
+
+        Returns:
+            Optional[str]: The context, or None for an empty assignment
+        """
+        if not assignment:
+            return None
+        traits = "; ".join(
+            f"{self.labels.get(name, name)}: {value}"
+            for name, value in assignment.items()
+        )
+        return f"Give this persona the following traits: {traits}."
+
+    def coverage(self, rows: np.ndarray) -> Dict[str, Tuple[int, int]]:
+        """
+        Measure how much of the value space a plan covers.
+
+        Args:
+            rows: A plan, as returned by `plan`
+
+        Returns:
+            Dict[str, Tuple[int, int]]: (covered, total) counts of single
+                values and of value pairs
+        """
+        values = sum(len(np.unique(rows[:, i])) for i in range(len(self.names)))
+        pairs = total_pairs = 0
+        for i, j in itertools.combinations(range(len(self.names)), 2):
+            codes = rows[:, i] * len(self.values[j]) + rows[:, j]
+            pairs += len(np.unique(codes))
+            total_pairs += len(self.values[i]) * len(self.values[j])
+        total_values = sum(len(values) for values in self.values)
+        return {"values": (values, total_values), "pairs": (pairs, total_pairs)}
+
+    def summary(self, rows: np.ndarray) -> str:
+        """
+        Human-readable one-line summary of a plan.
+
+        Args:
+            rows: A plan, as returned by `plan`
+
+        Returns:
+            str: The summary line
+        """
+        coverage = self.coverage(rows)
+        values, total_values = coverage["values"]
+        pairs, total_pairs = coverage["pairs"]
+        return (
+            f"{self.strategy} over {len(self.names)} dimension(s); "
+            f"{values}/{total_values} values and {pairs}/{total_pairs} "
+            f"value pairs covered by {len(rows)} persona(s)"
+        )
+
+
+def _lookup(characteristics: Any, reference: str) -> Any:
+    """Find a `category.name` characteristic in the catalog, or None."""
+    if characteristics is None or "." not in reference:
+        return None
+    category, name = reference.split(".", 1)
+    return getattr(characteristics, category, {}).get(name)
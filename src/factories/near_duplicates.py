@@ -0,0 +1,226 @@
+import hashlib
+import re
+import threading
+from array import array
+from typing import Any, Dict, List, Optional, Sequence
+
+_MASK = 0xFFFFFFFF
+_WORD = re.compile(r"\w+")
+
+
+class NearDuplicateIndex:
+    """
+    Incremental MinHash/LSH index of the text fields of personas.
+
+    Each persona is reduced to the set of word shingles of its text fields
+    and summarized by a MinHash signature, whose matching positions estimate
+    the Jaccard similarity of two shingle sets. The signature is computed
+    with one-permutation hashing: every shingle is hashed once and binned,
+    and empty bins borrow from their neighbours, so its cost grows with the
+    text rather than with `num_perm`.
+
+    Signatures are split into bands; personas sharing any band are
+    candidates, and a candidate is a duplicate when its estimated similarity
+    reaches the threshold. A check only looks at the few personas sharing a
+    band, so its cost does not grow with the number of personas indexed.
+    Signatures are stored as 32-bit values in one flat array (4 bytes per
+    bin and persona).
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.8,
+        fields: Optional[Sequence[str]] = None,
+        num_perm: int = 64,
+        bands: int = 16,
+        shingle_size: int = 3,
+        seed: int = 1,
+    ):
+        """
+        Initialize an empty index.
+
+        Args:
+            threshold: Estimated Jaccard similarity at which two personas are
+                duplicates
+            fields: Fields whose text is compared (default: every string
+                field except `id`)
+            num_perm: Number of MinHash bins (signature length)
+            bands: Number of LSH bands; `num_perm` must be a multiple of it.
+                More bands find less similar candidates.
+            shingle_size: Number of consecutive words per shingle
+            seed: Seed of the shingle hash
+        """
+        if not 0 < threshold <= 1:
+            raise ValueError("Duplicate threshold must be in (0, 1]")
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+
+        self.threshold = threshold
+        self.fields = list(fields) if fields else None
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.seed = seed
+        self._salt = seed.to_bytes(8, "little")
+        self._signatures = array("I")
+        self._buckets: List[Dict[int, List[int]]] = [{} for _ in range(bands)]
+        self._lock = threading.Lock()
+        self.duplicates = 0
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = dict(self.__dict__)
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def signer(self) -> "NearDuplicateIndex":
+        """
+        Return an empty index computing the same signatures.
+
+        It is cheap to send to worker processes, which compute signatures
+        for `add` without holding the indexed personas.
+
+        Returns:
+            NearDuplicateIndex: An empty index with the same parameters
+        """
+        return NearDuplicateIndex(
+            self.threshold,
+            self.fields,
+            self.num_perm,
+            self.bands,
+            self.shingle_size,
+            self.seed,
+        )
+
+    def __len__(self) -> int:
+        return len(self._signatures) // self.num_perm
+
+    def text(self, persona: Dict[str, Any]) -> str:
+        """
+        Extract the compared text of a persona.
+
+        Args:
+            persona: The persona data
+
+        Returns:
+            str: The text of the compared fields, in field order
+        """
+        if self.fields is None:
+            values = [v for k, v in persona.items() if k != "id" and isinstance(v, str)]
+        else:
+            values = [persona.get(field) for field in self.fields]
+        return " ".join(str(value) for value in values if value)
+
+    def signature(self, persona: Dict[str, Any]) -> List[int]:
+        """
+        Compute the MinHash signature of a persona.
+
+        Args:
+            persona: The persona data
+
+        Returns:
+            List[int]: `num_perm` 32-bit minimum hash values
+        """
+        words = _WORD.findall(self.text(persona).lower())
+        size = self.shingle_size
+        shingles = {
+            " ".join(words[i : i + size]) for i in range(max(1, len(words) - size + 1))
+        }
+        bins: List[Optional[int]] = [None] * self.num_perm
+        for shingle in shingles:
+            digest = hashlib.blake2b(
+                shingle.encode(), digest_size=8, salt=self._salt
+            ).digest()
+            value = int.from_bytes(digest, "little")
+            slot, value = value % self.num_perm, (value // self.num_perm) & _MASK
+            current = bins[slot]
+            if current is None or value < current:
+                bins[slot] = value
+        return self._densify(bins)
+
+    def _densify(self, bins: List[Optional[int]]) -> List[int]:
+        """Fill empty bins from the next non-empty bin, offset by the distance."""
+        size = len(bins)
+        if all(value is None for value in bins):
+            return [_MASK] * size
+        signature = []
+        for slot, value in enumerate(bins):
+            distance = 0
+            while value is None:
+                distance += 1
+                value = bins[(slot + distance) % size]
+            signature.append((value + distance * 0x9E3779B1) & _MASK)
+        return signature
+
+    def _band_keys(self, signature: Sequence[int]) -> List[int]:
+        rows = self.rows
+        return [
+            hash(tuple(signature[band * rows : (band + 1) * rows]))
+            for band in range(self.bands)
+        ]
+
+    def _similarity(self, signature: Sequence[int], index: int) -> float:
+        start = index * self.num_perm
+        stored = self._signatures[start : start + self.num_perm]
+        return sum(a == b for a, b in zip(signature, stored)) / self.num_perm
+
+    def find(self, persona: Dict[str, Any]) -> Optional[int]:
+        """
+        Look for an indexed near-duplicate of a persona.
+
+        Args:
+            persona: The persona data
+
+        Returns:
+            Optional[int]: Insertion index of the duplicate, or None
+        """
+        signature = self.signature(persona)
+        with self._lock:
+            return self._find(signature, self._band_keys(signature))
+
+    def _find(self, signature: List[int], keys: List[int]) -> Optional[int]:
+        seen = set()
+        for bucket, key in zip(self._buckets, keys):
+            for index in bucket.get(key, ()):
+                if index in seen:
+                    continue
+                seen.add(index)
+                if self._similarity(signature, index) >= self.threshold:
+                    return index
+        return None
+
+    def add(
+        self, persona: Dict[str, Any], signature: Optional[List[int]] = None
+    ) -> Optional[int]:
+        """
+        Index a persona unless it duplicates one already indexed.
+
+        Checking and inserting happen under one lock, so two concurrent
+        duplicates cannot both get in.
+
+        Args:
+            persona: The persona data
+            signature: Its signature, if already computed (e.g. by a worker
+                process)
+
+        Returns:
+            Optional[int]: Insertion index of the duplicate if the persona was
+                rejected, or None if it was indexed
+        """
+        if signature is None:
+            signature = self.signature(persona)
+        keys = self._band_keys(signature)
+        with self._lock:
+            duplicate = self._find(signature, keys)
+            if duplicate is not None:
+                self.duplicates += 1
+                return duplicate
+            index = len(self)
+            self._signatures.extend(signature)
+            for bucket, key in zip(self._buckets, keys):
+                bucket.setdefault(key, []).append(index)
+        return None
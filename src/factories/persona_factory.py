@@ -1,8 +1,20 @@
+import asyncio
+import threading
+import time
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import openai
 
 from src.exporters.persona_exporter import PersonaExporter
+from src.factories.batch_job import BatchJob
+from src.factories.near_duplicates import NearDuplicateIndex
+from src.factories.run_journal import RunJournal
+from src.factories.work_queue import WorkQueue
 from src.generators.openai import OpenAIGenerator
+from src.generators.post_processor import PostProcessor
+from src.generators.response_cache import ResponseCache
+from src.monitoring.metrics import METRICS
 
 
 class PersonaFactory:
@@ -14,60 +26,599 @@ class PersonaFactory:
         output_format: str = "json",
         output_dir: str = "export",
         config_path: str = "src/generators/config/generator_config.yaml",
+        cache_path: Optional[str] = None,
+        cache_mode: str = "read-through",
+        cache_max_bytes: Optional[int] = None,
+        dedup_threshold: Optional[float] = None,
+        dedup_fields: Optional[List[str]] = None,
+        dedup_retries: int = 2,
+        coverage: Optional[str] = None,
+        coverage_weights: Optional[Dict[str, Dict[str, float]]] = None,
+        coverage_seed: Optional[int] = 0,
+        shard_records: Optional[int] = None,
+        shard_bytes: Optional[int] = None,
+        compression: Optional[str] = None,
+        processes: Optional[int] = None,
+        stream: Optional[bool] = None,
     ):
         """
         Initialize the persona factory.
 
         Args:
             schema_path: Path to the schema file
-            output_format: Output format (json or yaml)
+            output_format: Output format (json, yaml, or jsonl or parquet to
+                stream)
             output_dir: Directory where exported files will be saved
             config_path: Path to the generator configuration file
+            cache_path: Path to an on-disk response cache (optional)
+            cache_mode: Response cache mode (read-through, record or replay)
+            cache_max_bytes: Size bound of the response cache (optional)
+            dedup_threshold: Reject personas whose text fields are at least
+                this similar (estimated Jaccard, 0-1) to an earlier persona of
+                the run (optional)
+            dedup_fields: Fields compared for near-duplicates (default: every
+                string field except `id`)
+            dedup_retries: Regenerations of a near-duplicate before it is
+                dropped
+            coverage: Plan the schema options and characteristics of every
+                persona up front, "stratified" or "pairwise" (optional)
+            coverage_weights: Relative weight of planned values by dimension
+            coverage_seed: Seed of the coverage plan (None for a fresh plan
+                on every run)
+            shard_records: With the "jsonl" output format, split the stream
+                into shards of at most this many personas (optional)
+            shard_bytes: With the "jsonl" output format, split the stream
+                into shards of about this many uncompressed bytes (optional)
+            compression: With the "jsonl" output format, write compressed
+                shards with a manifest, "gzip", "zstd" or "none" (default:
+                gzip once sharding is requested)
+            processes: Parse and validate completions, and compute the
+                near-duplicate signatures, in this many worker processes
+                while requests run on an asyncio event loop (optional)
+            stream: Stream single-persona completions and cancel them at the
+                first invalid field (default: the `response.stream` setting
+                of the generator config)
         """
         self.schema_path = schema_path
         self.output_format = output_format
         self.output_dir = Path(output_dir)
+        self.shard_records = shard_records
+        self.shard_bytes = shard_bytes
+        self.compression = compression
+        self.cache = (
+            ResponseCache(cache_path, mode=cache_mode, max_bytes=cache_max_bytes)
+            if cache_path
+            else None
+        )
         self.generator = OpenAIGenerator(
-            schema_path=schema_path, config_path=config_path
+            schema_path=schema_path,
+            config_path=config_path,
+            cache=self.cache,
+            stream=stream,
         )
         self.exporter = PersonaExporter(output_dir=output_dir)
+        self.dedup = (
+            NearDuplicateIndex(dedup_threshold, dedup_fields)
+            if dedup_threshold
+            else None
+        )
+        self.dedup_retries = dedup_retries
+        self.planner = None
+        if coverage:
+            # Imported on demand, numpy adds to the startup of every other run
+            from src.factories.coverage_planner import CoveragePlanner
+
+            self.planner = CoveragePlanner.for_schema_file(
+                self.generator.schema,
+                schema_path,
+                weights=coverage_weights,
+                strategy=coverage,
+                seed=coverage_seed,
+            )
+
+        self.post_processor = (
+            PostProcessor(
+                self.generator.schema,
+                processes,
+                signer=self.dedup.signer() if self.dedup is not None else None,
+            )
+            if processes
+            else None
+        )
+        self.generator.post_processor = self.post_processor
+
+    def close(self) -> None:
+        """
+        Release the resources held by the factory (the response cache and the
+        post-processing workers).
+        """
+        if self.cache is not None:
+            self.cache.close()
+        if self.post_processor is not None:
+            self.post_processor.close()
+
+    def __enter__(self) -> "PersonaFactory":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
 
-    def verify_connection(self) -> bool:
+    def verify_connection(
+        self, cache_path: Optional[str] = None, ttl: float = 3600.0
+    ) -> bool:
         """
         Verify the connection to OpenAI API.
 
+        Args:
+            cache_path: File remembering successful checks, so processes
+                started within `ttl` seconds skip the request (optional)
+            ttl: Seconds a successful check is remembered
+
         Returns:
             bool: True if connection is successful, False otherwise
         """
-        return self.generator.verify_access()
+        return self.generator.verify_access(cache_path, ttl)
 
-    def generate_personas(self, num_personas: int) -> List[Dict[str, Any]]:
+    def generate_personas(
+        self,
+        num_personas: int,
+        concurrency: int = 1,
+        batch_size: int = 1,
+        on_persona: Optional[Callable[[Dict[str, Any]], None]] = None,
+        journal: Optional[RunJournal] = None,
+    ) -> List[Dict[str, Any]]:
         """
         Generate multiple personas.
 
         Args:
             num_personas: Number of personas to generate
+            concurrency: Maximum number of requests in flight at once. Values
+                above 1, or a factory with worker processes, run the requests
+                on an asyncio event loop.
+            batch_size: Number of personas requested per chat completion
+            on_persona: Optional callback receiving each persona, in request
+                order, as soon as it is available. Personas handed to the
+                callback are not collected, so the returned list is empty.
+            journal: Optional run journal; every completed slot is recorded
+                in it, and slots it already holds are replayed instead of
+                being generated again.
 
         Returns:
-            List[Dict[str, Any]]: List of generated personas
-        """
-        personas = []
-        for i in range(num_personas):
-            print(f"\nGenerating persona {i + 1}/{num_personas}...")
-            try:
-                persona = self.generator.generate()
-                personas.append(persona)
-                print(f"✅ Persona {i + 1} generated successfully!")
-            except Exception as e:
-                msg = (
-                    "⚠️  Warning: Persona "
-                    + str(i + 1)
-                    + " failed validation: "
-                    + str(e)
+            List[Dict[str, Any]]: List of generated personas, in request order
+        """
+        if concurrency < 1:
+            raise ValueError("Concurrency must be at least 1")
+
+        if concurrency > 1 or self.post_processor is not None:
+            return asyncio.run(
+                self.agenerate_personas(
+                    num_personas,
+                    concurrency,
+                    batch_size,
+                    on_persona=on_persona,
+                    journal=journal,
                 )
-                print(msg)
+            )
+
+        batches = self._batches(num_personas, batch_size)
+        journaled = self._replay_journal(journal, num_personas, batch_size)
+        contexts = self._plan_contexts(num_personas)
+        personas: List[Dict[str, Any]] = []
+        emit = on_persona or personas.append
+        for start, count in batches:
+            slot_personas = journaled.get(start)
+            if slot_personas is None:
+                slot_personas = self._generate_slot(
+                    start, count, num_personas, contexts
+                )
+                self._journal_slot(journal, start, count, slot_personas)
+            for persona in slot_personas:
+                emit(persona)
+        self._report_usage()
         return personas
 
+    async def agenerate_personas(
+        self,
+        num_personas: int,
+        concurrency: int = 8,
+        batch_size: int = 1,
+        on_persona: Optional[Callable[[Dict[str, Any]], None]] = None,
+        journal: Optional[RunJournal] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Generate multiple personas concurrently.
+
+        A fixed pool of `concurrency` workers pulls request slots from a shared
+        iterator, so at most `concurrency` requests are in flight at any time.
+        Finished slots wait in a reorder buffer until every earlier slot is
+        done, so personas are delivered in request order regardless of the
+        order in which responses arrive.
+
+        Args:
+            num_personas: Number of personas to generate
+            concurrency: Maximum number of requests in flight at once
+            batch_size: Number of personas requested per chat completion
+            on_persona: Optional callback receiving each persona, in request
+                order, as soon as it is available. Personas handed to the
+                callback are not collected, so the returned list is empty.
+            journal: Optional run journal; every completed slot is recorded
+                in it, and slots it already holds are replayed instead of
+                being generated again.
+
+        Returns:
+            List[Dict[str, Any]]: List of generated personas, in request order
+        """
+        if concurrency < 1:
+            raise ValueError("Concurrency must be at least 1")
+
+        batches = self._batches(num_personas, batch_size)
+        journaled = self._replay_journal(journal, num_personas, batch_size)
+        contexts = self._plan_contexts(num_personas)
+        personas: List[Dict[str, Any]] = []
+        emit = on_persona or personas.append
+        pending: Dict[int, List[Dict[str, Any]]] = {}
+        next_index = 0
+        slots = iter(enumerate(batches))
+
+        def deliver(index: int, slot_personas: List[Dict[str, Any]]) -> None:
+            nonlocal next_index
+            pending[index] = slot_personas
+            while next_index in pending:
+                for persona in pending.pop(next_index):
+                    emit(persona)
+                next_index += 1
+
+        async def worker() -> None:
+            for index, (start, count) in slots:
+                slot_personas = journaled.get(start)
+                if slot_personas is None:
+                    slot_personas = await self._agenerate_slot(
+                        start, count, num_personas, contexts
+                    )
+                    self._journal_slot(journal, start, count, slot_personas)
+                deliver(index, slot_personas)
+
+        try:
+            await asyncio.gather(
+                *(worker() for _ in range(min(concurrency, len(batches))))
+            )
+        finally:
+            await self.generator.aclose()
+
+        self._report_usage()
+        return personas
+
+    @staticmethod
+    def _batches(num_personas: int, batch_size: int) -> List[Tuple[int, int]]:
+        """
+        Split a run into request slots.
+
+        Args:
+            num_personas: Number of personas to generate
+            batch_size: Number of personas requested per chat completion
+
+        Returns:
+            List[Tuple[int, int]]: (first persona index, persona count) per slot
+        """
+        if batch_size < 1:
+            raise ValueError("Batch size must be at least 1")
+        return [
+            (start, min(batch_size, num_personas - start))
+            for start in range(0, num_personas, batch_size)
+        ]
+
+    def _generate_slot(
+        self,
+        start: int,
+        count: int,
+        num_personas: int,
+        contexts: Optional[List[Optional[str]]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Generate the personas of one request slot.
+
+        Args:
+            start: Index of the first persona of the slot
+            count: Number of personas in the slot
+            num_personas: Total number of personas of the run
+            contexts: Planned additional context of every persona (optional)
+
+        Returns:
+            List[Dict[str, Any]]: The valid personas of the slot
+
+        Raises:
+            openai.APIError: If the API call fails after the allowed retries
+            LookupError: On a response cache miss in replay mode
+        """
+        label = self._slot_label(start, count)
+        prompt = self._slot_context(contexts, start, count)
+        print(f"\nGenerating persona {label}/{num_personas}...")
+        try:
+            with METRICS.span("slot"):
+                if count == 1:
+                    personas = [self.generator.generate(prompt, slot=start)]
+                else:
+                    personas = self.generator.generate_batch(count, prompt, slot=start)
+                personas = self._deduplicate(
+                    personas, start, prompt if count == 1 else None
+                )
+            print(f"✅ Persona {label} generated successfully!")
+            return personas
+        except (openai.APIError, LookupError):
+            METRICS.inc("failures_total", count, reason="api")
+            raise
+        except ValueError as e:
+            METRICS.inc("failures_total", count, reason="validation")
+            print(f"⚠️  Warning: Persona {label} failed validation: {e}")
+            return []
+        except Exception as e:
+            METRICS.inc("failures_total", count, reason="error")
+            print(f"⚠️  Warning: Persona {label} failed: {e}")
+            return []
+
+    async def _agenerate_slot(
+        self,
+        start: int,
+        count: int,
+        num_personas: int,
+        contexts: Optional[List[Optional[str]]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Generate the personas of one request slot on the event loop.
+
+        Args:
+            start: Index of the first persona of the slot
+            count: Number of personas in the slot
+            num_personas: Total number of personas of the run
+            contexts: Planned additional context of every persona (optional)
+
+        Returns:
+            List[Dict[str, Any]]: The valid personas of the slot
+
+        Raises:
+            openai.APIError: If the API call fails after the allowed retries
+            LookupError: On a response cache miss in replay mode
+        """
+        label = self._slot_label(start, count)
+        prompt = self._slot_context(contexts, start, count)
+        try:
+            with METRICS.span("slot"):
+                if count == 1:
+                    personas = [await self.generator.agenerate(prompt, slot=start)]
+                else:
+                    personas = await self.generator.agenerate_batch(
+                        count, prompt, slot=start
+                    )
+                personas = await self._adeduplicate(
+                    personas, start, prompt if count == 1 else None
+                )
+            print(f"✅ Persona {label}/{num_personas} generated successfully!")
+            return personas
+        except (openai.APIError, LookupError):
+            METRICS.inc("failures_total", count, reason="api")
+            raise
+        except ValueError as e:
+            METRICS.inc("failures_total", count, reason="validation")
+            print(f"⚠️  Warning: Persona {label} failed validation: {e}")
+            return []
+        except Exception as e:
+            METRICS.inc("failures_total", count, reason="error")
+            print(f"⚠️  Warning: Persona {label} failed: {e}")
+            return []
+
+    def _replay_journal(
+        self, journal: Optional[RunJournal], num_personas: int, batch_size: int
+    ) -> Dict[int, List[Dict[str, Any]]]:
+        """
+        Load the slots a run journal already holds.
+
+        Their personas are added to the near-duplicate index, so the rest of
+        the run is deduplicated against them as if it had never stopped.
+
+        Args:
+            journal: The run journal (optional)
+            num_personas: Number of personas of the run
+            batch_size: Number of personas requested per chat completion
+
+        Returns:
+            Dict[int, List[Dict[str, Any]]]: Personas by slot start index
+
+        Raises:
+            ValueError: If the journal was written with another run layout
+        """
+        if journal is None:
+            return {}
+        journal.check(num_personas, batch_size)
+        journaled = journal.completed()
+        if journaled:
+            print(f"📝 Resuming {journal.summary()}")
+        if self.dedup is not None:
+            for start in sorted(journaled):
+                for persona in journaled[start]:
+                    self.dedup.add(persona)
+        return journaled
+
+    @staticmethod
+    def _journal_slot(
+        journal: Optional[RunJournal],
+        start: int,
+        count: int,
+        personas: List[Dict[str, Any]],
+    ) -> None:
+        """Record a completed slot; failed slots are left to be retried."""
+        if journal is not None and personas:
+            journal.record(start, count, personas)
+
+    def _plan_contexts(self, num_personas: int) -> Optional[List[Optional[str]]]:
+        """
+        Plan the additional context of every persona of a run.
+
+        Args:
+            num_personas: Number of personas of the run
+
+        Returns:
+            Optional[List[Optional[str]]]: One context per persona, or None
+                without a coverage planner
+        """
+        if self.planner is None:
+            return None
+        rows = self.planner.plan(num_personas)
+        print(f"🧭 Coverage plan: {self.planner.summary(rows)}")
+        return self.planner.contexts(rows)
+
+    @staticmethod
+    def _slot_context(
+        contexts: Optional[List[Optional[str]]], start: int, count: int
+    ) -> Optional[str]:
+        """The planned context of a slot, numbering the personas of a batch."""
+        if not contexts:
+            return None
+        if count == 1:
+            return contexts[start]
+        lines = [
+            f"Persona {offset + 1}: {context}"
+            for offset, context in enumerate(contexts[start : start + count])
+            if context
+        ]
+        return "\n".join(lines) or None
+
+    def _deduplicate(
+        self,
+        personas: List[Dict[str, Any]],
+        start: int,
+        context: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Replace near-duplicates of earlier personas with fresh ones.
+
+        Args:
+            personas: The personas of a slot
+            start: Index of the first persona of the slot
+            context: Planned context of the persona, kept when regenerating
+
+        Returns:
+            List[Dict[str, Any]]: The personas that are not near-duplicates
+
+        Raises:
+            openai.APIError: If a regeneration fails after the allowed retries
+            LookupError: On a response cache miss in replay mode
+        """
+        if self.dedup is None:
+            return personas
+        unique = []
+        for persona in personas:
+            attempts = 0
+            while persona is not None and self.dedup.add(persona) is not None:
+                if attempts == self.dedup_retries:
+                    persona = None
+                    break
+                attempts += 1
+                METRICS.inc("duplicates_total", result="regenerated")
+                try:
+                    persona = self.generator.generate(
+                        prompt=self._distinct_prompt(persona, context), slot=start
+                    )
+                except ValueError:
+                    persona = None
+            if persona is None:
+                METRICS.inc("duplicates_total", result="rejected")
+                print("⚠️  Warning: Dropped a near-duplicate persona")
+            else:
+                unique.append(persona)
+        return unique
+
+    async def _adeduplicate(
+        self,
+        personas: List[Dict[str, Any]],
+        start: int,
+        context: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Replace near-duplicates of earlier personas on the event loop.
+
+        Args:
+            personas: The personas of a slot
+            start: Index of the first persona of the slot
+            context: Planned context of the persona, kept when regenerating
+
+        Returns:
+            List[Dict[str, Any]]: The personas that are not near-duplicates
+
+        Raises:
+            openai.APIError: If a regeneration fails after the allowed retries
+            LookupError: On a response cache miss in replay mode
+        """
+        if self.dedup is None:
+            return personas
+        signatures: List[Optional[List[int]]] = [None] * len(personas)
+        if self.post_processor is not None:
+            with METRICS.span("postprocess"):
+                signatures = await self.post_processor.signatures(personas)
+        unique = []
+        for persona, signature in zip(personas, signatures):
+            attempts = 0
+            while (
+                persona is not None and self.dedup.add(persona, signature) is not None
+            ):
+                if attempts == self.dedup_retries:
+                    persona = None
+                    break
+                attempts += 1
+                METRICS.inc("duplicates_total", result="regenerated")
+                signature = None
+                try:
+                    persona = await self.generator.agenerate(
+                        prompt=self._distinct_prompt(persona, context), slot=start
+                    )
+                except ValueError:
+                    persona = None
+            if persona is None:
+                METRICS.inc("duplicates_total", result="rejected")
+                print("⚠️  Warning: Dropped a near-duplicate persona")
+            else:
+                unique.append(persona)
+        return unique
+
+    def _distinct_prompt(
+        self, duplicate: Dict[str, Any], context: Optional[str] = None
+    ) -> str:
+        """Additional context steering a regeneration away from a duplicate."""
+        text = self.dedup.text(duplicate)
+        if len(text) > 300:
+            text = text[:300] + "..."
+        prompt = (
+            "A persona like the following already exists; create one that is "
+            f"clearly different in name, background and story: {text}"
+        )
+        return f"{context}\n{prompt}" if context else prompt
+
+    @staticmethod
+    def _slot_label(start: int, count: int) -> str:
+        """Human-readable 1-based persona range of a slot."""
+        if count == 1:
+            return str(start + 1)
+        return f"{start + 1}-{start + count}"
+
+    def _report_usage(self) -> None:
+        """Print the accumulated token usage of the generator."""
+        print(f"\n📊 Token usage: {self.generator.usage.summary()}")
+        if self.cache is not None:
+            print(f"💾 Response cache: {self.cache.summary()}")
+        first_field = METRICS.histogram("time_to_first_field_seconds")
+        if self.generator.stream and first_field:
+            print(
+                f"⚡ Time to first valid field: "
+                f"p50 {first_field.quantile(0.5) * 1000:.0f} ms, "
+                f"p99 {first_field.quantile(0.99) * 1000:.0f} ms; "
+                f"{METRICS.total('stream_aborts_total'):.0f} stream(s) cancelled"
+            )
+        if self.generator.pool is not None:
+            print(f"🔀 Providers: {self.generator.pool.summary()}")
+            return
+        limiter = self.generator.rate_limiter
+        if limiter.throttled or limiter.retries:
+            print(f"⏳ Rate limiter: {limiter.summary()}")
+
     def export_personas(
         self, personas: List[Dict[str, Any]], filename_prefix: str = "personas"
     ) -> Path:
@@ -81,24 +632,301 @@ class PersonaFactory:
         Returns:
             Path: Path to the exported file containing all personas
         """
+        if self.output_format == "jsonl":
+            return self.exporter.export_jsonl(personas, filename_prefix)
+        if self.output_format == "parquet":
+            return self.exporter.export_parquet(
+                personas, self.generator.schema, filename_prefix
+            )
         return self.exporter.export_multiple(
             personas, self.output_format, filename_prefix
         )
 
     def generate_and_export(
-        self, num_personas: int, filename_prefix: str = "personas"
+        self,
+        num_personas: int,
+        filename_prefix: str = "personas",
+        concurrency: int = 1,
+        batch_size: int = 1,
+        compact_format: Optional[str] = None,
+        journal: Optional[RunJournal] = None,
     ) -> Path:
         """
         Generate and export multiple personas in one operation.
 
+        With the "jsonl" and "parquet" output formats each persona is appended
+        to the output file as soon as it is generated instead of being held in
+        memory (Parquet row groups are written every 10000 personas).
+
         Args:
             num_personas: Number of personas to generate
             filename_prefix: Prefix for the output filename
+            concurrency: Maximum number of requests in flight at once
+            batch_size: Number of personas requested per chat completion
+            compact_format: With the "jsonl" output format, also compact the
+                stream into a single json or yaml document (optional)
+            journal: Optional run journal making the run resumable; it is
+                marked completed once the personas are exported
 
         Returns:
             Path: Path to the exported file containing all personas
         """
-        personas = self.generate_personas(num_personas)
-        return self.exporter.export_multiple(
-            personas, self.output_format, filename_prefix
+        output_path = self._generate_and_export(
+            num_personas,
+            filename_prefix,
+            concurrency,
+            batch_size,
+            compact_format,
+            journal,
+        )
+        if journal is not None:
+            journal.finish(output_path)
+        return output_path
+
+    def _generate_and_export(
+        self,
+        num_personas: int,
+        filename_prefix: str,
+        concurrency: int,
+        batch_size: int,
+        compact_format: Optional[str],
+        journal: Optional[RunJournal],
+    ) -> Path:
+        """Generate and export personas, see `generate_and_export`."""
+        return self._export(
+            lambda on_persona: self.generate_personas(
+                num_personas,
+                concurrency=concurrency,
+                batch_size=batch_size,
+                on_persona=on_persona,
+                journal=journal,
+            ),
+            filename_prefix,
+            compact_format,
+            journal,
+        )
+
+    def _export(
+        self,
+        produce: Callable[
+            [Optional[Callable[[Dict[str, Any]], None]]], List[Dict[str, Any]]
+        ],
+        filename_prefix: str,
+        compact_format: Optional[str],
+        journal: Optional[RunJournal] = None,
+    ) -> Path:
+        """
+        Export personas, streaming them to disk if the output format allows.
+
+        Args:
+            produce: Function delivering the personas to a callback, or
+                returning them when given None
+            filename_prefix: Prefix for the output filename
+            compact_format: With the "jsonl" output format, also compact the
+                stream into a single json or yaml document (optional)
+            journal: Journal of the run (optional); the leftovers of its
+                crashed JSONL streams are removed once they are replayed
+
+        Returns:
+            Path: Path to the exported file containing all personas
+        """
+        if self.output_format == "parquet":
+            with self.exporter.open_parquet(
+                self.generator.schema, filename_prefix
+            ) as stream:
+                produce(stream.write)
+            print(f"✅ {stream.count} personas streamed to {stream.path}!")
+            return stream.path
+
+        if self.output_format == "jsonl":
+            with self._open_jsonl_stream(filename_prefix) as stream:
+                produce(stream.write)
+            print(f"✅ {stream.count} personas streamed to {stream.path}!")
+            if journal is not None and getattr(stream, "recovered_path", None):
+                journal.discard_recovered(stream.path)
+            if compact_format:
+                return self.exporter.compact(
+                    stream.path, compact_format, filename_prefix
+                )
+            return stream.path
+
+        return self.export_personas(produce(None), filename_prefix)
+
+    def _open_jsonl_stream(self, filename_prefix: str) -> Any:
+        """Open a plain JSONL stream, or a sharded one if sharding is set."""
+        if self.shard_records or self.shard_bytes or self.compression:
+            return self.exporter.open_shards(
+                filename_prefix,
+                compression=self.compression or "gzip",
+                max_records=self.shard_records,
+                max_bytes=self.shard_bytes,
+                schema=self.generator.schema,
+            )
+        return self.exporter.open_stream(filename_prefix)
+
+    def run_batch_job(
+        self,
+        num_personas: int,
+        job_dir: str,
+        batch_size: int = 1,
+        filename_prefix: str = "personas",
+        poll_interval: float = 30.0,
+    ) -> Path:
+        """
+        Generate and export personas through the offline Batch API.
+
+        Running again with the same `job_dir` resumes the job where it
+        stopped instead of submitting a new one.
+
+        Args:
+            num_personas: Number of personas to generate
+            job_dir: Directory holding the job state and files
+            batch_size: Number of personas requested per chat completion
+            filename_prefix: Prefix for the output filename
+            poll_interval: Seconds between batch status checks
+
+        Returns:
+            Path: Path to the exported file containing all personas
+        """
+        job = BatchJob(self.generator, self.exporter, job_dir)
+        return job.run(
+            num_personas,
+            batch_size=batch_size,
+            output_format=self.output_format,
+            filename_prefix=filename_prefix,
+            poll_interval=poll_interval,
         )
+
+    def run_worker(
+        self,
+        queue: WorkQueue,
+        concurrency: int = 1,
+        worker: Optional[str] = None,
+        filename_prefix: str = "personas",
+        compact_format: Optional[str] = None,
+    ) -> Optional[Path]:
+        """
+        Generate the slots of a shared work queue alongside other workers.
+
+        The worker claims slots until none is left, keeping its leases alive
+        with heartbeats, and stores each slot's personas in the queue. Slots
+        that fail are released for another attempt. Once every slot is done,
+        exactly one worker exports the personas of the whole job, holding a
+        lease on the export; the others wait for it and take it over if the
+        exporter dies.
+
+        Near-duplicates are only checked among the personas of this worker.
+
+        Args:
+            queue: Work queue holding the submitted job
+            concurrency: Maximum number of requests in flight at once
+            worker: Identifier of the worker (default: host name and pid)
+            filename_prefix: Prefix for the output filename
+            compact_format: With the "jsonl" output format, also compact the
+                stream into a single json or yaml document (optional)
+
+        Returns:
+            Optional[Path]: Path to the exported file, if this worker exported
+                the job
+
+        Raises:
+            ValueError: If no job was submitted to the queue
+        """
+        worker = worker or WorkQueue.worker_id()
+        asyncio.run(self.awork(queue, concurrency, worker))
+        print(f"📋 Queue {queue.path}: {queue.summary()}")
+        poll_interval = min(1.0, queue.lease_seconds / 3)
+        while not queue.claim_export(worker):
+            if queue.exported is not None:
+                return None
+            time.sleep(poll_interval)
+
+        def produce(
+            on_persona: Optional[Callable[[Dict[str, Any]], None]],
+        ) -> List[Dict[str, Any]]:
+            if on_persona is None:
+                return list(queue.iter_personas())
+            for persona in queue.iter_personas():
+                on_persona(persona)
+            return []
+
+        # Keep the export lease alive while the personas are written
+        stop = threading.Event()
+
+        def heartbeat() -> None:
+            while not stop.wait(queue.lease_seconds / 3):
+                if not queue.heartbeat_export(worker):
+                    print("⚠️  Warning: Lease of the export was lost")
+                    return
+
+        heartbeats = threading.Thread(target=heartbeat, daemon=True)
+        heartbeats.start()
+        try:
+            output_path = self._export(produce, filename_prefix, compact_format)
+        finally:
+            stop.set()
+            heartbeats.join()
+        queue.finish_export(worker, output_path)
+        return output_path
+
+    async def awork(self, queue: WorkQueue, concurrency: int, worker: str) -> None:
+        """
+        Generate the slots of a work queue on the event loop, see `run_worker`.
+
+        Args:
+            queue: Work queue holding the submitted job
+            concurrency: Maximum number of requests in flight at once
+            worker: Identifier of the worker
+
+        Raises:
+            ValueError: If no job was submitted to the queue
+        """
+        if concurrency < 1:
+            raise ValueError("Concurrency must be at least 1")
+        layout = queue.layout
+        if layout is None:
+            raise ValueError(f"No job was submitted to queue {queue.path}")
+        num_personas = layout["num_personas"]
+        contexts = self._plan_contexts(num_personas)
+        held: List[int] = []
+        # Idle workers wait for the leases of the others, which may expire
+        poll_interval = min(1.0, queue.lease_seconds / 3)
+
+        async def heartbeat() -> None:
+            while True:
+                await asyncio.sleep(queue.lease_seconds / 3)
+                for start in queue.heartbeat(worker, held):
+                    print(f"⚠️  Warning: Lease of persona {start + 1} was lost")
+
+        async def run_slots() -> None:
+            while True:
+                claim = queue.claim(worker)
+                if claim is None:
+                    if queue.finished:
+                        return
+                    await asyncio.sleep(poll_interval)
+                    continue
+                start, count = claim
+                held.append(start)
+                try:
+                    personas = await self._agenerate_slot(
+                        start, count, num_personas, contexts
+                    )
+                except BaseException:
+                    queue.release(worker, start)
+                    raise
+                finally:
+                    held.remove(start)
+                if not personas:
+                    queue.release(worker, start)
+                elif not queue.complete(worker, start, personas):
+                    label = self._slot_label(start, count)
+                    print(f"⚠️  Warning: Persona {label} was completed elsewhere")
+
+        heartbeats = asyncio.ensure_future(heartbeat())
+        try:
+            await asyncio.gather(*(run_slots() for _ in range(concurrency)))
+        finally:
+            heartbeats.cancel()
+            await self.generator.aclose()
+        self._report_usage()
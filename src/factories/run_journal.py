@@ -0,0 +1,255 @@
+import json
+import os
+import secrets
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from src.exporters.persona_exporter import PersonaExporter
+
+
+class RunJournal:
+    """
+    Write-ahead log of a persona generation run.
+
+    The run parameters are saved to `run.json` when the run starts, and every
+    completed request slot is appended (and fsynced) to `journal.jsonl` with
+    its personas before they are delivered. A run that dies can be resumed
+    from its journal: slots already journaled are replayed instead of being
+    requested (and paid for) again, so only the missing personas are
+    generated. Slots that failed are not journaled and are retried. Once the
+    run completes its personas are in the export, so the journal is deleted
+    and only `run.json` (marked completed, with the export path) is kept.
+
+    Runs live in `<runs_dir>/<run_id>/`.
+    """
+
+    PARAMS_FILE = "run.json"
+    JOURNAL_FILE = "journal.jsonl"
+
+    def __init__(self, run_dir: str):
+        """
+        Open the journal of an existing run directory.
+
+        Args:
+            run_dir: Directory holding the run parameters and journal
+
+        Raises:
+            ValueError: If the directory holds no run
+        """
+        self.run_dir = Path(run_dir)
+        self.run_id = self.run_dir.name
+        params_path = self.run_dir / self.PARAMS_FILE
+        if not params_path.exists():
+            raise ValueError(f"No run found in {self.run_dir}")
+        with open(params_path) as f:
+            self.state: Dict[str, Any] = json.load(f)
+        self.journal_path = self.run_dir / self.JOURNAL_FILE
+        self._slots = self._load_slots()
+        self._file = None
+
+    @classmethod
+    def create(
+        cls, runs_dir: str, params: Dict[str, Any], run_id: Optional[str] = None
+    ) -> "RunJournal":
+        """
+        Start the journal of a new run.
+
+        Args:
+            runs_dir: Directory holding every run
+            params: Parameters of the run, saved so it can be resumed with the
+                same settings (must be JSON-serializable)
+            run_id: Identifier of the run (default: timestamp and random
+                suffix)
+
+        Returns:
+            RunJournal: The journal
+
+        Raises:
+            ValueError: If a run with this id already exists
+        """
+        run_id = run_id or f"{time.strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(3)}"
+        run_dir = Path(runs_dir) / run_id
+        if (run_dir / cls.PARAMS_FILE).exists():
+            raise ValueError(f"Run {run_id} already exists in {runs_dir}")
+        run_dir.mkdir(parents=True, exist_ok=True)
+        state = {
+            "run_id": run_id,
+            "status": "running",
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "params": params,
+        }
+        _write_json(run_dir / cls.PARAMS_FILE, state)
+        return cls(str(run_dir))
+
+    @classmethod
+    def resume(cls, runs_dir: str, run_id: str) -> "RunJournal":
+        """
+        Open the journal of an earlier run.
+
+        Args:
+            runs_dir: Directory holding every run
+            run_id: Identifier of the run
+
+        Returns:
+            RunJournal: The journal
+
+        Raises:
+            ValueError: If no such run exists
+        """
+        return cls(str(Path(runs_dir) / run_id))
+
+    @property
+    def params(self) -> Dict[str, Any]:
+        """Parameters the run was started with."""
+        return self.state["params"]
+
+    @property
+    def status(self) -> str:
+        """'running' until the run is marked completed."""
+        return self.state["status"]
+
+    def _load_slots(self) -> Dict[int, List[Dict[str, Any]]]:
+        """
+        Read the journaled slots, dropping a record torn by a crash.
+
+        Returns:
+            Dict[int, List[Dict[str, Any]]]: Personas by slot start index
+        """
+        if not self.journal_path.exists():
+            return {}
+        slots = {
+            record["start"]: record["personas"]
+            for record in PersonaExporter.iter_jsonl(self.journal_path)
+        }
+        # End the last line, or cut it off if it is torn, so new records
+        # start on a line of their own
+        with open(self.journal_path, "rb+") as f:
+            content = f.read()
+            if content and not content.endswith(b"\n"):
+                last_line = content[content.rfind(b"\n") + 1 :]
+                try:
+                    json.loads(last_line)
+                    f.write(b"\n")
+                except ValueError:
+                    f.truncate(content.rfind(b"\n") + 1)
+        return slots
+
+    def check(self, num_personas: int, batch_size: int) -> None:
+        """
+        Make sure a run is resumed with the slots it was journaled with.
+
+        Args:
+            num_personas: Number of personas of the run
+            batch_size: Number of personas per request slot
+
+        Raises:
+            ValueError: If the journal belongs to a different run layout
+        """
+        layout = self.state.setdefault(
+            "layout", {"num_personas": num_personas, "batch_size": batch_size}
+        )
+        if layout != {"num_personas": num_personas, "batch_size": batch_size}:
+            raise ValueError(
+                f"Run {self.run_id} was started with {layout['num_personas']} "
+                f"personas in batches of {layout['batch_size']}"
+            )
+        _write_json(self.run_dir / self.PARAMS_FILE, self.state)
+
+    def completed(self) -> Dict[int, List[Dict[str, Any]]]:
+        """
+        Return the slots completed so far.
+
+        Returns:
+            Dict[int, List[Dict[str, Any]]]: Personas by slot start index
+        """
+        return dict(self._slots)
+
+    def record(self, start: int, count: int, personas: List[Dict[str, Any]]) -> None:
+        """
+        Durably append a completed slot before its personas are delivered.
+
+        Args:
+            start: Index of the first persona of the slot
+            count: Number of personas requested by the slot
+            personas: The valid personas of the slot
+        """
+        if self._file is None:
+            self._file = open(self.journal_path, "a")
+        record = {"start": start, "count": count, "personas": personas}
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._slots[start] = personas
+
+    def discard_recovered(self, stream_path: Path) -> List[Path]:
+        """
+        Delete the records of crashed attempts that the journal holds.
+
+        A JSONL stream that dies leaves its records in a `.part` file, moved
+        aside to `<name>.part.N` by the next attempt. Once a resumed run has
+        replayed the journal into its export, a `.part.N` file whose records
+        are all journaled is a stale copy and is deleted. Files holding
+        anything else are kept.
+
+        Args:
+            stream_path: Final path of the JSONL stream of the run
+
+        Returns:
+            List[Path]: The deleted files
+        """
+        stream_path = Path(stream_path)
+        journaled = {
+            json.dumps(persona, sort_keys=True)
+            for personas in self._slots.values()
+            for persona in personas
+        }
+        discarded = []
+        for path in sorted(stream_path.parent.glob(f"{stream_path.name}.part.*")):
+            records = PersonaExporter.iter_jsonl(path)
+            if all(json.dumps(r, sort_keys=True) in journaled for r in records):
+                path.unlink()
+                discarded.append(path)
+                print(f"🧹 Removed {path}: its records are in the resumed export")
+        return discarded
+
+    def finish(self, export_path: Optional[Path] = None) -> None:
+        """
+        Mark the run completed and delete its journal.
+
+        Args:
+            export_path: Path of the exported personas (optional)
+        """
+        self.close()
+        self.state.update(
+            status="completed", export_path=str(export_path) if export_path else None
+        )
+        _write_json(self.run_dir / self.PARAMS_FILE, self.state)
+        self.journal_path.unlink(missing_ok=True)
+
+    def close(self) -> None:
+        """Close the journal file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def summary(self) -> str:
+        """
+        Human-readable progress of the run.
+
+        Returns:
+            str: The summary line
+        """
+        personas = sum(len(slot) for slot in self._slots.values())
+        return (
+            f"run {self.run_id}: {len(self._slots)} slot(s) and {personas} "
+            "persona(s) journaled"
+        )
+
+
+def _write_json(path: Path, data: Dict[str, Any]) -> None:
+    """Write a JSON file atomically."""
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=4)
+    tmp_path.replace(path)
@@ -0,0 +1,427 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+SLOT_STATES = ("pending", "leased", "done", "failed")
+
+
+class WorkQueue:
+    """
+    Shared queue splitting one generation job between several workers.
+
+    The job is divided into request slots stored in a SQLite database that
+    every worker opens. A worker claims a slot by taking a lease on it, keeps
+    the lease alive with heartbeats while the slot is generated, and then
+    completes it with its personas or releases it on failure. A lease that
+    is not renewed in time (the worker died or hung) expires, and the slot
+    goes back to the other workers. Completing a slot requires holding its
+    lease, so the personas of a slot are only ever stored once.
+
+    SQLite is a stand-in for a shared queue service: several processes of a
+    machine can share the database, and several machines can share it on a
+    network filesystem with working file locks.
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 60.0, max_attempts: int = 3):
+        """
+        Open (or create) the queue database.
+
+        Args:
+            path: Path to the SQLite database file
+            lease_seconds: Time a claim is held without a heartbeat
+            max_attempts: Claims of a slot before it is marked failed
+        """
+        if lease_seconds <= 0:
+            raise ValueError("Lease duration must be positive")
+        if max_attempts < 1:
+            raise ValueError("Max attempts must be at least 1")
+
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.path),
+            timeout=30.0,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS job (key TEXT PRIMARY KEY, value TEXT)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS slots ("
+            " start INTEGER PRIMARY KEY,"
+            " count INTEGER NOT NULL,"
+            " state TEXT NOT NULL DEFAULT 'pending',"
+            " worker TEXT,"
+            " lease_expires REAL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " personas TEXT)"
+        )
+
+    @staticmethod
+    def worker_id() -> str:
+        """
+        Identify the current worker process.
+
+        Returns:
+            str: Host name and process id
+        """
+        return f"{socket.gethostname()}-{os.getpid()}"
+
+    def _transaction(self) -> "_Transaction":
+        """Start a write transaction, serialized across workers."""
+        return _Transaction(self._conn, self._lock)
+
+    def submit(
+        self,
+        num_personas: int,
+        batch_size: int = 1,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Submit the job, unless a worker already did.
+
+        Every worker may call this on start; the first call creates the slots,
+        later ones join the job that is already queued.
+
+        Args:
+            num_personas: Number of personas of the job
+            batch_size: Number of personas per request slot
+            params: Settings of the job, shared with every worker (must be
+                JSON-serializable)
+
+        Returns:
+            Dict[str, Any]: The settings of the queued job, which may have
+                been submitted by another worker
+
+        Raises:
+            ValueError: If the queue holds a job with another slot layout
+        """
+        if batch_size < 1:
+            raise ValueError("Batch size must be at least 1")
+        layout = {"num_personas": num_personas, "batch_size": batch_size}
+        with self._transaction() as conn:
+            row = conn.execute("SELECT value FROM job WHERE key = 'job'").fetchone()
+            if row is not None:
+                job = json.loads(row[0])
+                if job["layout"] != layout:
+                    raise ValueError(
+                        f"Queue {self.path} holds a job of "
+                        f"{job['layout']['num_personas']} personas in batches "
+                        f"of {job['layout']['batch_size']}"
+                    )
+                return job["params"]
+            job = {"layout": layout, "params": params or {}}
+            conn.execute(
+                "INSERT INTO job (key, value) VALUES ('job', ?)", (json.dumps(job),)
+            )
+            conn.executemany(
+                "INSERT INTO slots (start, count) VALUES (?, ?)",
+                [
+                    (start, min(batch_size, num_personas - start))
+                    for start in range(0, num_personas, batch_size)
+                ],
+            )
+            return job["params"]
+
+    def _job(self) -> Optional[Dict[str, Any]]:
+        """Read the submitted job, if any."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM job WHERE key = 'job'"
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    @property
+    def layout(self) -> Optional[Dict[str, int]]:
+        """Number of personas and batch size of the queued job, if any."""
+        job = self._job()
+        return job["layout"] if job else None
+
+    @property
+    def params(self) -> Optional[Dict[str, Any]]:
+        """Settings the queued job was submitted with, if any."""
+        job = self._job()
+        return job["params"] if job else None
+
+    def claim(self, worker: str) -> Optional[Tuple[int, int]]:
+        """
+        Lease the next slot that is pending or whose lease expired.
+
+        Args:
+            worker: Identifier of the claiming worker
+
+        Returns:
+            Optional[Tuple[int, int]]: (first persona index, persona count) of
+                the claimed slot, or None if no slot is available right now
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            # Expired leases that used up their attempts are given up on
+            conn.execute(
+                "UPDATE slots SET state = 'failed', worker = NULL"
+                " WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, self.max_attempts),
+            )
+            row = conn.execute(
+                "SELECT start, count FROM slots"
+                " WHERE state = 'pending' OR (state = 'leased' AND lease_expires < ?)"
+                " ORDER BY start LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE slots SET state = 'leased', worker = ?, lease_expires = ?,"
+                " attempts = attempts + 1 WHERE start = ?",
+                (worker, now + self.lease_seconds, row[0]),
+            )
+            return row[0], row[1]
+
+    def heartbeat(self, worker: str, starts: List[int]) -> List[int]:
+        """
+        Renew the leases a worker holds.
+
+        Args:
+            worker: Identifier of the worker
+            starts: Start indexes of the slots it is working on
+
+        Returns:
+            List[int]: The slots whose lease was lost (expired and claimed by
+                another worker, or completed)
+        """
+        lost = []
+        with self._transaction() as conn:
+            for start in starts:
+                renewed = conn.execute(
+                    "UPDATE slots SET lease_expires = ?"
+                    " WHERE start = ? AND state = 'leased' AND worker = ?",
+                    (time.time() + self.lease_seconds, start, worker),
+                ).rowcount
+                if not renewed:
+                    lost.append(start)
+        return lost
+
+    def complete(self, worker: str, start: int, personas: List[Dict[str, Any]]) -> bool:
+        """
+        Store the personas of a slot and mark it done.
+
+        Args:
+            worker: Identifier of the worker
+            start: Start index of the slot
+            personas: The valid personas of the slot
+
+        Returns:
+            bool: False if the worker no longer held the lease, in which case
+                the personas are discarded
+        """
+        with self._transaction() as conn:
+            return bool(
+                conn.execute(
+                    "UPDATE slots SET state = 'done', worker = NULL,"
+                    " lease_expires = NULL, personas = ?"
+                    " WHERE start = ? AND state = 'leased' AND worker = ?",
+                    (json.dumps(personas), start, worker),
+                ).rowcount
+            )
+
+    def release(self, worker: str, start: int) -> None:
+        """
+        Give a claimed slot back after a failure.
+
+        The slot is claimed again by any worker, unless it used up its
+        attempts, in which case it is marked failed.
+
+        Args:
+            worker: Identifier of the worker
+            start: Start index of the slot
+        """
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE slots SET worker = NULL, lease_expires = NULL,"
+                " state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END"
+                " WHERE start = ? AND state = 'leased' AND worker = ?",
+                (self.max_attempts, start, worker),
+            )
+
+    def counts(self) -> Dict[str, int]:
+        """
+        Count the slots in each state.
+
+        Returns:
+            Dict[str, int]: Number of slots by state
+        """
+        counts = dict.fromkeys(SLOT_STATES, 0)
+        with self._lock:
+            counts.update(
+                self._conn.execute(
+                    "SELECT state, COUNT(*) FROM slots GROUP BY state"
+                ).fetchall()
+            )
+        return counts
+
+    @property
+    def finished(self) -> bool:
+        """Whether every slot is done or failed."""
+        counts = self.counts()
+        return not counts["pending"] and not counts["leased"]
+
+    def claim_export(self, worker: str) -> bool:
+        """
+        Elect the worker exporting the personas of the finished job.
+
+        The export is leased like a slot: the exporter renews the lease with
+        `heartbeat_export` and ends it with `finish_export`. If the exporter
+        dies, its lease expires and the next worker to call this takes the
+        export over.
+
+        Args:
+            worker: Identifier of the worker
+
+        Returns:
+            bool: True if the worker now holds the export lease
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT value FROM job WHERE key = 'exporter'"
+            ).fetchone()
+            if row is not None:
+                export = json.loads(row[0])
+                if export["path"] is not None or (
+                    export["worker"] != worker and export["lease_expires"] >= now
+                ):
+                    return False
+            export = {
+                "worker": worker,
+                "lease_expires": now + self.lease_seconds,
+                "path": None,
+            }
+            conn.execute(
+                "INSERT OR REPLACE INTO job (key, value) VALUES ('exporter', ?)",
+                (json.dumps(export),),
+            )
+            return True
+
+    def _update_export(self, worker: str, **changes: Any) -> bool:
+        """Update the export lease, if the worker still holds it."""
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT value FROM job WHERE key = 'exporter'"
+            ).fetchone()
+            export = json.loads(row[0]) if row else None
+            if export is None or export["worker"] != worker or export["path"]:
+                return False
+            export.update(changes)
+            conn.execute(
+                "UPDATE job SET value = ? WHERE key = 'exporter'",
+                (json.dumps(export),),
+            )
+            return True
+
+    def heartbeat_export(self, worker: str) -> bool:
+        """
+        Renew the export lease.
+
+        Args:
+            worker: Identifier of the exporting worker
+
+        Returns:
+            bool: False if the lease was lost (expired and taken over)
+        """
+        return self._update_export(
+            worker, lease_expires=time.time() + self.lease_seconds
+        )
+
+    def finish_export(self, worker: str, path: Path) -> bool:
+        """
+        Record that the job was exported, ending the export lease.
+
+        Args:
+            worker: Identifier of the exporting worker
+            path: Path to the exported file
+
+        Returns:
+            bool: False if the lease was lost (expired and taken over)
+        """
+        return self._update_export(worker, path=str(path))
+
+    @property
+    def exported(self) -> Optional[str]:
+        """Path to the export of the job, once a worker finished it."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM job WHERE key = 'exporter'"
+            ).fetchone()
+        return json.loads(row[0])["path"] if row else None
+
+    def iter_personas(self) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over the personas of every done slot, in request order.
+
+        Yields:
+            Dict[str, Any]: The next persona
+        """
+        with self._lock:
+            starts = self._conn.execute(
+                "SELECT start FROM slots WHERE state = 'done' ORDER BY start"
+            ).fetchall()
+        # One slot at a time, so a large job is never held in memory at once
+        for (start,) in starts:
+            with self._lock:
+                (personas,) = self._conn.execute(
+                    "SELECT personas FROM slots WHERE start = ?", (start,)
+                ).fetchone()
+            yield from json.loads(personas)
+
+    def summary(self) -> str:
+        """
+        Human-readable progress of the job.
+
+        Returns:
+            str: The summary line
+        """
+        counts = self.counts()
+        return ", ".join(f"{counts[state]} {state}" for state in SLOT_STATES)
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self._conn.close()
+
+    def __enter__(self) -> "WorkQueue":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+class _Transaction:
+    """Immediate (write-locked) SQLite transaction, committed on success."""
+
+    def __init__(self, conn: sqlite3.Connection, lock: threading.Lock):
+        self.conn = conn
+        self.lock = lock
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.lock.acquire()
+        try:
+            self.conn.execute("BEGIN IMMEDIATE")
+        except BaseException:
+            self.lock.release()
+            raise
+        return self.conn
+
+    def __exit__(self, exc_type: Any, *exc_info: Any) -> None:
+        try:
+            self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.lock.release()
@@ -1,7 +1,8 @@
+import json
 import os
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Collection, Dict, List, Optional
 
 import yaml
 
@@ -12,7 +13,10 @@ from src.generators.config.config_loader import (
     ResponseConfig,
     ValidationConfig,
 )
+from src.monitoring.metrics import METRICS
+from src.schemas.json_schema import response_format
 from src.schemas.loader import SchemaLoader
+from src.schemas.persona_validator import PersonaValidator, Violation
 
 
 class BaseGenerator(ABC):
@@ -36,8 +40,40 @@ class BaseGenerator(ABC):
             config_path (Optional[str]): Path to the generator config file
         """
         self.schema_path = schema_path
-        self.schema = self._load_schema() if schema_path else None
-        self.config = self._load_config(config_path) if config_path else None
+        self._static_prompt: Optional[str] = None
+        self._response_formats: Dict[Any, Dict[str, Any]] = {}
+        self.schema = None
+        self.config = None
+        if schema_path:
+            with METRICS.span("schema_load"):
+                self.schema = self._load_schema()
+        if config_path:
+            with METRICS.span("config_load"):
+                self.config = self._load_config(config_path)
+
+    @property
+    def schema(self) -> Optional[Any]:
+        """The loaded schema."""
+        return self._schema
+
+    @schema.setter
+    def schema(self, schema: Optional[Any]) -> None:
+        # Everything derived from the schema is rebuilt when it is replaced
+        self._schema = schema
+        self.validator = PersonaValidator(schema) if schema else None
+        self._static_prompt = None
+        self._response_formats = {}
+
+    @property
+    def config(self) -> Optional[GeneratorConfig]:
+        """The loaded generator configuration."""
+        return self._config
+
+    @config.setter
+    def config(self, config: Optional[GeneratorConfig]) -> None:
+        self._config = config
+        self._static_prompt = None
+        self._response_formats = {}
 
     def _load_schema(self) -> Dict[str, Any]:
         """
@@ -109,21 +145,142 @@ class BaseGenerator(ABC):
             raise ValueError("Configuration not loaded")
         return self.config.prompts.system
 
+    def _get_static_user_prompt(self) -> str:
+        """
+        Get the part of the user prompt that is identical for every persona.
+
+        The template is rendered with the serialized schema on first use and
+        kept until the schema or config is replaced, so requests neither
+        re-serialize the schema nor re-format the template.
+
+        Returns:
+            str: The rendered user prompt without additional context
+        """
+        if not self.config:
+            raise ValueError("Configuration not loaded")
+
+        if self._static_prompt is None:
+            self._static_prompt = self.config.prompts.user.format(
+                schema=self.schema.model_dump_json(), additional_context=""
+            )
+        return self._static_prompt
+
+    def _get_context_prompt(self, prompt: Optional[str] = None) -> str:
+        """
+        Get the per-persona part of the user prompt.
+
+        Args:
+            prompt (Optional[str]): Additional context for generation
+
+        Returns:
+            str: The additional context, or an empty string
+        """
+        return f"Additional context: {prompt}\n" if prompt else ""
+
     def _get_user_prompt(self, prompt: Optional[str] = None) -> str:
         """
         Get the user prompt for persona generation.
 
+        The per-persona context is placed after the static part so that
+        every request shares the longest possible prompt prefix, which lets
+        provider-side prompt caching apply.
+
         Args:
             prompt (Optional[str]): Additional context for generation
 
         Returns:
             str: The user prompt
         """
+        return self._get_static_user_prompt() + self._get_context_prompt(prompt)
+
+    def _get_batch_prompt(self, count: int) -> str:
+        """
+        Get the instruction that turns a single-persona request into a batch.
+
+        With the json_schema response format, batches are returned wrapped
+        in a `personas` object, and the instruction says so.
+
+        Args:
+            count (int): Number of personas to request
+
+        Returns:
+            str: The batch instruction
+        """
+        if not self.config:
+            raise ValueError("Configuration not loaded")
+        if self.config.response.format == "json_schema":
+            return self.config.prompts.structured_batch.format(count=count)
+        return self.config.prompts.batch.format(count=count)
+
+    def _get_response_format(
+        self, count: int = 1, fields: Optional[Collection[str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Get the structured output format of a request, if the config asks
+        for one.
+
+        The schema is compiled to JSON Schema once per kind of request and
+        kept until the schema or config is replaced.
+
+        Args:
+            count (int): Number of personas requested
+            fields (Optional[Collection[str]]): Names of the only fields
+                requested (repair requests)
+
+        Returns:
+            Optional[Dict[str, Any]]: The `response_format`, or None to
+                request the format in the prompt only
+        """
+        if not self.config or self.config.response.format != "json_schema":
+            return None
+
+        key = (count > 1, tuple(fields) if fields is not None else None)
+        if key not in self._response_formats:
+            self._response_formats[key] = response_format(
+                self.schema,
+                batch=count > 1,
+                fields=fields,
+                strict=self.config.response.strict,
+            )
+        return self._response_formats[key]
+
+    def _get_repair_prompt(
+        self, persona: Dict[str, Any], errors: List[Violation]
+    ) -> str:
+        """
+        Get the prompt asking to regenerate only the invalid fields.
+
+        Each failed field is described by its definition, its current value
+        and the violations found, so the request stays small even for large
+        schemas.
+
+        Args:
+            persona (Dict[str, Any]): The persona that failed validation
+            errors (List[Violation]): Its violations
+
+        Returns:
+            str: The repair prompt
+        """
         if not self.config:
             raise ValueError("Configuration not loaded")
-        return self.config.prompts.user.format(
-            schema=self.schema.model_dump_json(),
-            additional_context=(f"Additional context: {prompt}\n" if prompt else ""),
+
+        fields: Dict[str, Dict[str, Any]] = {}
+        for error in errors:
+            if error.field not in fields:
+                field_def = self.schema.fields[error.field]
+                fields[error.field] = {
+                    "definition": field_def.model_dump(
+                        exclude_none=True, exclude={"characteristics"}
+                    ),
+                    "problems": [],
+                }
+                if error.field in persona:
+                    fields[error.field]["current_value"] = persona[error.field]
+            fields[error.field]["problems"].append(error.message)
+
+        return self.config.prompts.repair.format(
+            fields=json.dumps(fields, indent=2, ensure_ascii=False),
+            names=", ".join(fields),
         )
 
     @abstractmethod
@@ -153,72 +310,66 @@ class BaseGenerator(ABC):
         Returns:
             bool: True if the persona is valid, False otherwise
         """
-        if not self.schema:
-            raise ValueError("Schema not loaded. Please provide a schema path.")
-
         if not self.config:
             raise ValueError("Configuration not loaded")
 
-        # Check that all required fields are present
-        for field_name, field_def in self.schema.fields.items():
-            if field_def.required and field_name not in persona:
-                if self.config.validation.log_validation_errors:
-                    print(f"Missing required field: {field_name}")
-                return False
-
-            # Check field type
-            if field_name in persona:
-                field_value = persona[field_name]
-                if field_def.type == "string" and not isinstance(field_value, str):
-                    if self.config.validation.log_validation_errors:
-                        print(f"Field {field_name} should be a string")
-                    return False
-                elif field_def.type == "number" and not isinstance(
-                    field_value, (int, float)
-                ):
-                    if self.config.validation.log_validation_errors:
-                        print(f"Field {field_name} should be a number")
-                    return False
-                elif field_def.type == "boolean" and not isinstance(field_value, bool):
-                    if self.config.validation.log_validation_errors:
-                        print(f"Field {field_name} should be a boolean")
-                    return False
-                elif field_def.type == "array" and not isinstance(field_value, list):
-                    if self.config.validation.log_validation_errors:
-                        print(f"Field {field_name} should be an array")
-                    return False
-                elif field_def.type == "object" and not isinstance(field_value, dict):
-                    if self.config.validation.log_validation_errors:
-                        print(f"Field {field_name} should be an object")
-                    return False
-
-                # Check string length constraints
-                if field_def.type == "string" and isinstance(field_value, str):
-                    if field_def.min_length and len(field_value) < field_def.min_length:
-                        if self.config.validation.log_validation_errors:
-                            print(
-                                f"Field {field_name} is too short "
-                                f"(min length: {field_def.min_length})"
-                            )
-                        return False
-                    if field_def.max_length and len(field_value) > field_def.max_length:
-                        if self.config.validation.log_validation_errors:
-                            print(
-                                f"Field {field_name} is too long "
-                                f"(max length: {field_def.max_length})"
-                            )
-                        return False
-
-                # Check options if specified
-                if field_def.options and field_value not in field_def.options:
-                    if self.config.validation.log_validation_errors:
-                        print(
-                            f"Field {field_name} value '{field_value}' "
-                            f"not in allowed options: {field_def.options}"
-                        )
-                    return False
-
-        return True
+        if not self.config.validation.log_validation_errors:
+            with METRICS.span("validate"):
+                return self._get_validator().is_valid(persona)
+
+        errors = self.validation_errors(persona)
+        self._log_violations(errors)
+        return not errors
+
+    def _log_violations(self, errors: List[Violation]) -> None:
+        """
+        Print violations if the config asks for validation errors to be logged.
+
+        Args:
+            errors (List[Violation]): The violations to report
+        """
+        if self.config and self.config.validation.log_validation_errors:
+            for error in errors:
+                print(error.message)
+
+    def validation_errors(self, persona: Dict[str, Any]) -> List[Violation]:
+        """
+        List every constraint the persona violates.
+
+        Args:
+            persona (Dict[str, Any]): The persona data to validate
+
+        Returns:
+            List[Violation]: The violations, empty if the persona is valid
+        """
+        with METRICS.span("validate"):
+            return self._get_validator().errors(persona)
+
+    def validate_many(self, personas: List[Dict[str, Any]]) -> List[List[Violation]]:
+        """
+        Validate many personas in one call.
+
+        Args:
+            personas (List[Dict[str, Any]]): The persona data to validate
+
+        Returns:
+            List[List[Violation]]: The violations of each persona, in order
+        """
+        return self._get_validator().validate_many(personas)
+
+    def _get_validator(self) -> PersonaValidator:
+        """
+        Get the compiled validator of the loaded schema.
+
+        Returns:
+            PersonaValidator: The compiled validator
+
+        Raises:
+            ValueError: If no schema is loaded
+        """
+        if self.validator is None:
+            raise ValueError("Schema not loaded. Please provide a schema path.")
+        return self.validator
 
     def export(self, persona: Dict[str, Any], format: str = "json") -> str:
         """
@@ -234,10 +385,8 @@ class BaseGenerator(ABC):
         Raises:
             ValueError: If the format is not supported
         """
-        if not self.config:
-            raise ValueError("Configuration not loaded")
-
-        if format == self.config.response.format:
-            return yaml.dump(persona, indent=2)
-        else:
-            raise ValueError(f"Unsupported export format: {format}")
+        if format == "json":
+            return json.dumps(persona, indent=2, ensure_ascii=False)
+        if format == "yaml":
+            return yaml.dump(persona, indent=2, allow_unicode=True)
+        raise ValueError(f"Unsupported export format: {format}")
@@ -1,21 +1,67 @@
 import os
-from typing import Dict, Optional
+from typing import Dict, List, Literal, Optional
 
 import yaml
 from pydantic import BaseModel, Field
 
+from src.schemas.registry import REGISTRY
+
 
 class PromptConfig(BaseModel):
     """Configuration for generator prompts."""
 
     system: str = Field(..., description="System prompt template")
     user: str = Field(..., description="User prompt template")
+    batch: str = Field(
+        (
+            "Generate {count} distinct personas instead of one. Return ONLY a "
+            "JSON array containing exactly {count} persona objects, each "
+            "following the schema and constraints above."
+        ),
+        description="Instruction template appended when batching personas",
+    )
+    structured_batch: str = Field(
+        (
+            "Generate {count} distinct personas instead of one. Return ONLY a "
+            'JSON object whose "personas" array contains exactly {count} '
+            "persona objects, each following the schema and constraints above."
+        ),
+        description=(
+            "Batch instruction used instead of `batch` with the json_schema "
+            "response format, whose batches are wrapped in an object"
+        ),
+    )
+    repair: str = Field(
+        (
+            "Some fields of a generated persona violate the schema:\n{fields}\n\n"
+            "Regenerate ONLY these fields ({names}) so that they satisfy their "
+            "definitions, staying close to the current values where possible. "
+            "Return ONLY a JSON object whose keys are exactly these field names."
+        ),
+        description="Template of the follow-up request repairing invalid fields",
+    )
 
 
 class ResponseConfig(BaseModel):
     """Configuration for response handling."""
 
-    format: str = Field("json", description="Response format")
+    format: Literal["json", "json_schema"] = Field(
+        "json",
+        description=(
+            "Response format: json (requested in the prompt) or json_schema "
+            "(structured outputs enforcing the schema compiled to JSON Schema)"
+        ),
+    )
+    strict: bool = Field(
+        True, description="Ask for strict adherence to the json_schema format"
+    )
+    stream: bool = Field(
+        False,
+        description=(
+            "Stream single-persona completions, validating each field as it "
+            "arrives and cancelling the response at the first invalid one"
+        ),
+    )
     ensure_valid_json: bool = Field(True, description="Ensure valid JSON")
 
 
@@ -24,6 +70,61 @@ class ValidationConfig(BaseModel):
 
     strict_mode: bool = Field(True, description="Enable strict validation")
     log_validation_errors: bool = Field(True, description="Log validation errors")
+    max_repair_attempts: int = Field(
+        1, description="Follow-up requests repairing only the invalid fields"
+    )
+
+
+class RateLimitConfig(BaseModel):
+    """Configuration for client-side rate limiting."""
+
+    requests_per_minute: Optional[int] = Field(
+        None, description="Requests per minute (learned from headers if unset)"
+    )
+    tokens_per_minute: Optional[int] = Field(
+        None, description="Tokens per minute (learned from headers if unset)"
+    )
+    estimated_completion_tokens: int = Field(
+        600, description="Completion tokens pre-charged per requested persona"
+    )
+    max_retries: int = Field(6, description="Retries of a throttled request")
+    max_connection_retries: int = Field(
+        2, description="Retries of a connection or server error"
+    )
+    max_backoff: float = Field(60.0, description="Maximum retry delay in seconds")
+
+
+class ProviderConfig(BaseModel):
+    """Configuration of one backend of a provider pool."""
+
+    name: str = Field(..., description="Name of the backend in logs and metrics")
+    model: Optional[str] = Field(
+        None, description="Model served by the backend (default: the config model)"
+    )
+    base_url: Optional[str] = Field(
+        None, description="Base URL of an OpenAI-compatible API (default: OpenAI)"
+    )
+    api_key_env: str = Field(
+        "OPENAI_API_KEY", description="Environment variable holding the API key"
+    )
+    weight: float = Field(
+        1.0, gt=0, description="Relative share of the requests routed to it"
+    )
+    rate_limit: Optional[RateLimitConfig] = Field(
+        None, description="Quota of the backend (default: the config rate limit)"
+    )
+
+
+class RoutingConfig(BaseModel):
+    """Configuration of the request routing across a provider pool."""
+
+    strategy: Literal["weighted", "least-loaded"] = Field(
+        "weighted", description="Weighted round-robin or least-loaded routing"
+    )
+    failure_threshold: int = Field(
+        3, ge=1, description="Consecutive failures marking a backend unhealthy"
+    )
+    cooldown: float = Field(30.0, description="Seconds an unhealthy backend is skipped")
 
 
 class GeneratorConfig(BaseModel):
@@ -32,6 +133,27 @@ class GeneratorConfig(BaseModel):
     prompts: PromptConfig
     response: ResponseConfig
     validation: ValidationConfig
+    model: str = Field("gpt-4", description="Model of the chat completions")
+    rate_limit: RateLimitConfig = Field(default_factory=RateLimitConfig)
+    providers: List[ProviderConfig] = Field(
+        default_factory=list,
+        description="Backends requests are routed across (default: one backend "
+        "from OPENAI_API_KEY and OPENAI_BASE_URL)",
+    )
+    routing: RoutingConfig = Field(default_factory=RoutingConfig)
+
+
+def _parse_config(content: bytes) -> GeneratorConfig:
+    """Parse and validate a generator config file."""
+    try:
+        config_data = yaml.safe_load(content)
+    except yaml.YAMLError as e:
+        raise ValueError(f"Invalid YAML format: {e}")
+
+    try:
+        return GeneratorConfig(**config_data)
+    except Exception as e:
+        raise ValueError(f"Config validation failed: {e}")
 
 
 class ConfigLoader:
@@ -50,6 +172,10 @@ class ConfigLoader:
     ) -> GeneratorConfig:
         """Load a configuration file.
 
+        Validated configs are cached process-wide by path, mtime and content
+        hash (see `src.schemas.registry`); the returned object is shared and
+        read-only.
+
         Args:
             config_path (str): Full path to the config file (optional)
             config_name (str): Name of the config file (without extension)
@@ -68,16 +194,7 @@ class ConfigLoader:
         if not os.path.exists(path):
             raise FileNotFoundError(f"Config file not found: {path}")
 
-        try:
-            with open(path, "r") as f:
-                config_data = yaml.safe_load(f)
-        except yaml.YAMLError as e:
-            raise ValueError(f"Invalid YAML format: {e}")
-
-        try:
-            return GeneratorConfig(**config_data)
-        except Exception as e:
-            raise ValueError(f"Config validation failed: {e}")
+        return REGISTRY.load("config", path, _parse_config)
 
     def get_prompt(self, config: GeneratorConfig, prompt_type: str, **kwargs) -> str:
         """Get a formatted prompt from the configuration.
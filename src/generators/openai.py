@@ -1,9 +1,31 @@
+import asyncio
+import hashlib
+import itertools
+import json
 import os
-from typing import Any, Dict, Optional
+import time
+from pathlib import Path
+from typing import Any, Collection, Dict, List, Optional, Tuple
 
-from openai import OpenAI
+import openai
+from openai import AsyncOpenAI, OpenAI
+from openai.types.chat import ChatCompletion
 
 from src.generators.base_generator import BaseGenerator
+from src.generators.post_processor import ParseError, PostProcessor, batch_items
+from src.generators.provider_pool import Provider, ProviderPool
+from src.generators.rate_limiter import RateLimiter
+from src.generators.response_cache import ResponseCache
+from src.generators.streaming import PersonaStream
+from src.generators.usage import TokenUsage
+from src.monitoring.metrics import METRICS
+from src.schemas.json_schema import strip_nulls
+from src.schemas.persona_validator import Violation
+
+
+def _failed(errors: List[Violation]) -> Dict[str, None]:
+    """Names of the fields with violations, in order and without repeats."""
+    return dict.fromkeys(error.field for error in errors)
 
 
 class OpenAIGenerator(BaseGenerator):
@@ -16,8 +38,12 @@ class OpenAIGenerator(BaseGenerator):
         self,
         schema_path: Optional[str] = None,
         config_path: Optional[str] = None,
-        model: str = "gpt-4",
+        model: Optional[str] = None,
         temperature: float = 0.9,
+        base_url: Optional[str] = None,
+        cache: Optional[ResponseCache] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        stream: Optional[bool] = None,
     ):
         """
         Initialize the OpenAI generator.
@@ -25,41 +51,181 @@ class OpenAIGenerator(BaseGenerator):
         Args:
             schema_path (Optional[str]): Path to the schema file
             config_path (Optional[str]): Path to the generator config file
-            model (str): The OpenAI model to use
+            model (Optional[str]): The OpenAI model to use (default: the
+                `model` of the generator config, or gpt-4 without a config)
             temperature (float): Sampling temperature (0.0 to 1.0)
+            base_url (Optional[str]): Base URL of an OpenAI-compatible API.
+                Defaults to the `OPENAI_BASE_URL` environment variable or the
+                public OpenAI endpoint.
+            cache (Optional[ResponseCache]): On-disk response cache consulted
+                before calling the API
+            rate_limiter (Optional[RateLimiter]): Rate limiter shared by all
+                requests. Defaults to one built from the `rate_limit` section
+                of the generator config.
+            stream (Optional[bool]): Stream single-persona completions and
+                cancel them at the first invalid field. Defaults to the
+                `response.stream` setting of the generator config.
         """
         super().__init__(schema_path, config_path)
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        self.model = model
+        # Created on first use, so dry runs work without an API key
+        self._client: Optional[OpenAI] = None
+        self._base_url = base_url
+        self._async_client: Optional[AsyncOpenAI] = None
+        self.model = model or (self.config.model if self.config else "gpt-4")
         self.temperature = temperature
+        self.cache = cache
+        if rate_limiter is None:
+            rate_limiter = (
+                RateLimiter.from_config(self.config.rate_limit)
+                if self.config
+                else RateLimiter()
+            )
+        self.rate_limiter = rate_limiter
+        if stream is None:
+            stream = bool(self.config and self.config.response.stream)
+        self.stream = stream
+        self.usage = TokenUsage()
+        # Process pool parsing and validating completions of asyncio runs
+        self.post_processor: Optional[PostProcessor] = None
+        # Backends requests are routed across, when the config defines them;
+        # otherwise every request goes to `client`
+        self.pool: Optional[ProviderPool] = (
+            ProviderPool.from_config(self.config)
+            if self.config and self.config.providers
+            else None
+        )
+
+    @property
+    def client(self) -> OpenAI:
+        """
+        Lazily create the OpenAI client of the default backend.
+
+        Returns:
+            OpenAI: The client, bound to `OPENAI_API_KEY` and the base URL
+        """
+        if self._client is None:
+            self._client = OpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"), base_url=self._base_url
+            )
+        return self._client
+
+    @client.setter
+    def client(self, client: OpenAI) -> None:
+        self._client = client
 
-    def verify_access(self) -> bool:
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        """
+        Lazily create the asyncio client used by `agenerate`.
+
+        The client is bound to the event loop it is first used in, so callers
+        running several loops should call `aclose` at the end of each one.
+
+        Returns:
+            AsyncOpenAI: The asyncio OpenAI client
+        """
+        if self._async_client is None:
+            self._async_client = AsyncOpenAI(
+                api_key=self.client.api_key, base_url=self.client.base_url
+            )
+        return self._async_client
+
+    async def aclose(self) -> None:
+        """Close the asyncio clients, if any were created."""
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
+        if self.pool is not None:
+            await self.pool.aclose()
+
+    def verify_access(
+        self, cache_path: Optional[str] = None, ttl: float = 3600.0
+    ) -> bool:
         """
         Verify that we can access the OpenAI API.
 
+        Retrieves the configured model, a single small request that also
+        checks the model is available to the API key. With `cache_path`, a
+        successful check is remembered for `ttl` seconds per API key, base
+        URL and model, so short-lived processes don't repeat it. With a
+        provider pool every backend is checked, and access is verified if at
+        least one of them is reachable.
+
+        Args:
+            cache_path (Optional[str]): JSON file remembering successful checks
+            ttl (float): Seconds a successful check is remembered
+
         Returns:
             bool: True if access is successful, False otherwise
         """
+        if self.pool is None:
+            return self._verify_backend(self.client, self.model, cache_path, ttl)
+        reachable = [
+            self._verify_backend(p.client, p.model, cache_path, ttl, p.name)
+            for p in self.pool.providers
+        ]
+        return any(reachable)
+
+    def _verify_backend(
+        self,
+        client: OpenAI,
+        model: str,
+        cache_path: Optional[str],
+        ttl: float,
+        name: Optional[str] = None,
+    ) -> bool:
+        """Check one API key, endpoint and model, see `verify_access`."""
+        key = hashlib.sha256(
+            f"{client.api_key}\0{client.base_url}\0{model}".encode()
+        ).hexdigest()
+        checks: Dict[str, float] = {}
+        if cache_path:
+            try:
+                with open(cache_path) as f:
+                    checks = json.load(f)
+            except (OSError, ValueError):
+                checks = {}
+            if checks.get(key, 0.0) > time.time():
+                return True
+
         try:
-            # Make a minimal API call to verify access
-            self.client.models.list()
-            return True
+            client.models.retrieve(model)
         except Exception as e:
-            print(f"Error verifying OpenAI access: {str(e)}")
+            backend = f" ({name})" if name else ""
+            print(f"Error verifying OpenAI access{backend}: {str(e)}")
             return False
 
-    def generate(self, prompt: Optional[str] = None) -> Dict[str, Any]:
+        if cache_path:
+            now = time.time()
+            checks = {k: expires for k, expires in checks.items() if expires > now}
+            checks[key] = now + ttl
+            path = Path(cache_path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(checks, f)
+            tmp_path.replace(path)
+        return True
+
+    def _build_messages(
+        self, prompt: Optional[str] = None, count: int = 1
+    ) -> List[Dict[str, str]]:
         """
-        Generate a persona using OpenAI's API.
+        Build the chat messages for a persona request.
+
+        The system prompt and rendered schema are identical for every request
+        and come first; the additional context, if any, is the last message.
 
         Args:
             prompt (Optional[str]): Additional context for generation
+            count (int): Number of personas to request. Batches append the
+                batch instruction after the single-persona prompt.
 
         Returns:
-            Dict[str, Any]: Generated persona data
+            List[Dict[str, str]]: The system and user messages
 
         Raises:
-            ValueError: If schema is not loaded
+            ValueError: If schema or configuration is not loaded
         """
         if not self.schema:
             raise ValueError("Schema not loaded. Please provide a schema path.")
@@ -67,102 +233,859 @@ class OpenAIGenerator(BaseGenerator):
         if not self.config:
             raise ValueError("Configuration not loaded")
 
+        # Static content first and per-persona context last, so requests
+        # share a cacheable prefix
+        with METRICS.span("prompt_build"):
+            messages = [
+                {
+                    "role": "system",
+                    "content": self._get_system_prompt(),
+                },
+                {
+                    "role": "user",
+                    "content": self._get_static_user_prompt(),
+                },
+            ]
+            if count > 1:
+                messages.append(
+                    {"role": "user", "content": self._get_batch_prompt(count)}
+                )
+            if prompt:
+                messages.append(
+                    {"role": "user", "content": self._get_context_prompt(prompt)}
+                )
+        return messages
+
+    def _build_repair_messages(
+        self, persona: Dict[str, Any], errors: List[Violation]
+    ) -> List[Dict[str, str]]:
+        """
+        Build the chat messages of a follow-up request repairing a persona.
+
+        Only the failed fields, with their constraints, are sent; the valid
+        part of the persona is kept as is.
+
+        Args:
+            persona (Dict[str, Any]): The persona that failed validation
+            errors (List[Violation]): Its violations
+
+        Returns:
+            List[Dict[str, str]]: The system and user messages
+        """
+        return [
+            {"role": "system", "content": self._get_system_prompt()},
+            {"role": "user", "content": self._get_repair_prompt(persona, errors)},
+        ]
+
+    def _request_body(
+        self,
+        messages: List[Dict[str, str]],
+        count: int = 1,
+        fields: Optional[Collection[str]] = None,
+        stream: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Build the body of a chat completion request.
+
+        Args:
+            messages (List[Dict[str, str]]): The chat messages
+            count (int): Number of personas requested
+            fields (Optional[Collection[str]]): Names of the only fields
+                requested (repair requests)
+            stream (bool): Stream the completion (single personas only)
+
+        Returns:
+            Dict[str, Any]: Keyword arguments for `chat.completions.create`
+        """
+        body = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": self.temperature,
+        }
+        response_format = self._get_response_format(count, fields)
+        if response_format is not None:
+            body["response_format"] = response_format
+        if stream:
+            body["stream"] = True
+            body["stream_options"] = {"include_usage": True}
+        return body
+
+    @staticmethod
+    def _content(response: Any) -> str:
+        """
+        Get the message content of a completion.
+
+        Args:
+            response: The chat completion response
+
+        Returns:
+            str: The raw message content
+
+        Raises:
+            ValueError: If the model answered with a refusal instead
+        """
+        message = response.choices[0].message
+        if message.content is None:
+            refusal = getattr(message, "refusal", None)
+            raise ValueError(f"Model refused the request: {refusal or 'no content'}")
+        return message.content
+
+    def _parse_persona(self, content: str) -> Dict[str, Any]:
+        """
+        Parse and validate the content of a completion.
+
+        Args:
+            content (str): The raw message content returned by the model
+
+        Returns:
+            Dict[str, Any]: The validated persona data
+
+        Raises:
+            ValueError: If the content is not valid JSON or fails validation
+        """
         try:
-            # Call the OpenAI API
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": self._get_system_prompt(),
-                    },
-                    {
-                        "role": "user",
-                        "content": self._get_user_prompt(prompt),
-                    },
-                ],
-                temperature=self.temperature,
-            )
+            with METRICS.span("parse"):
+                persona = strip_nulls(json.loads(content), self.schema.fields)
+        except json.JSONDecodeError:
+            METRICS.inc("parse_errors_total")
+            raise ValueError("Failed to parse persona as JSON")
 
-            # Parse the response
-            content = response.choices[0].message.content
-            try:
-                import json
+        if self.validate(persona):
+            return persona
+        else:
+            raise ValueError("Generated persona failed validation")
 
-                persona = json.loads(content)
-            except json.JSONDecodeError:
-                raise ValueError("Failed to parse persona as JSON")
+    def _parse_batch(self, content: str) -> List[Dict[str, Any]]:
+        """
+        Parse a batched completion and validate each persona on its own.
 
-            # Validate the generated persona
-            if self.validate(persona):
-                return persona
+        Invalid elements are dropped so that one bad persona does not discard
+        the rest of the batch.
+
+        Args:
+            content (str): The raw message content returned by the model
+
+        Returns:
+            List[Dict[str, Any]]: The valid personas, in response order
+
+        Raises:
+            ValueError: If the content is not a JSON array of personas or no
+                element passes validation
+        """
+        try:
+            with METRICS.span("parse"):
+                data = json.loads(content)
+        except json.JSONDecodeError:
+            METRICS.inc("parse_errors_total")
+            raise ValueError("Failed to parse persona batch as JSON")
+
+        data = batch_items(data)
+
+        personas = []
+        for index, persona in enumerate(data):
+            persona = strip_nulls(persona, self.schema.fields)
+            if isinstance(persona, dict) and self.validate(persona):
+                personas.append(persona)
             else:
+                print(f"⚠️  Dropping invalid persona {index + 1} of batch")
+
+        if not personas:
+            raise ValueError("No persona in the batch passed validation")
+        return personas
+
+    def _record_usage(self, response: Any, personas: int) -> TokenUsage:
+        """
+        Record the token usage of a completion.
+
+        Args:
+            response: The chat completion response
+            personas: Number of valid personas the response produced
+
+        Returns:
+            TokenUsage: The usage of this single request
+        """
+        usage = self.usage.add(getattr(response, "usage", None), personas=personas)
+        METRICS.inc("requests_total")
+        METRICS.inc("personas_total", personas)
+        if usage.prompt_tokens or usage.completion_tokens:
+            for kind in ("prompt", "completion"):
+                tokens = getattr(usage, f"{kind}_tokens")
+                METRICS.observe("request_tokens", tokens, kind=kind)
+                if personas:
+                    METRICS.observe("persona_tokens", tokens / personas, kind=kind)
+        return usage
+
+    def _report_batch(self, usage: TokenUsage, count: int) -> None:
+        """
+        Print the token accounting of one batch.
+
+        Args:
+            usage: The usage of the batch request
+            count: Number of personas requested
+        """
+        print(
+            f"📊 Batch: {usage.personas}/{count} valid personas, "
+            f"{usage.prompt_tokens} prompt ({usage.cached_tokens} cached) + "
+            f"{usage.completion_tokens} completion tokens "
+            f"({usage.per_persona():.0f} tokens/persona)"
+        )
+
+    def generate(
+        self, prompt: Optional[str] = None, slot: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Generate a persona using OpenAI's API.
+
+        Args:
+            prompt (Optional[str]): Additional context for generation
+            slot (Optional[int]): Persona slot index, part of the response
+                cache key
+
+        Returns:
+            Dict[str, Any]: Generated persona data
+
+        Raises:
+            ValueError: If schema is not loaded or the response fails parsing
+                or validation
+            openai.APIError: If the API call fails after the allowed retries
+            LookupError: On a response cache miss in replay mode
+        """
+        messages = self._build_messages(prompt)
+
+        try:
+            response = self._complete(
+                self._request_body(messages, stream=self.stream), slot
+            )
+            persona, errors = self._finish_candidate(response)
+            for _ in range(self._max_repair_attempts()):
+                if not self._repairable(errors):
+                    break
+                repair_messages = self._build_repair_messages(persona, errors)
+                response = self._complete(
+                    self._request_body(repair_messages, fields=_failed(errors)), slot
+                )
+                persona, errors = self._finish_repair(persona, errors, response)
+            if errors:
                 raise ValueError("Generated persona failed validation")
+            return persona
 
+        except (openai.APIError, LookupError):
+            raise
+        except ValueError as e:
+            raise ValueError(f"Error generating persona: {str(e)}")
         except Exception as e:
             raise Exception(f"Error generating persona: {str(e)}")
 
-    def validate(self, persona: Dict[str, Any]) -> bool:
-        """
-        Validate a generated persona against the schema.
-
-        Args:
-            persona (Dict[str, Any]): The persona data to validate
-
-        Returns:
-            bool: True if the persona is valid, False otherwise
-        """
-        print("Validating persona:", persona)
-        print("Schema fields:", list(self.schema.fields.keys()))
-
-        # Check that all required fields are present
-        for field_name, field_def in self.schema.fields.items():
-            if field_def.required and field_name not in persona:
-                print(f"Missing required field: {field_name}")
-                return False
-
-            # Check field type
-            if field_name in persona:
-                field_value = persona[field_name]
-                if field_def.type == "string" and not isinstance(field_value, str):
-                    print(f"Field {field_name} should be a string")
-                    return False
-                elif field_def.type == "number" and not isinstance(
-                    field_value, (int, float)
-                ):
-                    print(f"Field {field_name} should be a number")
-                    return False
-                elif field_def.type == "boolean" and not isinstance(field_value, bool):
-                    print(f"Field {field_name} should be a boolean")
-                    return False
-                elif field_def.type == "array" and not isinstance(field_value, list):
-                    print(f"Field {field_name} should be an array")
-                    return False
-                elif field_def.type == "object" and not isinstance(field_value, dict):
-                    print(f"Field {field_name} should be an object")
-                    return False
-
-                # Check string length constraints
-                if field_def.type == "string" and isinstance(field_value, str):
-                    if field_def.min_length and len(field_value) < field_def.min_length:
-                        print(
-                            f"Field {field_name} is too short "
-                            f"(min length: {field_def.min_length})"
-                        )
-                        return False
-                    if field_def.max_length and len(field_value) > field_def.max_length:
-                        print(
-                            f"Field {field_name} is too long "
-                            f"(max length: {field_def.max_length})"
-                        )
-                        return False
-
-                # Check options if specified
-                if field_def.options and field_value not in field_def.options:
-                    print(
-                        f"Field {field_name} value '{field_value}' "
-                        f"not in allowed options: {field_def.options}"
-                    )
-                    return False
+    async def agenerate(
+        self, prompt: Optional[str] = None, slot: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Generate a persona using OpenAI's API without blocking the event loop.
 
-        return True
+        Args:
+            prompt (Optional[str]): Additional context for generation
+            slot (Optional[int]): Persona slot index, part of the response
+                cache key
+
+        Returns:
+            Dict[str, Any]: Generated persona data
+
+        Raises:
+            ValueError: If schema is not loaded or the response fails parsing
+                or validation
+            openai.APIError: If the API call fails after the allowed retries
+            LookupError: On a response cache miss in replay mode
+        """
+        messages = self._build_messages(prompt)
+
+        try:
+            response = await self._acomplete(
+                self._request_body(messages, stream=self.stream), slot
+            )
+            persona, errors = await self._afinish_candidate(response)
+            for _ in range(self._max_repair_attempts()):
+                if not self._repairable(errors):
+                    break
+                repair_messages = self._build_repair_messages(persona, errors)
+                response = await self._acomplete(
+                    self._request_body(repair_messages, fields=_failed(errors)), slot
+                )
+                persona, errors = self._finish_repair(persona, errors, response)
+            if errors:
+                raise ValueError("Generated persona failed validation")
+            return persona
+
+        except (openai.APIError, LookupError):
+            raise
+        except ValueError as e:
+            raise ValueError(f"Error generating persona: {str(e)}")
+        except Exception as e:
+            raise Exception(f"Error generating persona: {str(e)}")
+
+    def generate_batch(
+        self, count: int, prompt: Optional[str] = None, slot: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Generate several personas with a single chat completion.
+
+        The schema and instructions are sent once for the whole batch, so
+        their prompt tokens are shared by `count` personas.
+
+        Args:
+            count (int): Number of personas to request
+            prompt (Optional[str]): Additional context for generation
+            slot (Optional[int]): Index of the first persona of the batch,
+                part of the response cache key
+
+        Returns:
+            List[Dict[str, Any]]: The valid personas of the batch
+
+        Raises:
+            ValueError: If schema is not loaded or the response fails parsing
+                or validation
+            openai.APIError: If the API call fails after the allowed retries
+            LookupError: On a response cache miss in replay mode
+        """
+        messages = self._build_messages(prompt, count=count)
+
+        try:
+            response = self._complete(self._request_body(messages, count), slot, count)
+            return self._finish_batch(response, count)
+
+        except (openai.APIError, LookupError):
+            raise
+        except ValueError as e:
+            raise ValueError(f"Error generating persona batch: {str(e)}")
+        except Exception as e:
+            raise Exception(f"Error generating persona batch: {str(e)}")
+
+    async def agenerate_batch(
+        self, count: int, prompt: Optional[str] = None, slot: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Generate several personas with a single asyncio chat completion.
+
+        Args:
+            count (int): Number of personas to request
+            prompt (Optional[str]): Additional context for generation
+            slot (Optional[int]): Index of the first persona of the batch,
+                part of the response cache key
+
+        Returns:
+            List[Dict[str, Any]]: The valid personas of the batch
+
+        Raises:
+            ValueError: If schema is not loaded or the response fails parsing
+                or validation
+            openai.APIError: If the API call fails after the allowed retries
+            LookupError: On a response cache miss in replay mode
+        """
+        messages = self._build_messages(prompt, count=count)
+
+        try:
+            response = await self._acomplete(
+                self._request_body(messages, count), slot, count
+            )
+            return await self._afinish_batch(response, count)
+
+        except (openai.APIError, LookupError):
+            raise
+        except ValueError as e:
+            raise ValueError(f"Error generating persona batch: {str(e)}")
+        except Exception as e:
+            raise Exception(f"Error generating persona batch: {str(e)}")
+
+    def _complete(
+        self, body: Dict[str, Any], slot: Optional[int] = None, count: int = 1
+    ) -> ChatCompletion:
+        """
+        Send a chat completion request, going through the response cache.
+
+        Args:
+            body: The request body
+            slot: Persona slot index, part of the cache key
+            count: Number of personas requested, for the token estimate
+
+        Returns:
+            ChatCompletion: The (possibly cached) completion
+        """
+        key = self._cache_key(body, slot)
+        cached = self._cached_response(key)
+        if cached is not None:
+            return cached
+        if self.pool is not None:
+            response = self._complete_pooled(body, count)
+            self._store_response(key, response)
+            return response
+
+        limiter = self.rate_limiter
+        estimated = limiter.estimate(body["messages"], count)
+        for attempt in itertools.count():
+            limiter.acquire(estimated)
+            try:
+                response, headers = self._send(body)
+                break
+            except Exception as e:
+                delay = limiter.backoff(e, estimated, attempt)
+                METRICS.inc("retries_total", reason=e.__class__.__name__)
+                print(f"⏳ Request failed ({e.__class__.__name__}), retrying")
+                time.sleep(delay)
+        limiter.settle(estimated, response.usage, headers)
+
+        self._store_response(key, response)
+        return response
+
+    async def _acomplete(
+        self, body: Dict[str, Any], slot: Optional[int] = None, count: int = 1
+    ) -> ChatCompletion:
+        """
+        Send an asyncio chat completion request, going through the cache.
+
+        Args:
+            body: The request body
+            slot: Persona slot index, part of the cache key
+            count: Number of personas requested, for the token estimate
+
+        Returns:
+            ChatCompletion: The (possibly cached) completion
+        """
+        key = self._cache_key(body, slot)
+        cached = self._cached_response(key)
+        if cached is not None:
+            return cached
+        if self.pool is not None:
+            response = await self._acomplete_pooled(body, count)
+            self._store_response(key, response)
+            return response
+
+        limiter = self.rate_limiter
+        estimated = limiter.estimate(body["messages"], count)
+        for attempt in itertools.count():
+            await limiter.aacquire(estimated)
+            try:
+                response, headers = await self._asend(body)
+                break
+            except Exception as e:
+                delay = limiter.backoff(e, estimated, attempt)
+                METRICS.inc("retries_total", reason=e.__class__.__name__)
+                print(f"⏳ Request failed ({e.__class__.__name__}), retrying")
+                await asyncio.sleep(delay)
+        limiter.settle(estimated, response.usage, headers)
+
+        self._store_response(key, response)
+        return response
+
+    def _complete_pooled(self, body: Dict[str, Any], count: int) -> ChatCompletion:
+        """
+        Send a chat completion request through the provider pool.
+
+        Each attempt goes to the backend picked by the pool, with its model
+        and through its rate limiter. A request failing on a backend is sent
+        right away to a backend it has not failed on yet; once every backend
+        failed it, it backs off on the last one as a single backend would,
+        and every backend may be tried again.
+
+        Args:
+            body: The request body (its model is replaced by the backend's)
+            count: Number of personas requested, for the token estimate
+
+        Returns:
+            ChatCompletion: The completion
+
+        Raises:
+            openai.APIError: If the request fails on every backend after the
+                allowed retries, or with an error no backend would avoid
+        """
+        tried: List[str] = []
+        attempt = 0
+        while True:
+            provider = self.pool.acquire(exclude=tried)
+            limiter = provider.rate_limiter
+            estimated = limiter.estimate(body["messages"], count)
+            limiter.acquire(estimated)
+            try:
+                response, headers = self._send(
+                    dict(body, model=provider.model), provider.client
+                )
+            except Exception as e:
+                self.pool.release(provider, e)
+                delay = self._fail_over(provider, e, estimated, tried, attempt)
+                if delay is not None:
+                    attempt += 1
+                    time.sleep(delay)
+                continue
+            self.pool.release(provider)
+            limiter.settle(estimated, response.usage, headers)
+            METRICS.inc("provider_requests_total", provider=provider.name)
+            return response
+
+    async def _acomplete_pooled(
+        self, body: Dict[str, Any], count: int
+    ) -> ChatCompletion:
+        """
+        Send an asyncio chat completion request through the provider pool.
+
+        Args:
+            body: The request body (its model is replaced by the backend's)
+            count: Number of personas requested, for the token estimate
+
+        Returns:
+            ChatCompletion: The completion
+
+        Raises:
+            openai.APIError: If the request fails on every backend after the
+                allowed retries, or with an error no backend would avoid
+        """
+        tried: List[str] = []
+        attempt = 0
+        while True:
+            provider = self.pool.acquire(exclude=tried)
+            limiter = provider.rate_limiter
+            estimated = limiter.estimate(body["messages"], count)
+            await limiter.aacquire(estimated)
+            try:
+                response, headers = await self._asend(
+                    dict(body, model=provider.model), provider.async_client
+                )
+            except Exception as e:
+                self.pool.release(provider, e)
+                delay = self._fail_over(provider, e, estimated, tried, attempt)
+                if delay is not None:
+                    attempt += 1
+                    await asyncio.sleep(delay)
+                continue
+            self.pool.release(provider)
+            limiter.settle(estimated, response.usage, headers)
+            METRICS.inc("provider_requests_total", provider=provider.name)
+            return response
+
+    def _fail_over(
+        self,
+        provider: Provider,
+        error: Exception,
+        estimated: int,
+        tried: List[str],
+        attempt: int,
+    ) -> Optional[float]:
+        """
+        Decide where a request that failed on a backend goes next.
+
+        Args:
+            provider: The backend the request failed on
+            error: The error it failed with
+            estimated: Tokens reserved for the request
+            tried: Backends the request failed on since its last backoff,
+                updated in place
+            attempt: Number of backoffs already made for this request
+
+        Returns:
+            Optional[float]: None to send the request to another backend now,
+                or the seconds to wait before trying every backend again
+
+        Raises:
+            Exception: `error` itself, if it is not retryable anywhere or the
+                retry budget is exhausted
+        """
+        METRICS.inc("retries_total", reason=error.__class__.__name__)
+        if self.pool.fails_over(error):
+            tried.append(provider.name)
+            if len(tried) < len(self.pool.providers):
+                provider.rate_limiter.refund(estimated, error)
+                METRICS.inc("failovers_total", provider=provider.name)
+                print(
+                    f"🔀 Request failed on {provider.name} "
+                    f"({error.__class__.__name__}), failing over"
+                )
+                return None
+        tried.clear()
+        delay = provider.rate_limiter.backoff(error, estimated, attempt)
+        print(f"⏳ Request failed ({error.__class__.__name__}), retrying")
+        return delay
+
+    def _send(
+        self, body: Dict[str, Any], client: Optional[OpenAI] = None
+    ) -> Tuple[ChatCompletion, Any]:
+        """
+        Call the chat completions endpoint once.
+
+        The SDK's own retries are disabled so that throttled requests go back
+        through the rate limiter. Streamed requests are collected into a
+        completion, and cancelled at the first invalid field.
+
+        Args:
+            body: The request body
+            client: Client of the backend to call (default: `client`)
+
+        Returns:
+            Tuple[ChatCompletion, Any]: The completion and the response headers
+        """
+        client = (client or self.client).with_options(max_retries=0)
+        with METRICS.span("api"):
+            started = time.monotonic()
+            raw = client.chat.completions.with_raw_response.create(**body)
+            if not body.get("stream"):
+                return raw.parse(), raw.headers
+            stream = raw.parse()
+            collector = PersonaStream(self.validator, started, body["messages"])
+            try:
+                for chunk in stream:
+                    if not collector.add(chunk):
+                        break
+            finally:
+                stream.close()
+            return collector.completion(), raw.headers
+
+    async def _asend(
+        self, body: Dict[str, Any], client: Optional[AsyncOpenAI] = None
+    ) -> Tuple[ChatCompletion, Any]:
+        """
+        Call the chat completions endpoint once, with the asyncio client.
+
+        Args:
+            body: The request body
+            client: Asyncio client of the backend to call (default:
+                `async_client`)
+
+        Returns:
+            Tuple[ChatCompletion, Any]: The completion and the response headers
+        """
+        client = (client or self.async_client).with_options(max_retries=0)
+        with METRICS.span("api"):
+            started = time.monotonic()
+            raw = await client.chat.completions.with_raw_response.create(**body)
+            if not body.get("stream"):
+                return raw.parse(), raw.headers
+            stream = raw.parse()
+            collector = PersonaStream(self.validator, started, body["messages"])
+            try:
+                async for chunk in stream:
+                    if not collector.add(chunk):
+                        break
+            finally:
+                await stream.close()
+            return collector.completion(), raw.headers
+
+    def _cache_key(self, body: Dict[str, Any], slot: Optional[int]) -> Optional[str]:
+        """Cache key of a request, or None when no cache is configured."""
+        if self.cache is None:
+            return None
+        return self.cache.key(body, slot)
+
+    def _cached_response(self, key: Optional[str]) -> Optional[ChatCompletion]:
+        """
+        Serve a request from the response cache.
+
+        Replayed completions carry no usage, since they cost no tokens.
+
+        Args:
+            key: The cache key (None when no cache is configured)
+
+        Returns:
+            Optional[ChatCompletion]: The cached completion, or None
+        """
+        if key is None or not self.cache.reads:
+            return None
+        cached = self.cache.get(key)
+        if cached is None:
+            return None
+        return ChatCompletion.model_validate(dict(cached, usage=None))
+
+    def _store_response(self, key: Optional[str], response: ChatCompletion) -> None:
+        """Store a fresh completion in the response cache, if enabled."""
+        # A cancelled stream holds a partial persona, not the model's answer
+        if getattr(response, "cancelled", False):
+            return
+        if key is not None and self.cache.writes:
+            self.cache.put(key, response.model_dump(mode="json"))
+
+    def _finish_persona(self, response: Any) -> Dict[str, Any]:
+        """
+        Parse a single-persona response and account for its tokens.
+
+        Args:
+            response: The chat completion response
+
+        Returns:
+            Dict[str, Any]: The validated persona data
+        """
+        try:
+            persona = self._parse_persona(self._content(response))
+        except ValueError:
+            self._record_usage(response, personas=0)
+            raise
+        self._record_usage(response, personas=1)
+        return persona
+
+    def _finish_candidate(
+        self, response: Any
+    ) -> Tuple[Dict[str, Any], List[Violation]]:
+        """
+        Parse a single-persona response without discarding invalid fields.
+
+        Args:
+            response: The chat completion response
+
+        Returns:
+            Tuple[Dict[str, Any], List[Violation]]: The persona and its
+                violations (empty if it is valid)
+
+        Raises:
+            ValueError: If the content is not valid JSON
+        """
+        try:
+            with METRICS.span("parse"):
+                persona = json.loads(self._content(response))
+        except json.JSONDecodeError:
+            METRICS.inc("parse_errors_total")
+            self._record_usage(response, personas=0)
+            raise ValueError("Failed to parse persona as JSON")
+        except ValueError:
+            self._record_usage(response, personas=0)
+            raise
+        persona = strip_nulls(persona, self.schema.fields)
+
+        errors = self.validation_errors(persona)
+        self._log_violations(errors)
+        self._record_usage(response, personas=0 if errors else 1)
+        return persona, errors
+
+    async def _afinish_candidate(
+        self, response: Any
+    ) -> Tuple[Dict[str, Any], List[Violation]]:
+        """
+        Like `_finish_candidate`, parsing and validating in the post-processor.
+
+        Args:
+            response: The chat completion response
+
+        Returns:
+            Tuple[Dict[str, Any], List[Violation]]: The persona and its
+                violations (empty if it is valid)
+
+        Raises:
+            ValueError: If the content is not valid JSON
+        """
+        if self.post_processor is None:
+            return self._finish_candidate(response)
+        try:
+            with METRICS.span("postprocess"):
+                persona, errors = await self.post_processor.decode_persona(
+                    self._content(response)
+                )
+        except ValueError as e:
+            if isinstance(e, ParseError):
+                METRICS.inc("parse_errors_total")
+            self._record_usage(response, personas=0)
+            raise
+
+        self._log_violations(errors)
+        self._record_usage(response, personas=0 if errors else 1)
+        return persona, errors
+
+    def _max_repair_attempts(self) -> int:
+        """Number of repair requests allowed per persona."""
+        return self.config.validation.max_repair_attempts if self.config else 0
+
+    def _repairable(self, errors: List[Violation]) -> bool:
+        """Whether every violation belongs to a schema field that can be redone."""
+        return bool(errors) and all(
+            error.field in self.schema.fields for error in errors
+        )
+
+    def _finish_repair(
+        self, persona: Dict[str, Any], errors: List[Violation], response: Any
+    ) -> Tuple[Dict[str, Any], List[Violation]]:
+        """
+        Merge the fields returned by a repair request into the persona.
+
+        Only the fields that failed are taken from the response; everything
+        else in the persona is kept.
+
+        Args:
+            persona: The persona that failed validation
+            errors: Its violations
+            response: The chat completion of the repair request
+
+        Returns:
+            Tuple[Dict[str, Any], List[Violation]]: The merged persona and its
+                remaining violations
+        """
+        try:
+            with METRICS.span("parse"):
+                fixed = json.loads(self._content(response))
+        except json.JSONDecodeError:
+            METRICS.inc("parse_errors_total")
+            fixed = None
+        except ValueError:
+            fixed = None  # refused
+
+        if isinstance(fixed, dict):
+            failed = {error.field for error in errors}
+            persona = dict(persona)
+            persona.update((k, v) for k, v in fixed.items() if k in failed)
+            errors = self.validation_errors(persona)
+            self._log_violations(errors)
+
+        usage = self._record_usage(response, personas=0 if errors else 1)
+        METRICS.inc("repairs_total", result="failed" if errors else "repaired")
+        if not errors:
+            usage.repaired = 1
+            self.usage.repaired += 1
+            print(f"🔧 Repaired field(s) {', '.join(sorted(failed))}")
+        return persona, errors
+
+    def _finish_batch(self, response: Any, count: int) -> List[Dict[str, Any]]:
+        """
+        Parse a batch response and account for its tokens.
+
+        Args:
+            response: The chat completion response
+            count: Number of personas requested
+
+        Returns:
+            List[Dict[str, Any]]: The valid personas of the batch
+        """
+        try:
+            personas = self._parse_batch(self._content(response))
+        except ValueError:
+            self._report_batch(self._record_usage(response, personas=0), count)
+            raise
+        personas = personas[:count]
+        self._report_batch(self._record_usage(response, len(personas)), count)
+        return personas
+
+    async def _afinish_batch(self, response: Any, count: int) -> List[Dict[str, Any]]:
+        """
+        Like `_finish_batch`, parsing and validating in the post-processor.
+
+        Args:
+            response: The chat completion response
+            count: Number of personas requested
+
+        Returns:
+            List[Dict[str, Any]]: The valid personas of the batch
+        """
+        if self.post_processor is None:
+            return self._finish_batch(response, count)
+        try:
+            with METRICS.span("postprocess"):
+                candidates = await self.post_processor.decode_batch(
+                    self._content(response)
+                )
+            personas = []
+            for index, (persona, errors) in enumerate(candidates):
+                self._log_violations(errors)
+                if errors:
+                    print(f"⚠️  Dropping invalid persona {index + 1} of batch")
+                else:
+                    personas.append(persona)
+            if not personas:
+                raise ValueError("No persona in the batch passed validation")
+        except ValueError as e:
+            if isinstance(e, ParseError):
+                METRICS.inc("parse_errors_total")
+            self._report_batch(self._record_usage(response, personas=0), count)
+            raise
+        personas = personas[:count]
+        self._report_batch(self._record_usage(response, len(personas)), count)
+        return personas
@@ -0,0 +1,179 @@
+import asyncio
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, List, Optional, Tuple
+
+from src.models.schema import Schema
+from src.schemas.json_schema import strip_nulls
+from src.schemas.persona_validator import PersonaValidator, Violation
+
+# Validator and duplicate signer of a worker process, set by `_init_worker`
+_VALIDATOR: Optional[PersonaValidator] = None
+_SIGNER: Any = None
+
+Candidate = Tuple[Any, List[Violation]]
+
+
+class ParseError(ValueError):
+    """A completion whose content is not valid JSON."""
+
+
+def batch_items(data: Any) -> List[Any]:
+    """
+    Extract the personas of a parsed batch completion.
+
+    Args:
+        data: The parsed message content
+
+    Returns:
+        List[Any]: The batch elements (a wrapping object or a lone persona
+            are tolerated instead of an array)
+
+    Raises:
+        ValueError: If the content is not a JSON array of personas
+    """
+    if isinstance(data, dict):
+        data = data.get("personas", [data])
+    if not isinstance(data, list):
+        raise ValueError("Persona batch is not a JSON array")
+    return data
+
+
+def _init_worker(schema: Schema, signer: Any) -> None:
+    """Compile the validator once per worker process."""
+    global _VALIDATOR, _SIGNER
+    _VALIDATOR = PersonaValidator(schema)
+    _SIGNER = signer
+
+
+def _decode_persona(content: str) -> Candidate:
+    """Parse and validate a single-persona completion (in a worker)."""
+    try:
+        persona = json.loads(content)
+    except json.JSONDecodeError:
+        raise ParseError("Failed to parse persona as JSON")
+    persona = strip_nulls(persona, _VALIDATOR.schema.fields)
+    return persona, _VALIDATOR.errors(persona)
+
+
+def _decode_batch(content: str) -> List[Candidate]:
+    """Parse and validate every persona of a batch completion (in a worker)."""
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError:
+        raise ParseError("Failed to parse persona batch as JSON")
+    fields = _VALIDATOR.schema.fields
+    items = [strip_nulls(item, fields) for item in batch_items(data)]
+    return [(item, _VALIDATOR.errors(item)) for item in items]
+
+
+def _signatures(personas: List[Any]) -> List[Any]:
+    """Compute the near-duplicate signatures of personas (in a worker)."""
+    return [_SIGNER.signature(persona) for persona in personas]
+
+
+class PostProcessor:
+    """
+    Process pool running the CPU-bound stages of generation.
+
+    JSON parsing and validation of completions, and the MinHash signatures
+    of the near-duplicate check, run in worker processes while the event
+    loop keeps the network stage busy, so a single run can use every core.
+    At most `max_pending` jobs are queued for the pool; once they are all
+    taken, the coroutines handing work to it wait, which holds back new
+    requests until the workers catch up (backpressure).
+    """
+
+    def __init__(
+        self,
+        schema: Schema,
+        processes: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        signer: Any = None,
+    ):
+        """
+        Initialize the post-processor; the pool starts on first use.
+
+        Args:
+            schema: Schema the completions are validated against
+            processes: Number of worker processes (default: one per core)
+            max_pending: Maximum number of jobs queued for or running in the
+                pool (default: twice the number of processes)
+            signer: Picklable object whose `signature(persona)` computes the
+                near-duplicate signatures (optional)
+        """
+        self.schema = schema
+        self.processes = processes or os.cpu_count() or 1
+        self.max_pending = max_pending or 2 * self.processes
+        self.signer = signer
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def _run(self, func: Any, *args: Any) -> Any:
+        """Run a worker function in the pool once a pending slot is free."""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.processes,
+                initializer=_init_worker,
+                initargs=(self.schema, self.signer),
+            )
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # A semaphore belongs to the event loop of one run
+            self._loop = loop
+            self._pending = asyncio.Semaphore(self.max_pending)
+        async with self._pending:
+            return await loop.run_in_executor(self._pool, func, *args)
+
+    async def decode_persona(self, content: str) -> Candidate:
+        """
+        Parse and validate a single-persona completion in the pool.
+
+        Args:
+            content: The raw message content
+
+        Returns:
+            Candidate: The persona and its violations
+
+        Raises:
+            ParseError: If the content is not valid JSON
+        """
+        return await self._run(_decode_persona, content)
+
+    async def decode_batch(self, content: str) -> List[Candidate]:
+        """
+        Parse and validate every persona of a batch completion in the pool.
+
+        Args:
+            content: The raw message content
+
+        Returns:
+            List[Candidate]: Each element and its violations, in response order
+
+        Raises:
+            ParseError: If the content is not valid JSON
+            ValueError: If the content is not a JSON array of personas
+        """
+        return await self._run(_decode_batch, content)
+
+    async def signatures(self, personas: List[Any]) -> List[Any]:
+        """
+        Compute the near-duplicate signatures of personas in the pool.
+
+        Args:
+            personas: The persona data
+
+        Returns:
+            List[Any]: One signature per persona
+        """
+        if self.signer is None:
+            raise ValueError("No signer configured")
+        return await self._run(_signatures, personas)
+
+    def close(self) -> None:
+        """Shut the worker processes down."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
@@ -0,0 +1,238 @@
+import os
+import threading
+import time
+from typing import Any, Callable, Collection, List, Optional
+
+import openai
+from openai import AsyncOpenAI, OpenAI
+
+from src.generators.rate_limiter import RateLimiter
+
+ROUTING_STRATEGIES = ("weighted", "least-loaded")
+
+# Errors another backend may not have: quota, connectivity, server errors and
+# a key or model the backend doesn't accept. Other errors (e.g. a malformed
+# request) would fail the same way everywhere and are not failed over.
+FAILOVER_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+    openai.AuthenticationError,
+    openai.PermissionDeniedError,
+    openai.NotFoundError,
+)
+
+
+class Provider:
+    """One backend of a provider pool: an API key, endpoint, model and quota."""
+
+    def __init__(
+        self,
+        name: str,
+        client: OpenAI,
+        model: str,
+        rate_limiter: Optional[RateLimiter] = None,
+        weight: float = 1.0,
+    ):
+        """
+        Initialize a backend.
+
+        Args:
+            name: Name of the backend in logs and metrics
+            client: OpenAI client bound to the backend's key and endpoint
+            model: Model served by the backend
+            rate_limiter: Rate limiter enforcing the backend's quota
+            weight: Relative share of the requests routed to it
+        """
+        if weight <= 0:
+            raise ValueError("Provider weight must be positive")
+        self.name = name
+        self.client = client
+        self.model = model
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.weight = weight
+        self.in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.failures = 0  # consecutive
+        self.unhealthy_until = 0.0
+        self._current = 0.0  # smooth weighted round-robin state
+        self._async_client: Optional[AsyncOpenAI] = None
+
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        """Lazily create the asyncio client of the backend."""
+        if self._async_client is None:
+            self._async_client = AsyncOpenAI(
+                api_key=self.client.api_key, base_url=self.client.base_url
+            )
+        return self._async_client
+
+    async def aclose(self) -> None:
+        """Close the asyncio client, if one was created."""
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
+
+
+class ProviderPool:
+    """
+    Routes requests across several backends and fails over between them.
+
+    Backends are picked by smooth weighted round-robin, or by the fewest
+    requests in flight relative to their weight ("least-loaded"). A backend
+    failing `failure_threshold` requests in a row is marked unhealthy and
+    skipped for `cooldown` seconds; after that it is tried again, and a
+    success makes it healthy. When every backend is unhealthy, the one that
+    recovers first is used rather than failing the request.
+
+    The pool is thread-safe and serves both sync and asyncio callers.
+    """
+
+    def __init__(
+        self,
+        providers: List[Provider],
+        strategy: str = "weighted",
+        failure_threshold: int = 3,
+        cooldown: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize the pool.
+
+        Args:
+            providers: The backends
+            strategy: "weighted" round-robin or "least-loaded"
+            failure_threshold: Consecutive failures marking a backend unhealthy
+            cooldown: Seconds an unhealthy backend is skipped
+            clock: Monotonic clock returning seconds
+        """
+        if not providers:
+            raise ValueError("A provider pool needs at least one provider")
+        if len({provider.name for provider in providers}) < len(providers):
+            raise ValueError("Provider names must be unique")
+        if strategy not in ROUTING_STRATEGIES:
+            raise ValueError(
+                f"Routing strategy must be one of {', '.join(ROUTING_STRATEGIES)}"
+            )
+        self.providers = providers
+        self.strategy = strategy
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Any) -> "ProviderPool":
+        """
+        Create the pool described by the `providers` of a generator config.
+
+        Args:
+            config: The GeneratorConfig
+
+        Returns:
+            ProviderPool: The configured pool
+
+        Raises:
+            ValueError: If the config lists no provider or a key is missing
+        """
+        providers = []
+        for provider in config.providers:
+            api_key = os.getenv(provider.api_key_env)
+            if not api_key:
+                raise ValueError(
+                    f"Provider {provider.name}: {provider.api_key_env} is not set"
+                )
+            providers.append(
+                Provider(
+                    provider.name,
+                    OpenAI(api_key=api_key, base_url=provider.base_url),
+                    provider.model or config.model,
+                    RateLimiter.from_config(provider.rate_limit or config.rate_limit),
+                    provider.weight,
+                )
+            )
+        return cls(
+            providers,
+            strategy=config.routing.strategy,
+            failure_threshold=config.routing.failure_threshold,
+            cooldown=config.routing.cooldown,
+        )
+
+    def healthy(self, provider: Provider) -> bool:
+        """Whether a backend is outside of its unhealthy cooldown."""
+        return provider.unhealthy_until <= self._clock()
+
+    def acquire(self, exclude: Collection[str] = ()) -> Optional[Provider]:
+        """
+        Pick the backend of the next request and count it in flight.
+
+        Args:
+            exclude: Names of backends not to pick, e.g. those that already
+                failed the request being retried
+
+        Returns:
+            Optional[Provider]: The backend, or None if every backend is
+                excluded
+        """
+        with self._lock:
+            candidates = [p for p in self.providers if p.name not in exclude]
+            if not candidates:
+                return None
+            healthy = [p for p in candidates if self.healthy(p)]
+            if not healthy:
+                provider = min(candidates, key=lambda p: p.unhealthy_until)
+            elif self.strategy == "least-loaded":
+                provider = min(healthy, key=lambda p: p.in_flight / p.weight)
+            else:
+                total = sum(p.weight for p in healthy)
+                for p in healthy:
+                    p._current += p.weight
+                provider = max(healthy, key=lambda p: p._current)
+                provider._current -= total
+            provider.in_flight += 1
+            provider.requests += 1
+            return provider
+
+    def release(self, provider: Provider, error: Optional[Exception] = None) -> None:
+        """
+        Record the outcome of a request sent to a backend.
+
+        Args:
+            provider: The backend returned by `acquire`
+            error: The error the request failed with (None on success)
+        """
+        with self._lock:
+            provider.in_flight -= 1
+            if error is None:
+                provider.failures = 0
+                provider.unhealthy_until = 0.0
+                return
+            provider.errors += 1
+            if isinstance(error, FAILOVER_ERRORS):
+                provider.failures += 1
+                if provider.failures >= self.failure_threshold:
+                    provider.unhealthy_until = self._clock() + self.cooldown
+
+    @staticmethod
+    def fails_over(error: Exception) -> bool:
+        """Whether a request failing with `error` may be sent to another backend."""
+        return isinstance(error, FAILOVER_ERRORS)
+
+    async def aclose(self) -> None:
+        """Close the asyncio clients of every backend."""
+        for provider in self.providers:
+            await provider.aclose()
+
+    def summary(self) -> str:
+        """
+        Human-readable one-line summary.
+
+        Returns:
+            str: The summary line
+        """
+        return "; ".join(
+            f"{p.name}: {p.requests} request(s), {p.errors} error(s)"
+            f"{'' if self.healthy(p) else ' (unhealthy)'}"
+            for p in self.providers
+        )
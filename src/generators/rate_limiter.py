@@ -0,0 +1,386 @@
+import asyncio
+import random
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Mapping, Optional
+
+import openai
+
+# Errors worth retrying: throttling, dropped connections and server errors
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a rate-limit reset duration such as "1s", "6m0s" or "20ms".
+
+    Args:
+        value: The header value
+
+    Returns:
+        Optional[float]: The duration in seconds, or None if unparseable
+    """
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _UNITS[unit] for amount, unit in parts)
+
+
+def retry_after(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """
+    Read the server-requested delay from `retry-after-ms` or `retry-after`.
+
+    Args:
+        headers: Response headers (case-insensitive mapping)
+
+    Returns:
+        Optional[float]: Seconds to wait, or None if the server gave no hint
+    """
+    if not headers:
+        return None
+    for header, divisor in (("retry-after-ms", 1000.0), ("retry-after", 1.0)):
+        value = headers.get(header)
+        if value is None:
+            continue
+        try:
+            return max(float(value) / divisor, 0.0)
+        except ValueError:
+            continue
+    return None
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `limit` units per minute.
+
+    Charges are reserved immediately and may drive the level negative; the
+    caller then waits until the refill has paid the debt back. Reserving
+    before waiting serves concurrent callers in arrival order.
+    """
+
+    def __init__(self, limit: int, clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize a full bucket.
+
+        Args:
+            limit: Units allowed per minute (also the burst capacity)
+            clock: Monotonic clock returning seconds
+        """
+        if limit < 1:
+            raise ValueError("Rate limit must be a positive number per minute")
+        self.limit = limit
+        self.rate = limit / 60.0
+        self.level = float(limit)
+        self._clock = clock
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.level = min(self.limit, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def take(self, amount: float) -> float:
+        """
+        Reserve `amount` units.
+
+        Args:
+            amount: Units to charge
+
+        Returns:
+            float: Seconds to wait before the charge is covered
+        """
+        self._refill()
+        self.level -= amount
+        return max(0.0, -self.level / self.rate)
+
+    def give(self, amount: float) -> None:
+        """
+        Return units to the bucket (a negative amount charges more).
+
+        Args:
+            amount: Units to credit
+        """
+        self._refill()
+        self.level = min(self.limit, self.level + amount)
+
+    def clamp(self, remaining: float) -> None:
+        """
+        Lower the level to what the server reports as remaining.
+
+        Args:
+            remaining: Units the server still allows in the current window
+        """
+        self._refill()
+        self.level = min(self.level, remaining)
+
+
+class RateLimiter:
+    """
+    Client-side rate limiter for requests-per-minute and tokens-per-minute.
+
+    Every request reserves one request and an estimate of its tokens before
+    it is sent; the estimate is corrected from the actual `usage` once the
+    response arrives. `x-ratelimit-*` response headers keep the buckets in
+    line with the server's view (and set the limits when none are
+    configured), and a 429 pauses every caller for the `Retry-After` delay.
+
+    The limiter is thread-safe and serves both sync and asyncio callers.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        estimated_completion_tokens: int = 600,
+        max_retries: int = 6,
+        max_connection_retries: int = 2,
+        max_backoff: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize the rate limiter.
+
+        Args:
+            requests_per_minute: Request budget (None until learned from headers)
+            tokens_per_minute: Token budget (None until learned from headers)
+            estimated_completion_tokens: Completion tokens pre-charged per
+                requested persona
+            max_retries: Maximum retries of a throttled (429) request
+            max_connection_retries: Maximum retries of a request that failed
+                to connect or hit a server error, so an unreachable endpoint
+                fails fast
+            max_backoff: Upper bound of a single retry delay, in seconds
+            clock: Monotonic clock returning seconds
+        """
+        self._clock = clock
+        self.requests = (
+            TokenBucket(requests_per_minute, clock) if requests_per_minute else None
+        )
+        self.tokens = (
+            TokenBucket(tokens_per_minute, clock) if tokens_per_minute else None
+        )
+        self.estimated_completion_tokens = estimated_completion_tokens
+        self.max_retries = max_retries
+        self.max_connection_retries = max_connection_retries
+        self.max_backoff = max_backoff
+        self.throttled = 0
+        self.waited = 0.0
+        self.retries = 0
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Any) -> "RateLimiter":
+        """
+        Create a rate limiter from the `rate_limit` section of a config.
+
+        Args:
+            config: The RateLimitConfig
+
+        Returns:
+            RateLimiter: The configured rate limiter
+        """
+        return cls(
+            requests_per_minute=config.requests_per_minute,
+            tokens_per_minute=config.tokens_per_minute,
+            estimated_completion_tokens=config.estimated_completion_tokens,
+            max_retries=config.max_retries,
+            max_connection_retries=config.max_connection_retries,
+            max_backoff=config.max_backoff,
+        )
+
+    def estimate(self, messages: List[Dict[str, Any]], count: int = 1) -> int:
+        """
+        Estimate the tokens a request will be charged.
+
+        Args:
+            messages: The chat messages of the request
+            count: Number of personas requested
+
+        Returns:
+            int: Estimated prompt tokens (about 4 characters per token) plus
+                the expected completion tokens
+        """
+        chars = sum(len(message.get("content") or "") for message in messages)
+        return chars // 4 + 1 + self.estimated_completion_tokens * count
+
+    def reserve(self, tokens: int) -> float:
+        """
+        Reserve one request and `tokens` tokens.
+
+        Args:
+            tokens: Estimated tokens of the request
+
+        Returns:
+            float: Seconds to wait before sending the request
+        """
+        with self._lock:
+            delay = max(0.0, self._resume_at - self._clock())
+            if self.requests:
+                delay = max(delay, self.requests.take(1))
+            if self.tokens:
+                delay = max(delay, self.tokens.take(tokens))
+            if delay > 0:
+                self.throttled += 1
+                self.waited += delay
+        return delay
+
+    def acquire(self, tokens: int) -> None:
+        """
+        Block until a request of `tokens` tokens may be sent.
+
+        Args:
+            tokens: Estimated tokens of the request
+        """
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def aacquire(self, tokens: int) -> None:
+        """
+        Wait, without blocking the event loop, until a request may be sent.
+
+        Args:
+            tokens: Estimated tokens of the request
+        """
+        delay = self.reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def settle(
+        self,
+        estimated: int,
+        usage: Any = None,
+        headers: Optional[Mapping[str, str]] = None,
+    ) -> None:
+        """
+        Correct the charge of a completed request.
+
+        Args:
+            estimated: Tokens reserved for the request
+            usage: The `usage` of the completion (may be None)
+            headers: The response headers (may be None)
+        """
+        actual = getattr(usage, "total_tokens", None)
+        with self._lock:
+            if self.tokens and actual is not None:
+                self.tokens.give(estimated - actual)
+            if headers:
+                self._observe(headers)
+
+    def _observe(self, headers: Mapping[str, str]) -> None:
+        """Align the buckets with the server's `x-ratelimit-*` headers."""
+        for kind in ("requests", "tokens"):
+            bucket = getattr(self, kind)
+            if bucket is None:
+                try:
+                    limit = int(headers.get(f"x-ratelimit-limit-{kind}") or 0)
+                except ValueError:
+                    limit = 0
+                if not limit:
+                    continue
+                bucket = TokenBucket(limit, self._clock)
+                setattr(self, kind, bucket)
+            try:
+                remaining = float(headers.get(f"x-ratelimit-remaining-{kind}"))
+            except (TypeError, ValueError):
+                continue
+            bucket.clamp(remaining)
+            # An exhausted window reopens at the reset time the server reports
+            reset = parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+            if remaining <= 0 and reset is not None:
+                self._resume_at = max(self._resume_at, self._clock() + reset)
+
+    def backoff(self, error: Exception, estimated: int, attempt: int) -> float:
+        """
+        Handle a failed request and decide how long to wait before retrying.
+
+        The reserved tokens are returned. A 429 pauses every caller for the
+        server's `Retry-After` delay (or an exponential backoff).
+
+        Args:
+            error: The error raised by the request
+            estimated: Tokens reserved for the request
+            attempt: Number of retries already made for this request
+
+        Returns:
+            float: Seconds the caller should sleep before retrying; pauses
+                caused by a 429 are enforced by the next `acquire` instead
+
+        Raises:
+            Exception: `error` itself, if it is not retryable or the retry
+                budget is exhausted
+        """
+        if not isinstance(error, RETRYABLE_ERRORS):
+            raise error
+        throttled = isinstance(error, openai.RateLimitError)
+        if attempt >= (self.max_retries if throttled else self.max_connection_retries):
+            raise error
+
+        response = getattr(error, "response", None)
+        delay = retry_after(getattr(response, "headers", None))
+        if delay is None:
+            # Exponential backoff with jitter, so callers do not retry in step
+            delay = min(self.max_backoff, 2.0**attempt) * random.uniform(0.5, 1.0)
+        delay = min(delay, self.max_backoff)
+
+        with self._lock:
+            self.retries += 1
+            if self.tokens:
+                self.tokens.give(estimated)
+            if throttled:
+                self._resume_at = max(self._resume_at, self._clock() + delay)
+                return 0.0
+        return delay
+
+    def refund(self, estimated: int, error: Optional[Exception] = None) -> None:
+        """
+        Return the tokens of a request sent elsewhere after it failed here.
+
+        A 429 still pauses every caller of this limiter for the server's
+        `Retry-After` delay, if it gave one.
+
+        Args:
+            estimated: Tokens reserved for the request
+            error: The error raised by the request (optional)
+        """
+        delay = None
+        if isinstance(error, openai.RateLimitError):
+            delay = retry_after(getattr(error.response, "headers", None))
+        with self._lock:
+            if self.tokens:
+                self.tokens.give(estimated)
+            if delay:
+                delay = min(delay, self.max_backoff)
+                self._resume_at = max(self._resume_at, self._clock() + delay)
+
+    def summary(self) -> str:
+        """
+        Human-readable one-line summary.
+
+        Returns:
+            str: The summary line
+        """
+        limits = ", ".join(
+            f"{bucket.limit} {kind}/min"
+            for kind, bucket in (("requests", self.requests), ("tokens", self.tokens))
+            if bucket
+        )
+        return (
+            f"{limits or 'no limits'}; throttled {self.throttled} time(s) "
+            f"for {self.waited:.1f}s, {self.retries} retry(ies)"
+        )
@@ -0,0 +1,193 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+CACHE_MODES = ("read-through", "record", "replay")
+
+
+class ResponseCache:
+    """
+    On-disk, content-addressed cache of chat completion responses.
+
+    Responses are stored in SQLite under a hash of the request body (model,
+    temperature, messages, ...) and a slot index, so a rerun of the same
+    schema and config gets the same completion for each persona slot.
+
+    Modes:
+        read-through: serve cached responses, call the API and store on a miss
+        record: always call the API and store (refreshes the cache)
+        replay: only serve cached responses; a miss raises LookupError
+
+    The cache is bounded by entry count and/or total response bytes; the
+    least recently used entries are evicted first.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        mode: str = "read-through",
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ):
+        """
+        Open (or create) the cache database.
+
+        Args:
+            path: Path to the SQLite database file
+            mode: One of "read-through", "record" or "replay"
+            max_entries: Maximum number of cached responses (optional)
+            max_bytes: Maximum total size of cached responses (optional)
+        """
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Cache mode must be one of {', '.join(CACHE_MODES)}")
+
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.mode = mode
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " response TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_used INTEGER NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)"
+        )
+        self._conn.commit()
+
+    @property
+    def reads(self) -> bool:
+        """Whether cached responses are served in this mode."""
+        return self.mode != "record"
+
+    @property
+    def writes(self) -> bool:
+        """Whether fresh responses are stored in this mode."""
+        return self.mode != "replay"
+
+    @staticmethod
+    def key(request: Dict[str, Any], slot: Optional[int] = None) -> str:
+        """
+        Compute the cache key of a request.
+
+        Args:
+            request: The chat completion request body
+            slot: Persona slot index, so that identical requests for different
+                personas get different responses
+
+        Returns:
+            str: The hex digest identifying the request
+        """
+        payload = json.dumps(
+            {"request": request, "slot": slot}, sort_keys=True, ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached response and mark it as recently used.
+
+        Args:
+            key: The cache key
+
+        Returns:
+            Optional[Dict[str, Any]]: The cached response, or None on a miss
+
+        Raises:
+            LookupError: On a miss in replay mode
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                if self.mode == "replay":
+                    raise LookupError(
+                        f"No cached response for request {key[:12]} (replay mode)"
+                    )
+                return None
+            self.hits += 1
+            self._conn.execute(
+                "UPDATE responses SET last_used = ? WHERE key = ?",
+                (time.time_ns(), key),
+            )
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def put(self, key: str, response: Dict[str, Any]) -> None:
+        """
+        Store a response, evicting least recently used entries if needed.
+
+        Args:
+            key: The cache key
+            response: The JSON-serializable chat completion
+        """
+        data = json.dumps(response, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, last_used)"
+                " VALUES (?, ?, ?, ?)",
+                (key, data, len(data.encode("utf-8")), time.time_ns()),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the bounds are respected."""
+        if self.max_entries is not None:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    " SELECT key FROM responses ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+        if self.max_bytes is not None:
+            (total,) = self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+            if total > self.max_bytes:
+                stale = []
+                for key, size in self._conn.execute(
+                    "SELECT key, size FROM responses ORDER BY last_used"
+                ):
+                    if total <= self.max_bytes:
+                        break
+                    stale.append((key,))
+                    total -= size
+                self._conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def summary(self) -> str:
+        """
+        Human-readable one-line summary.
+
+        Returns:
+            str: The summary line
+        """
+        return (
+            f"{self.hits} hit(s), {self.misses} miss(es), "
+            f"{len(self)} cached response(s) in {self.path} ({self.mode})"
+        )
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
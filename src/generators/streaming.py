@@ -0,0 +1,253 @@
+import json
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from openai.types.chat import ChatCompletion
+
+from src.monitoring.metrics import METRICS
+from src.schemas.json_schema import strip_nulls
+from src.schemas.persona_validator import PersonaValidator
+
+_WHITESPACE = " \t\r\n"
+
+# Characters per token, for the usage estimate of cancelled streams (the
+# rule of thumb of the rate limiter's estimate)
+_CHARS_PER_TOKEN = 4
+
+
+class IncrementalObjectParser:
+    """
+    Parses a JSON object fed in chunks, yielding each member once it closes.
+
+    Only the top level is tracked: a member's value, however deeply nested,
+    is decoded in one go when the comma or brace ending it arrives. Text is
+    scanned once, so feeding a completion token by token costs no more than
+    parsing it whole.
+    """
+
+    def __init__(self) -> None:
+        self.text = ""
+        self.fields: Dict[str, Any] = {}
+        self.done = False
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._key: Optional[str] = None
+        self._start = 0  # of the current key or value
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """
+        Add the next piece of text.
+
+        Args:
+            chunk: The text received since the last call
+
+        Returns:
+            List[Tuple[str, Any]]: The members (name, value) closed by the chunk
+
+        Raises:
+            ValueError: If the text is not a JSON object
+        """
+        self.text += chunk
+        text = self.text
+        closed = []
+        for pos in range(self._pos, len(text)):
+            char = text[pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+            if self.done:
+                if char not in _WHITESPACE:
+                    raise ValueError("Unexpected text after the JSON object")
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+                if self._depth == 1:
+                    if char != "{":
+                        raise ValueError("Persona is not a JSON object")
+                    self._start = pos + 1
+            elif self._depth == 0:
+                if char not in _WHITESPACE:
+                    raise ValueError("Persona is not a JSON object")
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    closed.extend(self._close_member(pos))
+                    self.done = True
+            elif self._depth == 1 and char == ":":
+                self._key = self._decode(self._start, pos)
+                self._start = pos + 1
+            elif self._depth == 1 and char == ",":
+                closed.extend(self._close_member(pos))
+        self._pos = len(text)
+        return closed
+
+    def _decode(self, start: int, end: int) -> Any:
+        """Decode the JSON text between two positions."""
+        try:
+            return json.loads(self.text[start:end])
+        except json.JSONDecodeError:
+            raise ValueError("Failed to parse persona as JSON")
+
+    def _close_member(self, end: int) -> List[Tuple[str, Any]]:
+        """Decode the value ending at `end`, if a member is open."""
+        key = self._key
+        if key is None:
+            if self.text[self._start : end].strip():
+                raise ValueError("Failed to parse persona as JSON")
+            return []  # empty object
+        value = self._decode(self._start, end)
+        self.fields[key] = value
+        self._key = None
+        self._start = end + 1
+        return [(key, value)]
+
+
+class PersonaStream:
+    """
+    Collects a streamed single-persona completion, validating fields early.
+
+    Each top-level field is validated as soon as it closes. A closed field
+    can't be fixed by later tokens, so the first invalid one (or text that
+    isn't a JSON object) ends the stream: `add` returns False and the
+    caller cancels the request instead of paying for the rest. The
+    completion then holds the fields received so far, and the usual
+    validation and repair take it from there. The time from the request
+    to the first valid field is recorded in `time_to_first_field_seconds`.
+    """
+
+    def __init__(
+        self,
+        validator: PersonaValidator,
+        started: float,
+        messages: Optional[List[Dict[str, Any]]] = None,
+    ):
+        """
+        Start collecting.
+
+        Args:
+            validator: The compiled schema of the persona
+            started: `time.monotonic()` at which the request was sent
+            messages: The chat messages of the request, to estimate the
+                usage of a cancelled stream
+        """
+        self.validator = validator
+        self.started = started
+        self.messages = messages or []
+        self.parser = IncrementalObjectParser()
+        self.time_to_first_field: Optional[float] = None
+        self.aborted: Optional[str] = None  # why the stream was cancelled
+        self.refusal = ""
+        self.finish_reason: Optional[str] = None
+        self.usage: Any = None
+        self._chunk: Any = None
+
+    def add(self, chunk: Any) -> bool:
+        """
+        Take the next chunk of the stream.
+
+        Args:
+            chunk: A chat completion chunk
+
+        Returns:
+            bool: False once the stream should be cancelled
+        """
+        self._chunk = chunk
+        if getattr(chunk, "usage", None) is not None:
+            self.usage = chunk.usage
+        if not chunk.choices:
+            return True
+        choice = chunk.choices[0]
+        self.finish_reason = choice.finish_reason or self.finish_reason
+        self.refusal += getattr(choice.delta, "refusal", None) or ""
+        if not choice.delta.content:
+            return True
+
+        try:
+            closed = self.parser.feed(choice.delta.content)
+        except ValueError:
+            return self._abort("the response is not a JSON object")
+        fields = self.validator.schema.fields
+        for field_name, value in closed:
+            member = {field_name: value}
+            if field_name in fields:
+                # Strict outputs answer optional fields with null
+                strip_nulls(member, {field_name: fields[field_name]})
+            if member and self.validator.field_errors(field_name, member[field_name]):
+                return self._abort(f"field {field_name} is invalid")
+            if self.time_to_first_field is None:
+                self.time_to_first_field = time.monotonic() - self.started
+                METRICS.observe("time_to_first_field_seconds", self.time_to_first_field)
+        return True
+
+    def _abort(self, reason: str) -> bool:
+        """Record why the stream is cancelled."""
+        self.aborted = reason
+        METRICS.inc("stream_aborts_total")
+        print(f"✂️  Cancelled the response stream: {reason}")
+        return False
+
+    def completion(self) -> ChatCompletion:
+        """
+        Assemble the collected stream into a chat completion.
+
+        A cancelled stream ends with finish reason "length", as it was cut
+        short, and is flagged `cancelled` so that it is never cached. The API
+        only reports usage in the last chunk, so unless it arrived, the
+        tokens of a cancelled stream are estimated from the characters sent
+        and received; they are still billed.
+
+        Returns:
+            ChatCompletion: The completion
+        """
+        content: Optional[str] = self.parser.text
+        if self.aborted and self.parser.fields:
+            # The fields received so far, as a closed object
+            content = json.dumps(self.parser.fields, ensure_ascii=False)
+        if not content and self.refusal:
+            content = None
+        chunk = self._chunk
+        completion = {
+            "id": getattr(chunk, "id", "stream"),
+            "object": "chat.completion",
+            "created": getattr(chunk, "created", int(time.time())),
+            "model": getattr(chunk, "model", ""),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {
+                        "role": "assistant",
+                        "content": content,
+                        "refusal": self.refusal or None,
+                    },
+                    "finish_reason": (
+                        "length" if self.aborted else self.finish_reason or "stop"
+                    ),
+                }
+            ],
+            "usage": self.usage.model_dump() if self.usage is not None else None,
+        }
+        if self.aborted:
+            completion["cancelled"] = True
+            if self.usage is None:
+                completion["usage"] = self._estimated_usage()
+        return ChatCompletion.model_validate(completion)
+
+    def _estimated_usage(self) -> Dict[str, int]:
+        """Estimate the tokens of a stream cancelled before its usage."""
+        chars = sum(len(message.get("content") or "") for message in self.messages)
+        prompt_tokens = chars // _CHARS_PER_TOKEN + 1
+        completion_tokens = len(self.parser.text) // _CHARS_PER_TOKEN + 1
+        METRICS.inc("estimated_usage_total")
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
@@ -0,0 +1,92 @@
+from dataclasses import dataclass
+from typing import Any
+
+
+@dataclass
+class TokenUsage:
+    """Running token accounting for a generator or a single request."""
+
+    requests: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    personas: int = 0
+    repaired: int = 0
+
+    def add(self, usage: Any, personas: int = 0) -> "TokenUsage":
+        """
+        Add the `usage` object of one chat completion.
+
+        Args:
+            usage: The `usage` attribute of a chat completion (may be None)
+            personas: Number of valid personas the request produced
+
+        Returns:
+            TokenUsage: The usage of this single request
+        """
+        details = getattr(usage, "prompt_tokens_details", None)
+        request = TokenUsage(
+            requests=1,
+            prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+            completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+            cached_tokens=getattr(details, "cached_tokens", 0) or 0,
+            personas=personas,
+        )
+        self.merge(request)
+        return request
+
+    def merge(self, other: "TokenUsage") -> None:
+        """
+        Accumulate another usage record into this one.
+
+        Args:
+            other: The usage record to add
+        """
+        self.requests += other.requests
+        self.prompt_tokens += other.prompt_tokens
+        self.completion_tokens += other.completion_tokens
+        self.cached_tokens += other.cached_tokens
+        self.personas += other.personas
+        self.repaired += other.repaired
+
+    @property
+    def total_tokens(self) -> int:
+        """Total prompt and completion tokens."""
+        return self.prompt_tokens + self.completion_tokens
+
+    def cache_hit_rate(self) -> float:
+        """
+        Share of prompt tokens served from the provider's prompt cache.
+
+        Returns:
+            float: Cached prompt tokens divided by prompt tokens
+        """
+        if not self.prompt_tokens:
+            return 0.0
+        return self.cached_tokens / self.prompt_tokens
+
+    def per_persona(self) -> float:
+        """
+        Average number of tokens paid per valid persona.
+
+        Returns:
+            float: Tokens per persona, or 0.0 if no persona was produced
+        """
+        if not self.personas:
+            return 0.0
+        return self.total_tokens / self.personas
+
+    def summary(self) -> str:
+        """
+        Human-readable one-line summary.
+
+        Returns:
+            str: The summary line
+        """
+        repaired = f" ({self.repaired} repaired)" if self.repaired else ""
+        return (
+            f"{self.requests} request(s), {self.personas} persona(s){repaired}, "
+            f"{self.prompt_tokens} prompt ({self.cached_tokens} cached, "
+            f"{self.cache_hit_rate():.0%}) + {self.completion_tokens} completion "
+            f"tokens ({self.per_persona():.0f} tokens/persona)"
+        )
@@ -1,9 +1,24 @@
 import os
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 
 import yaml
 
+from src.exporters.persona_exporter import PersonaExporter
+from src.schemas.registry import REGISTRY
+
+DEFAULT_SCHEMA_PATH = os.path.normpath(
+    os.path.join(
+        os.path.dirname(__file__), "..", "..", "schemas", "default_schema.yaml"
+    )
+)
+
+
+def _parse_yaml(content: bytes) -> Any:
+    """Parse YAML file content without validation."""
+    return yaml.safe_load(content)
+
 
 @dataclass
 class Persona:
@@ -33,16 +48,32 @@ class Persona:
         if not schema_path.endswith((".yaml", ".yml")):
             raise ValueError("Schema file must be YAML (.yaml or .yml)")
 
-        with open(schema_path, "r") as f:
-            schema = yaml.safe_load(f)
-
-        instance = cls(schema=schema)
+        instance = cls(schema=cls.load_schema(schema_path))
 
         if characteristics_path:
             instance.load_characteristics(characteristics_path)
 
         return instance
 
+    @staticmethod
+    def load_schema(schema_path: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Resolve a schema through the shared registry.
+
+        The file is read and parsed once per process (and again only after
+        it changes); every persona gets the same read-only dictionary.
+
+        Args:
+            schema_path: Path to the YAML schema file (default: the default
+                schema)
+
+        Returns:
+            Dict[str, Any]: The raw schema
+        """
+        return REGISTRY.load(
+            "raw_schema", schema_path or DEFAULT_SCHEMA_PATH, _parse_yaml
+        )
+
     def load_characteristics(self, characteristics_path: str) -> None:
         """
         Load characteristics from a YAML file.
@@ -53,8 +84,9 @@ class Persona:
         if not characteristics_path.endswith((".yaml", ".yml")):
             raise ValueError("Characteristics file must be YAML")
 
-        with open(characteristics_path, "r") as f:
-            self._characteristics = yaml.safe_load(f)
+        self._characteristics = REGISTRY.load(
+            "raw_characteristics", characteristics_path, _parse_yaml
+        )
 
     def to_dict(self) -> dict:
         """
@@ -74,21 +106,60 @@ class Persona:
 
         Args:
             data: Dictionary containing persona data
-            schema: Optional schema to validate against
+            schema: Optional schema to validate against (default: the shared
+                default schema)
 
         Returns:
             Persona instance
         """
         if schema is None:
-            # Load default schema from file
-            default_schema_path = os.path.join(
-                os.path.dirname(__file__), "..", "..", "schemas", "default_schema.yaml"
-            )
-            with open(default_schema_path, "r") as f:
-                schema = yaml.safe_load(f)
+            schema = cls.load_schema()
 
         return cls(schema=schema, data=data)
 
+    @classmethod
+    def from_dicts(
+        cls, records: Iterable[Dict[str, Any]], schema: Optional[Dict[str, Any]] = None
+    ) -> Iterator["Persona"]:
+        """
+        Create personas from many dictionaries, resolving the schema once.
+
+        Args:
+            records: Dictionaries containing persona data, consumed lazily
+            schema: Optional schema to validate against (default: the shared
+                default schema)
+
+        Yields:
+            Persona: One persona per record
+        """
+        if schema is None:
+            schema = cls.load_schema()
+        for data in records:
+            yield cls(schema=schema, data=data)
+
+    @classmethod
+    def from_export(
+        cls, path: str, schema: Optional[Dict[str, Any]] = None
+    ) -> Iterator["Persona"]:
+        """
+        Rehydrate the personas of an exported file.
+
+        JSONL exports are streamed; see `PersonaExporter.iter_export`.
+
+        Args:
+            path: Path to a .jsonl, .json or .yaml export
+            schema: Optional schema to validate against (default: the shared
+                default schema)
+
+        Returns:
+            Iterator[Persona]: One persona per exported record
+
+        Raises:
+            ValueError: If the file extension is not supported
+        """
+        records = PersonaExporter.iter_export(Path(path))
+        return cls.from_dicts(records, schema)
+
     def validate(self) -> bool:
         """
         Validate if the persona data matches the schema requirements.
@@ -114,6 +185,10 @@ class Persona:
                         self.data[field_name], (int, float)
                     ):
                         return False
+                    elif field_type == "integer" and not isinstance(
+                        self.data[field_name], int
+                    ):
+                        return False
 
         return True
 
@@ -0,0 +1,441 @@
+import json
+from array import array
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+from src.exporters.persona_exporter import PersonaExporter
+from src.models.schema import FieldDefinition, Schema
+
+# Marks a field absent from a persona
+_MISSING = object()
+
+# Largest integer a float64 stores exactly
+_MAX_EXACT_INT = 2**53
+
+
+class _Column:
+    """
+    Values of one schema field for every persona of a batch.
+
+    Subclasses store the values of their type compactly; anything else (a
+    missing field, None, a value of the wrong type) is kept as is in a sparse
+    `overrides` mapping, so every persona round-trips unchanged.
+    """
+
+    def __init__(self):
+        """Initialize an empty column."""
+        self.overrides: Dict[int, Any] = {}
+        self.length = 0
+
+    def append(self, value: Any) -> None:
+        """
+        Append the value of the next persona.
+
+        Args:
+            value: The value, or `_MISSING` if the persona lacks the field
+        """
+        if value is not _MISSING and self._accepts(value):
+            self._append(value)
+        else:
+            self.overrides[self.length] = value
+            self._append_placeholder()
+        self.length += 1
+
+    def get(self, index: int) -> Any:
+        """
+        Return the value of a persona.
+
+        Args:
+            index: Row of the persona
+
+        Returns:
+            Any: The value, or `_MISSING` if the persona lacks the field
+        """
+        if index in self.overrides:
+            return self.overrides[index]
+        return self._get(index)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the column's storage, in bytes."""
+        return self._nbytes() + 64 * len(self.overrides)
+
+    def _accepts(self, value: Any) -> bool:
+        raise NotImplementedError
+
+    def _append(self, value: Any) -> None:
+        raise NotImplementedError
+
+    def _append_placeholder(self) -> None:
+        raise NotImplementedError
+
+    def _get(self, index: int) -> Any:
+        raise NotImplementedError
+
+    def _nbytes(self) -> int:
+        raise NotImplementedError
+
+
+class _TextColumn(_Column):
+    """Strings packed as UTF-8 into one buffer, delimited by an offsets array."""
+
+    def __init__(self):
+        super().__init__()
+        self.data = bytearray()
+        self.offsets = array("I", [0])
+
+    def _accepts(self, value: Any) -> bool:
+        return isinstance(value, str)
+
+    def _append(self, value: Any) -> None:
+        self._append_bytes(value.encode("utf-8"))
+
+    def _append_bytes(self, encoded: bytes) -> None:
+        self.data += encoded
+        if len(self.data) > 0xFFFFFFFF and self.offsets.typecode == "I":
+            # Widen the offsets once a column outgrows 4 GiB
+            self.offsets = array("Q", self.offsets)
+        self.offsets.append(len(self.data))
+
+    def _append_placeholder(self) -> None:
+        self.offsets.append(len(self.data))
+
+    def _get(self, index: int) -> Any:
+        return self.data[self.offsets[index] : self.offsets[index + 1]].decode("utf-8")
+
+    def _nbytes(self) -> int:
+        return len(self.data) + self.offsets.itemsize * len(self.offsets)
+
+
+class _JsonColumn(_TextColumn):
+    """Arrays or objects stored as compact JSON text."""
+
+    def __init__(self, value_type: type):
+        super().__init__()
+        self.value_type = value_type
+
+    def _accepts(self, value: Any) -> bool:
+        return isinstance(value, self.value_type)
+
+    def _append(self, value: Any) -> None:
+        encoded = json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+        self._append_bytes(encoded.encode("utf-8"))
+
+    def _get(self, index: int) -> Any:
+        return json.loads(super()._get(index))
+
+
+class _CategoryColumn(_Column):
+    """Dictionary-encoded values of an `options` field."""
+
+    def __init__(self, options: Sequence[str]):
+        super().__init__()
+        self.categories = list(options)
+        self.lookup = {option: code for code, option in enumerate(self.categories)}
+        self.codes = array("B" if len(self.categories) < 256 else "I")
+
+    def _accepts(self, value: Any) -> bool:
+        return isinstance(value, str) and value in self.lookup
+
+    def _append(self, value: Any) -> None:
+        self.codes.append(self.lookup[value])
+
+    def _append_placeholder(self) -> None:
+        self.codes.append(0)
+
+    def _get(self, index: int) -> Any:
+        return self.categories[self.codes[index]]
+
+    def _nbytes(self) -> int:
+        return self.codes.itemsize * len(self.codes)
+
+
+class _NumberColumn(_Column):
+    """Numbers in a float64 array, with a flag restoring integers."""
+
+    def __init__(self):
+        super().__init__()
+        self.values = array("d")
+        self.is_int = bytearray()
+
+    def _accepts(self, value: Any) -> bool:
+        if isinstance(value, bool):
+            return False
+        if isinstance(value, int):
+            return abs(value) <= _MAX_EXACT_INT
+        return isinstance(value, float)
+
+    def _append(self, value: Any) -> None:
+        self.values.append(value)
+        self.is_int.append(isinstance(value, int))
+
+    def _append_placeholder(self) -> None:
+        self.values.append(0.0)
+        self.is_int.append(0)
+
+    def _get(self, index: int) -> Any:
+        value = self.values[index]
+        return int(value) if self.is_int[index] else value
+
+    def _nbytes(self) -> int:
+        return 9 * len(self.values)
+
+
+class _BooleanColumn(_Column):
+    """Booleans, one byte each."""
+
+    def __init__(self):
+        super().__init__()
+        self.values = bytearray()
+
+    def _accepts(self, value: Any) -> bool:
+        return isinstance(value, bool)
+
+    def _append(self, value: Any) -> None:
+        self.values.append(value)
+
+    def _append_placeholder(self) -> None:
+        self.values.append(0)
+
+    def _get(self, index: int) -> Any:
+        return bool(self.values[index])
+
+    def _nbytes(self) -> int:
+        return len(self.values)
+
+
+def _column_for(field_def: FieldDefinition) -> _Column:
+    """Pick the storage of a schema field."""
+    if field_def.options:
+        return _CategoryColumn(field_def.options)
+    if field_def.type in ("number", "integer"):
+        return _NumberColumn()
+    if field_def.type == "boolean":
+        return _BooleanColumn()
+    if field_def.type == "array":
+        return _JsonColumn(list)
+    if field_def.type == "object":
+        return _JsonColumn(dict)
+    return _TextColumn()
+
+
+class PersonaRow(Mapping):
+    """
+    Read-only view of one persona of a `PersonaBatch`.
+
+    Values are decoded from the columns on access; use `to_dict` for a
+    standalone copy.
+    """
+
+    __slots__ = ("_batch", "_index")
+
+    def __init__(self, batch: "PersonaBatch", index: int):
+        """
+        Initialize the view.
+
+        Args:
+            batch: The batch holding the persona
+            index: Row of the persona
+        """
+        self._batch = batch
+        self._index = index
+
+    def __getitem__(self, key: str) -> Any:
+        column = self._batch._columns.get(key)
+        if column is None:
+            return self._batch._extras.get(self._index, {})[key]
+        value = column.get(self._index)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        for name, column in self._batch._columns.items():
+            if column.overrides.get(self._index, None) is not _MISSING:
+                yield name
+        yield from self._batch._extras.get(self._index, {})
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"PersonaRow({self.to_dict()!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Copy the persona to its dictionary form.
+
+        Returns:
+            Dict[str, Any]: The persona data
+        """
+        return dict(self.items())
+
+
+class PersonaBatch:
+    """
+    Column-wise container for a large number of personas of one schema.
+
+    Each schema field is a column: `options` fields are dictionary-encoded,
+    numbers and booleans are array-backed and other strings (and JSON-encoded
+    arrays and objects) are packed into one UTF-8 buffer per field. The
+    schema is shared by the whole batch. Fields the schema doesn't declare
+    are kept per persona, so any dictionary round-trips unchanged.
+
+    Compared with a list of dictionaries, this drops the per-persona dict and
+    the ~80 bytes of object overhead of every value, which dominate personas
+    made of short fields; long free text is stored at its UTF-8 size.
+    """
+
+    def __init__(self, schema: Schema):
+        """
+        Initialize an empty batch.
+
+        Args:
+            schema: Schema of the personas
+        """
+        self.schema = schema
+        self._columns: Dict[str, _Column] = {
+            name: _column_for(field_def) for name, field_def in schema.fields.items()
+        }
+        self._extras: Dict[int, Dict[str, Any]] = {}
+        self._length = 0
+
+    @classmethod
+    def from_dicts(
+        cls, schema: Schema, records: Iterable[Dict[str, Any]]
+    ) -> "PersonaBatch":
+        """
+        Build a batch from personas in their dictionary form.
+
+        Args:
+            schema: Schema of the personas
+            records: Persona dictionaries, consumed lazily
+
+        Returns:
+            PersonaBatch: The batch
+        """
+        batch = cls(schema)
+        batch.extend(records)
+        return batch
+
+    @classmethod
+    def from_export(cls, schema: Schema, path: Union[str, Path]) -> "PersonaBatch":
+        """
+        Load the personas of an export, streaming JSONL exports.
+
+        Args:
+            schema: Schema of the personas
+            path: Path to a .jsonl, .json or .yaml export
+
+        Returns:
+            PersonaBatch: The batch
+
+        Raises:
+            ValueError: If the file extension is not supported
+        """
+        return cls.from_dicts(schema, PersonaExporter.iter_export(Path(path)))
+
+    def append(self, persona: Dict[str, Any]) -> None:
+        """
+        Add a persona.
+
+        Args:
+            persona: The persona data
+        """
+        for name, column in self._columns.items():
+            column.append(persona.get(name, _MISSING))
+        extras = {
+            key: value for key, value in persona.items() if key not in self._columns
+        }
+        if extras:
+            self._extras[self._length] = extras
+        self._length += 1
+
+    def extend(self, personas: Iterable[Dict[str, Any]]) -> None:
+        """
+        Add many personas.
+
+        Args:
+            personas: The persona data, consumed lazily
+        """
+        for persona in personas:
+            self.append(persona)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(
+        self, index: Union[int, slice]
+    ) -> Union[PersonaRow, "PersonaBatch"]:
+        """
+        Return a view of one persona, or a new batch for a slice.
+
+        Args:
+            index: Row of a persona (negative counts from the end) or a slice
+
+        Returns:
+            Union[PersonaRow, PersonaBatch]: The row view or the sliced batch
+
+        Raises:
+            IndexError: If the row is out of range
+        """
+        if isinstance(index, slice):
+            return self.take(range(*index.indices(self._length)))
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("PersonaBatch index out of range")
+        return PersonaRow(self, index)
+
+    def __iter__(self) -> Iterator[PersonaRow]:
+        for index in range(self._length):
+            yield PersonaRow(self, index)
+
+    def take(self, indices: Iterable[int]) -> "PersonaBatch":
+        """
+        Copy some personas into a new batch sharing the schema.
+
+        Args:
+            indices: Rows of the personas, in the order to keep
+
+        Returns:
+            PersonaBatch: The new batch
+        """
+        return PersonaBatch.from_dicts(
+            self.schema, (self[index].to_dict() for index in indices)
+        )
+
+    def column(self, name: str) -> List[Optional[Any]]:
+        """
+        Return the values of one field for every persona.
+
+        Args:
+            name: Name of a schema field
+
+        Returns:
+            List[Optional[Any]]: One value per persona (None where missing)
+
+        Raises:
+            KeyError: If the schema has no such field
+        """
+        column = self._columns[name]
+        values = [column.get(index) for index in range(self._length)]
+        return [None if value is _MISSING else value for value in values]
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """
+        Convert every persona to its dictionary form.
+
+        Returns:
+            List[Dict[str, Any]]: The persona data, e.g. for an exporter
+        """
+        return [row.to_dict() for row in self]
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the personas, in bytes."""
+        extras = sum(
+            len(json.dumps(persona, default=str)) for persona in self._extras.values()
+        )
+        return sum(column.nbytes for column in self._columns.values()) + extras
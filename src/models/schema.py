@@ -13,6 +13,7 @@ class FieldDefinition(BaseModel):
     min_length: Optional[int] = None
     max_length: Optional[int] = None
     characteristics: Optional[List[str]] = None
+    fields: Optional[Dict[str, "FieldDefinition"]] = None  # of an object
 
 
 class Schema(BaseModel):
@@ -0,0 +1,327 @@
+import bisect
+import json
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Upper bounds of the latency buckets, in seconds
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+# Upper bounds of the token-count buckets
+TOKEN_BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 100000)
+
+# Histograms whose name matches get token buckets instead of latency buckets
+_TOKEN_HISTOGRAMS = ("tokens",)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative-bucket histogram with count, sum, min and max."""
+
+    def __init__(self, buckets: Sequence[float]):
+        """
+        Initialize an empty histogram.
+
+        Args:
+            buckets: Sorted upper bounds of the buckets (+Inf is implicit)
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+
+    def observe(self, value: float) -> None:
+        """
+        Record one value.
+
+        Args:
+            value: The observed value
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a quantile by interpolating inside its bucket.
+
+        Args:
+            q: The quantile, between 0 and 1
+
+        Returns:
+            float: The estimated value (0.0 if the histogram is empty)
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[index - 1] if index else min(self.min, 0.0)
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                lower, upper = max(lower, self.min), min(upper, self.max)
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        """
+        Summarize the histogram.
+
+        Returns:
+            Dict[str, float]: count, sum, mean, min, max, p50, p90 and p99
+        """
+        if not self.count:
+            return {"count": 0, "sum": 0.0}
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+        }
+
+
+class MetricsRegistry:
+    """
+    Process-wide counters and histograms for a generation run.
+
+    Stages are timed with `span`, which records their wall time in the
+    `stage_seconds` histogram under a `stage` label. The registry can be
+    dumped as a JSON summary or as a Prometheus text snapshot.
+    """
+
+    def __init__(self, prefix: str = "persona"):
+        """
+        Initialize an empty registry.
+
+        Args:
+            prefix: Prefix of the metric names in the Prometheus snapshot
+        """
+        self.prefix = prefix
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(labels: Dict[str, Any]) -> LabelKey:
+        return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+    def inc(self, name: str, amount: float = 1, **labels: Any) -> None:
+        """
+        Increment a counter.
+
+        Args:
+            name: Name of the counter (conventionally ending in `_total`)
+            amount: Amount to add
+            **labels: Label values of the series
+        """
+        key = self._key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        """
+        Record a value in a histogram.
+
+        Args:
+            name: Name of the histogram
+            value: The observed value
+            **labels: Label values of the series
+        """
+        key = self._key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                is_tokens = any(word in name for word in _TOKEN_HISTOGRAMS)
+                histogram = Histogram(TOKEN_BUCKETS if is_tokens else LATENCY_BUCKETS)
+                series[key] = histogram
+            histogram.observe(value)
+
+    @contextmanager
+    def span(self, stage: str, **labels: Any) -> Iterator[None]:
+        """
+        Time a stage and record its duration, even if it raises.
+
+        Args:
+            stage: Name of the stage (schema_load, prompt_build, api, ...)
+            **labels: Extra label values of the series
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(
+                "stage_seconds", time.perf_counter() - start, stage=stage, **labels
+            )
+
+    def counter(self, name: str, **labels: Any) -> float:
+        """
+        Read a counter.
+
+        Args:
+            name: Name of the counter
+            **labels: Label values of the series
+
+        Returns:
+            float: The counter value (0 if it was never incremented)
+        """
+        with self._lock:
+            return self._counters.get(name, {}).get(self._key(labels), 0)
+
+    def total(self, name: str) -> float:
+        """
+        Sum a counter over all of its label values.
+
+        Args:
+            name: Name of the counter
+
+        Returns:
+            float: The sum of every series (0 if it was never incremented)
+        """
+        with self._lock:
+            return sum(self._counters.get(name, {}).values())
+
+    def histogram(self, name: str, **labels: Any) -> Optional[Histogram]:
+        """
+        Read a histogram.
+
+        Args:
+            name: Name of the histogram
+            **labels: Label values of the series
+
+        Returns:
+            Optional[Histogram]: The histogram, or None if nothing was observed
+        """
+        with self._lock:
+            return self._histograms.get(name, {}).get(self._key(labels))
+
+    def reset(self) -> None:
+        """Drop every recorded value."""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Summarize every metric.
+
+        Returns:
+            Dict[str, Any]: Counters and histogram summaries, each as a list of
+                series with their labels
+        """
+        with self._lock:
+            return {
+                "counters": {
+                    name: [
+                        {"labels": dict(key), "value": value}
+                        for key, value in sorted(series.items())
+                    ]
+                    for name, series in sorted(self._counters.items())
+                },
+                "histograms": {
+                    name: [
+                        {"labels": dict(key), **histogram.summary()}
+                        for key, histogram in sorted(series.items())
+                    ]
+                    for name, series in sorted(self._histograms.items())
+                },
+            }
+
+    def to_prometheus(self) -> str:
+        """
+        Render a snapshot in the Prometheus text exposition format.
+
+        Returns:
+            str: The snapshot
+        """
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                metric = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {metric} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{metric}{_labels(key)} {_number(value)}")
+            for name, series in sorted(self._histograms.items()):
+                metric = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {metric} histogram")
+                for key, histogram in sorted(series.items()):
+                    cumulative = 0
+                    bounds = [*map(_number, histogram.buckets), "+Inf"]
+                    for bound, count in zip(bounds, histogram.counts):
+                        cumulative += count
+                        bucket_labels = _labels(key + (("le", bound),))
+                        lines.append(f"{metric}_bucket{bucket_labels} {cumulative}")
+                    lines.append(f"{metric}_sum{_labels(key)} {_number(histogram.sum)}")
+                    lines.append(f"{metric}_count{_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str) -> Tuple[Path, Path]:
+        """
+        Write the JSON summary and the Prometheus snapshot.
+
+        Args:
+            path: Path of the JSON summary; the snapshot is written next to it
+                with a `.prom` suffix
+
+        Returns:
+            Tuple[Path, Path]: Paths of the JSON summary and the snapshot
+        """
+        json_path = Path(path)
+        prom_path = json_path.with_suffix(".prom")
+        json_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(json_path, "w") as f:
+            json.dump(self.summary(), f, indent=4)
+        prom_path.write_text(self.to_prometheus())
+        return json_path, prom_path
+
+
+def _labels(key: LabelKey) -> str:
+    """Render label pairs as `{name="value",...}`."""
+    if not key:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in key)
+    return "{" + pairs + "}"
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the Prometheus text format."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    """Render a number without a trailing `.0` for integers."""
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+# Registry shared by the generators, the factory and the exporter
+METRICS = MetricsRegistry()
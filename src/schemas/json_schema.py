@@ -0,0 +1,202 @@
+from typing import Any, Collection, Dict, Optional, Tuple
+
+from src.models.schema import FieldDefinition, Schema
+
+JSON_TYPES = {
+    "string": "string",
+    "number": "number",
+    "integer": "integer",
+    "boolean": "boolean",
+    "array": "array",
+    "object": "object",
+}
+
+# Wrapper of batched personas: structured outputs need an object at the root
+BATCH_KEY = "personas"
+
+
+def _compile_field(field_def: FieldDefinition) -> Tuple[Dict[str, Any], bool]:
+    """
+    Compile one field definition into a JSON Schema.
+
+    Args:
+        field_def: Definition of the field
+
+    Returns:
+        Tuple[Dict[str, Any], bool]: The JSON Schema of the field, and
+            whether it can be enforced strictly (every object declares its
+            fields and every type is known)
+    """
+    compiled: Dict[str, Any] = {"description": field_def.description}
+    if field_def.options:
+        # Options are matched as strings by the validator, whatever the type
+        compiled.update(type="string", enum=list(field_def.options))
+        return compiled, True
+
+    json_type = JSON_TYPES.get(field_def.type)
+    if json_type is None:
+        return compiled, False
+    compiled["type"] = json_type
+    if json_type == "string":
+        if field_def.min_length:
+            compiled["minLength"] = field_def.min_length
+        if field_def.max_length:
+            compiled["maxLength"] = field_def.max_length
+    elif json_type == "array":
+        compiled["items"] = {"type": "string"}
+    elif json_type == "object":
+        if not field_def.fields:
+            return compiled, False
+        nested, strict = _compile_object(field_def.fields)
+        compiled.update(nested)
+        return compiled, strict
+    return compiled, True
+
+
+def _compile_object(
+    fields: Dict[str, FieldDefinition], nullable_optional: bool = True
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    Compile a set of fields into the JSON Schema of an object.
+
+    Strict structured outputs require every property to be listed as
+    required, so optional fields are required but nullable instead; the
+    nulls are dropped again by `strip_nulls`.
+
+    Args:
+        fields: Definitions of the fields by name
+        nullable_optional: Whether optional fields accept null. If False,
+            every field is required as a value.
+
+    Returns:
+        Tuple[Dict[str, Any], bool]: The JSON Schema of the object, and
+            whether it can be enforced strictly
+    """
+    properties: Dict[str, Any] = {}
+    strict = True
+    for field_name, field_def in fields.items():
+        compiled, field_strict = _compile_field(field_def)
+        if nullable_optional and not field_def.required:
+            compiled = {"anyOf": [compiled, {"type": "null"}]}
+        properties[field_name] = compiled
+        strict = strict and field_strict
+    return (
+        {
+            "type": "object",
+            "properties": properties,
+            "required": list(properties),
+            "additionalProperties": False,
+        },
+        strict,
+    )
+
+
+def to_json_schema(
+    schema: Schema, fields: Optional[Collection[str]] = None
+) -> Dict[str, Any]:
+    """
+    Compile a persona schema into the JSON Schema of one persona.
+
+    Field types map to JSON types, `options` to an enum, `min_length` and
+    `max_length` to `minLength`/`maxLength`, and object fields to nested
+    objects of their `fields`. Arrays are arrays of strings.
+
+    Args:
+        schema: The persona schema
+        fields: Names of the only fields to include, all required (e.g. the
+            fields regenerated by a repair request). Defaults to every field,
+            with optional ones nullable.
+
+    Returns:
+        Dict[str, Any]: The JSON Schema
+    """
+    if fields is None:
+        compiled, _ = _compile_object(schema.fields)
+    else:
+        compiled, _ = _compile_object(
+            {name: schema.fields[name] for name in fields}, nullable_optional=False
+        )
+    return compiled
+
+
+def is_strict_compatible(schema: Schema) -> bool:
+    """
+    Check whether every field of a schema can be enforced strictly.
+
+    Objects without declared `fields` (free-form) and unknown types can't
+    be expressed in strict mode.
+
+    Args:
+        schema: The persona schema
+
+    Returns:
+        bool: True if a strict `response_format` can be sent
+    """
+    return _compile_object(schema.fields)[1]
+
+
+def response_format(
+    schema: Schema,
+    batch: bool = False,
+    fields: Optional[Collection[str]] = None,
+    strict: bool = True,
+) -> Dict[str, Any]:
+    """
+    Build the `response_format` of a chat completion request.
+
+    Args:
+        schema: The persona schema
+        batch: Whether several personas are requested; they are returned
+            in a `personas` array, as the root must be an object
+        fields: Names of the only fields to request (repair requests)
+        strict: Ask for strict schema adherence. It is turned off for
+            schemas that can't be enforced strictly.
+
+    Returns:
+        Dict[str, Any]: The `json_schema` response format
+    """
+    compiled = to_json_schema(schema, fields)
+    name = "persona_repair" if fields is not None else "persona"
+    if batch:
+        name = "persona_batch"
+        compiled = {
+            "type": "object",
+            "properties": {BATCH_KEY: {"type": "array", "items": compiled}},
+            "required": [BATCH_KEY],
+            "additionalProperties": False,
+        }
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": name,
+            "strict": strict and is_strict_compatible(schema),
+            "schema": compiled,
+        },
+    }
+
+
+def strip_nulls(persona: Any, fields: Dict[str, FieldDefinition]) -> Any:
+    """
+    Drop the null values of optional fields, recursively.
+
+    Strict structured outputs answer an optional field the model leaves out
+    with null; dropping it makes the persona look as if the field was
+    omitted.
+
+    Args:
+        persona: The parsed persona (returned as is if not an object)
+        fields: Definitions of its fields
+
+    Returns:
+        Any: The persona, without null optional fields
+    """
+    if not isinstance(persona, dict):
+        return persona
+    for field_name, field_def in fields.items():
+        value = persona.get(field_name)
+        if value is None:
+            if not field_def.required and field_name in persona:
+                del persona[field_name]
+        elif field_def.fields:
+            strip_nulls(value, field_def.fields)
+    return persona
@@ -1,9 +1,9 @@
 import os
-from pathlib import Path
 from typing import Any, List
 
 import yaml
 
+from src.schemas.registry import REGISTRY
 from src.schemas.validator import SchemaValidator
 
 
@@ -21,6 +21,10 @@ class SchemaLoader:
     def load_schema(self, schema_name: str) -> Any:
         """Load a schema from a YAML file.
 
+        Validated schemas are cached process-wide by path, mtime and content
+        hash (see `src.schemas.registry`), so the file is only parsed again
+        after it changes. The returned object is shared and read-only.
+
         Args:
             schema_name (str): Name of the schema file (without extension)
 
@@ -35,16 +39,9 @@ class SchemaLoader:
         if not os.path.exists(schema_path):
             raise FileNotFoundError(f"Schema file not found: {schema_path}")
 
-        try:
-            with open(schema_path, "r") as f:
-                schema_data = yaml.safe_load(f)
-        except yaml.YAMLError as e:
-            raise ValueError(f"Invalid YAML format: {e}")
-
         if schema_name == "characteristics":
-            return SchemaValidator.validate_characteristics(schema_data)
-        else:
-            return SchemaValidator.validate_schema(schema_data)
+            return REGISTRY.load("characteristics", schema_path, _parse_characteristics)
+        return REGISTRY.load("schema", schema_path, _parse_schema)
 
     def list_schemas(self) -> List[str]:
         """List all available schema files.
@@ -52,8 +49,22 @@ class SchemaLoader:
         Returns:
             List[str]: List of schema names (without extension)
         """
-        schemas = []
-        for file in os.listdir(self.schema_dir):
-            if file.endswith(".yaml"):
-                schemas.append(Path(file).stem)
-        return schemas
+        return REGISTRY.list_files(self.schema_dir, ".yaml")
+
+
+def _parse_yaml(content: bytes) -> Any:
+    """Parse YAML file content."""
+    try:
+        return yaml.safe_load(content)
+    except yaml.YAMLError as e:
+        raise ValueError(f"Invalid YAML format: {e}")
+
+
+def _parse_schema(content: bytes) -> Any:
+    """Parse and validate a schema file."""
+    return SchemaValidator.validate_schema(_parse_yaml(content))
+
+
+def _parse_characteristics(content: bytes) -> Any:
+    """Parse and validate a characteristics catalog."""
+    return SchemaValidator.validate_characteristics(_parse_yaml(content))
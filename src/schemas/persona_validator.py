@@ -0,0 +1,224 @@
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from src.models.schema import FieldDefinition, Schema
+
+PYTHON_TYPES = {
+    "string": str,
+    "number": (int, float),
+    "integer": int,
+    "boolean": bool,
+    "array": list,
+    "object": dict,
+}
+
+TYPE_NAMES = {
+    "string": "a string",
+    "number": "a number",
+    "integer": "an integer",
+    "boolean": "a boolean",
+    "array": "an array",
+    "object": "an object",
+}
+
+
+@dataclass(frozen=True)
+class Violation:
+    """A single constraint violation found in a persona."""
+
+    field: str
+    code: str
+    message: str
+
+
+FieldCheck = Callable[[Dict[str, Any]], Tuple[Violation, ...]]
+
+_MISSING = object()
+_OK: Tuple[Violation, ...] = ()
+_NOT_AN_OBJECT = [Violation("", "type", "Persona should be an object")]
+
+
+def _compile_field(field_name: str, field_def: FieldDefinition) -> FieldCheck:
+    """
+    Compile the constraints of one field into a single check closure.
+
+    Everything that does not depend on the persona (expected type, length
+    bounds, option set, messages) is resolved here, once.
+
+    Args:
+        field_name: Name of the field
+        field_def: Definition of the field
+
+    Returns:
+        FieldCheck: Function returning the violations of the field
+    """
+    required = field_def.required
+    missing = (
+        (Violation(field_name, "missing", f"Missing required field: {field_name}"),)
+        if required
+        else _OK
+    )
+
+    python_type = PYTHON_TYPES.get(field_def.type)
+    wrong_type = (
+        Violation(
+            field_name,
+            "type",
+            f"Field {field_name} should be {TYPE_NAMES.get(field_def.type)}",
+        ),
+    )
+
+    is_string = field_def.type == "string"
+    min_length = field_def.min_length or 0
+    max_length = field_def.max_length or 0
+    too_short = Violation(
+        field_name,
+        "min_length",
+        f"Field {field_name} is too short (min length: {min_length})",
+    )
+    too_long = Violation(
+        field_name,
+        "max_length",
+        f"Field {field_name} is too long (max length: {max_length})",
+    )
+    check_length = is_string and (min_length or max_length)
+
+    options = field_def.options or None
+    option_set = frozenset(options) if options else frozenset()
+
+    def check(persona: Dict[str, Any]) -> Tuple[Violation, ...]:
+        value = persona.get(field_name, _MISSING)
+        if value is _MISSING:
+            return missing
+        if python_type is not None and not isinstance(value, python_type):
+            return wrong_type
+
+        violations: Tuple[Violation, ...] = _OK
+        if check_length:
+            length = len(value)
+            if min_length and length < min_length:
+                violations = (too_short,)
+            elif max_length and length > max_length:
+                violations = (too_long,)
+        if options is not None:
+            try:
+                allowed = value in option_set
+            except TypeError:
+                allowed = False
+            if not allowed:
+                violations += (
+                    Violation(
+                        field_name,
+                        "option",
+                        f"Field {field_name} value '{value}' "
+                        f"not in allowed options: {options}",
+                    ),
+                )
+        return violations
+
+    return check
+
+
+class PersonaValidator:
+    """
+    Schema compiled into a flat list of per-field check closures.
+
+    Compiling happens once per schema; checking a persona is then a single
+    pass over the closures that collects every violation instead of stopping
+    at the first one.
+    """
+
+    def __init__(self, schema: Schema):
+        """
+        Compile a schema.
+
+        Args:
+            schema: The schema personas are validated against
+        """
+        self.schema = schema
+        self.checks: List[Tuple[str, FieldCheck]] = [
+            (field_name, _compile_field(field_name, field_def))
+            for field_name, field_def in schema.fields.items()
+        ]
+        self._field_checks = dict(self.checks)
+
+    def errors(self, persona: Dict[str, Any]) -> List[Violation]:
+        """
+        Check a persona against every field of the schema.
+
+        Args:
+            persona: The persona data
+
+        Returns:
+            List[Violation]: All violations, in schema field order
+        """
+        if not isinstance(persona, dict):
+            return list(_NOT_AN_OBJECT)
+        violations: List[Violation] = []
+        for _, check in self.checks:
+            found = check(persona)
+            if found:
+                violations.extend(found)
+        return violations
+
+    def is_valid(self, persona: Dict[str, Any]) -> bool:
+        """
+        Check whether a persona is valid, stopping at the first violation.
+
+        Args:
+            persona: The persona data
+
+        Returns:
+            bool: True if the persona is valid
+        """
+        if not isinstance(persona, dict):
+            return False
+        for _, check in self.checks:
+            if check(persona):
+                return False
+        return True
+
+    def field_errors(self, field_name: str, value: Any) -> List[Violation]:
+        """
+        Check a single field value.
+
+        Args:
+            field_name: Name of the field
+            value: The value to check
+
+        Returns:
+            List[Violation]: The violations of the value (unknown fields have
+                none)
+        """
+        check = self._field_checks.get(field_name)
+        if check is None:
+            return []
+        return list(check({field_name: value}))
+
+    def validate_many(
+        self, personas: Iterable[Dict[str, Any]]
+    ) -> List[List[Violation]]:
+        """
+        Check many personas in one call.
+
+        Args:
+            personas: The persona data to check
+
+        Returns:
+            List[List[Violation]]: The violations of each persona, in input
+                order (an empty list for a valid persona)
+        """
+        checks = [check for _, check in self.checks]
+        results: List[List[Violation]] = []
+        append = results.append
+        for persona in personas:
+            if not isinstance(persona, dict):
+                append(list(_NOT_AN_OBJECT))
+                continue
+            violations: List[Violation] = []
+            for check in checks:
+                found = check(persona)
+                if found:
+                    violations.extend(found)
+            append(violations)
+        return results
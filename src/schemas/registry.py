@@ -0,0 +1,175 @@
+import hashlib
+import os
+import pickle
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Environment variable naming the default on-disk snapshot
+SNAPSHOT_ENV = "PERSONA_REGISTRY_SNAPSHOT"
+
+
+class _Entry:
+    """A validated object and the file state it was built from."""
+
+    __slots__ = ("stat", "digest", "value")
+
+    def __init__(self, stat: Tuple[int, int], digest: str, value: Any):
+        self.stat = stat
+        self.digest = digest
+        self.value = value
+
+
+class Registry:
+    """
+    Process-wide cache of validated schemas, catalogs and configs.
+
+    Objects are cached by kind and resolved path. A file whose mtime and size
+    are unchanged is served without being read; a changed file is hashed and
+    only parsed again if its content changed. Cached objects are shared by
+    every caller and must be treated as read-only.
+
+    With a snapshot path, every parsed object is also pickled to disk under
+    its content hash, so a fresh process (e.g. a short-lived worker) reading
+    the same files skips YAML parsing and validation entirely. The snapshot
+    is a local cache trusted like the code itself; never point it at a file
+    from an untrusted source.
+    """
+
+    def __init__(self, snapshot_path: Optional[str] = None):
+        """
+        Initialize an empty registry.
+
+        Args:
+            snapshot_path: Path of the on-disk snapshot (optional)
+        """
+        self.snapshot_path = Path(snapshot_path) if snapshot_path else None
+        self._entries: Dict[Tuple[str, str], _Entry] = {}
+        self._listings: Dict[Tuple[str, str], Tuple[int, List[str]]] = {}
+        self._snapshot: Optional[Dict[Tuple[str, str], Any]] = None
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.parses = 0
+
+    def configure_snapshot(self, snapshot_path: Optional[str]) -> None:
+        """
+        Use another on-disk snapshot (None to disable it).
+
+        Args:
+            snapshot_path: Path of the snapshot file
+        """
+        with self._lock:
+            self.snapshot_path = Path(snapshot_path) if snapshot_path else None
+            self._snapshot = None
+
+    def load(self, kind: str, path: str, parse: Callable[[bytes], Any]) -> Any:
+        """
+        Return the validated object of a file, parsing it only if needed.
+
+        Args:
+            kind: Kind of object ("schema", "characteristics", "config"), part
+                of the cache key
+            path: Path of the file
+            parse: Function turning the file content into the validated
+                object; its errors propagate and nothing is cached
+
+        Returns:
+            Any: The cached or freshly parsed object
+
+        Raises:
+            FileNotFoundError: If the file doesn't exist
+        """
+        resolved = os.path.realpath(path)
+        try:
+            status = os.stat(resolved)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"File not found: {path}")
+        stat = (status.st_mtime_ns, status.st_size)
+        key = (kind, resolved)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.stat == stat:
+                self.hits += 1
+                return entry.value
+
+            with open(resolved, "rb") as f:
+                content = f.read()
+            digest = hashlib.sha256(content).hexdigest()
+            if entry is not None and entry.digest == digest:
+                # Touched but unchanged
+                entry.stat = stat
+                self.hits += 1
+                return entry.value
+
+            self.misses += 1
+            snapshot = self._load_snapshot()
+            value = snapshot.get((kind, digest))
+            if value is None:
+                value = parse(content)
+                self.parses += 1
+                if self.snapshot_path is not None:
+                    snapshot[(kind, digest)] = value
+                    self._save_snapshot(snapshot)
+            self._entries[key] = _Entry(stat, digest, value)
+            return value
+
+    def list_files(self, directory: str, suffix: str = ".yaml") -> List[str]:
+        """
+        List the file stems with a suffix in a directory, cached until it changes.
+
+        Args:
+            directory: Directory to scan
+            suffix: File suffix to keep
+
+        Returns:
+            List[str]: File names without the suffix, sorted
+        """
+        resolved = os.path.realpath(directory)
+        mtime = os.stat(resolved).st_mtime_ns
+        key = (resolved, suffix)
+        with self._lock:
+            cached = self._listings.get(key)
+            if cached is not None and cached[0] == mtime:
+                return list(cached[1])
+            names = sorted(
+                Path(name).stem
+                for name in os.listdir(resolved)
+                if name.endswith(suffix)
+            )
+            self._listings[key] = (mtime, names)
+            return list(names)
+
+    def clear(self) -> None:
+        """Forget every cached object (the on-disk snapshot is kept)."""
+        with self._lock:
+            self._entries.clear()
+            self._listings.clear()
+            self._snapshot = None
+
+    def _load_snapshot(self) -> Dict[Tuple[str, str], Any]:
+        """Read the on-disk snapshot once; an unreadable one is ignored."""
+        if self._snapshot is None:
+            self._snapshot = {}
+            if self.snapshot_path is not None and self.snapshot_path.exists():
+                try:
+                    with open(self.snapshot_path, "rb") as f:
+                        self._snapshot = pickle.load(f)
+                except Exception as e:
+                    print(f"⚠️  Ignoring unreadable registry snapshot: {e}")
+        return self._snapshot
+
+    def _save_snapshot(self, snapshot: Dict[Tuple[str, str], Any]) -> None:
+        """Write the snapshot atomically, so concurrent readers never see half."""
+        self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.snapshot_path.with_name(
+            f"{self.snapshot_path.name}.{os.getpid()}.tmp"
+        )
+        with open(tmp_path, "wb") as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.snapshot_path)
+
+
+# Registry shared by the schema and config loaders
+REGISTRY = Registry(os.environ.get(SNAPSHOT_ENV))
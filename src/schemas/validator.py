@@ -60,7 +60,7 @@ class SchemaValidator:
             if key not in field_data:
                 return False
 
-        valid_types = ["string", "number", "boolean", "array", "object"]
+        valid_types = ["string", "number", "integer", "boolean", "array", "object"]
         if field_data["type"] not in valid_types:
             return False
 
@@ -0,0 +1,677 @@
+import hashlib
+import itertools
+import json
+import math
+import random
+import re
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from src.models.schema import FieldDefinition, Schema
+from src.schemas.json_schema import BATCH_KEY
+
+Responder = Callable[[Dict[str, Any]], str]
+
+# Characters of content per streamed chunk (a couple of tokens)
+STREAM_CHUNK_CHARS = 8
+Latency = Callable[[random.Random], float]
+
+
+def lognormal_latency(median: float, p99: float) -> Latency:
+    """
+    Build a log-normal latency distribution, the usual shape of API latency.
+
+    Args:
+        median: Median latency in seconds
+        p99: 99th percentile latency in seconds (at least the median)
+
+    Returns:
+        Latency: A function drawing one latency, in seconds, from a generator
+    """
+    if median <= 0 or p99 < median:
+        raise ValueError("Latency needs 0 < median <= p99")
+    # z-score of the 99th percentile of the standard normal distribution
+    sigma = math.log(p99 / median) / 2.326
+    mu = math.log(median)
+    return lambda rng: rng.lognormvariate(mu, sigma)
+
+
+def _fake_value(field_name: str, field_def: FieldDefinition, seed: int) -> Any:
+    """Build a value satisfying the constraints of one field."""
+    if field_def.options:
+        return field_def.options[seed % len(field_def.options)]
+    if field_def.type in ("number", "integer"):
+        return 18 + seed % 50
+    if field_def.type == "boolean":
+        return seed % 2 == 0
+    if field_def.type == "array":
+        return [f"{field_name} {seed}"]
+    if field_def.type == "object":
+        if field_def.fields:
+            return {
+                name: _fake_value(name, definition, seed)
+                for name, definition in field_def.fields.items()
+            }
+        return {"summary": f"{field_name} {seed}"}
+    value = f"{field_name} of persona {seed}"
+    if field_def.min_length:
+        value = value.ljust(field_def.min_length, ".")
+    if field_def.max_length:
+        value = value[: field_def.max_length]
+    return value
+
+
+def fake_persona(schema: Schema, seed: int) -> Dict[str, Any]:
+    """
+    Build a persona that satisfies every constraint of a schema.
+
+    Args:
+        schema: The schema the persona must follow
+        seed: Number mixed into the values so personas differ
+
+    Returns:
+        Dict[str, Any]: The persona data
+    """
+    return {
+        field_name: _fake_value(field_name, field_def, seed)
+        for field_name, field_def in schema.fields.items()
+    }
+
+
+def schema_responder(
+    schema: Schema, batch_pattern: str = r"Generate (\d+) distinct personas"
+) -> Responder:
+    """
+    Build a responder that answers chat requests with valid personas.
+
+    Batched requests (a message after the schema prompt matching
+    `batch_pattern`) are answered with a JSON array of that many personas,
+    or with an object wrapping them when the request's `response_format`
+    asks for one.
+
+    Args:
+        schema: The schema the personas must follow
+        batch_pattern: Regular expression capturing the requested count
+
+    Returns:
+        Responder: A function mapping a request body to message content
+    """
+    counter = itertools.count()
+    lock = threading.Lock()
+    batch_regex = re.compile(batch_pattern)
+
+    def respond(body: Dict[str, Any]) -> str:
+        count = None
+        for message in body.get("messages", [])[2:]:
+            match = batch_regex.search(message.get("content", ""))
+            if match:
+                count = int(match.group(1))
+        with lock:
+            seeds = [next(counter) for _ in range(count or 1)]
+        personas = [fake_persona(schema, seed) for seed in seeds]
+        if not count:
+            return json.dumps(personas[0])
+        if BATCH_KEY in _response_schema(body).get("properties", {}):
+            return json.dumps({BATCH_KEY: personas})
+        return json.dumps(personas)
+
+    return respond
+
+
+def _response_schema(body: Dict[str, Any]) -> Dict[str, Any]:
+    """Get the JSON Schema of a request's `response_format`, if any."""
+    response_format = body.get("response_format") or {}
+    return (response_format.get("json_schema") or {}).get("schema") or {}
+
+
+def _is_strict(body: Dict[str, Any]) -> bool:
+    """Whether a request asks for strict structured outputs."""
+    response_format = body.get("response_format") or {}
+    return bool((response_format.get("json_schema") or {}).get("strict"))
+
+
+class FakeOpenAIServer:
+    """
+    Local stand-in for the subset of the OpenAI HTTP API used by this project.
+
+    Serves model listing, chat completions, file upload/download and the
+    Batch API from a background thread, so generators and batch jobs can be
+    exercised without network access. Point a client at `base_url`.
+
+    Chat requests can be slowed down and made to fail (500s, 429s, truncated
+    JSON) at configurable rates, for benchmarks under realistic conditions.
+    Requests with `stream: true` are answered with server-sent events, a few
+    characters per chunk; `streams` counts the streams that were sent to the
+    end and those the client cancelled.
+    """
+
+    def __init__(
+        self,
+        responder: Responder,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        batch_polls: int = 1,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        rate_window: float = 60.0,
+        latency: Optional[Latency] = None,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        malformed_rate: float = 0.0,
+        prompt_tokens: Optional[int] = None,
+        completion_tokens: Optional[int] = None,
+        chunk_delay: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        """
+        Initialize the server (it starts listening on `start`).
+
+        Args:
+            responder: Function mapping a chat request body to message content
+            host: Interface to bind
+            port: Port to bind (0 picks a free one)
+            batch_polls: Number of status polls a batch stays in progress
+            requests_per_minute: Chat requests allowed per window (optional)
+            tokens_per_minute: Chat tokens allowed per window (optional)
+            rate_window: Length of the rate-limit window in seconds. Windows
+                shorter than a minute keep tests fast; the limits are then
+                advertised as their per-minute equivalent, so clients pace
+                themselves to the compressed window.
+            latency: Distribution of the delay added to each chat request,
+                e.g. `lognormal_latency(0.2, 2.0)` (optional)
+            error_rate: Fraction of chat requests failing with a 500
+            throttle_rate: Fraction of chat requests refused with a 429,
+                on top of the `requests_per_minute`/`tokens_per_minute` quota
+            malformed_rate: Fraction of completions whose content is
+                truncated into invalid JSON. Requests with a strict
+                `response_format` are never malformed, as the API constrains
+                their output to the schema.
+            prompt_tokens: Prompt tokens reported per request (estimated
+                from the messages if unset)
+            completion_tokens: Completion tokens reported per request
+                (estimated from the content if unset)
+            chunk_delay: Seconds between the chunks of a streamed
+                completion, emulating the model's token rate
+            seed: Seed of the fault and latency draws, for repeatable runs
+        """
+        self.responder = responder
+        self.batch_polls = batch_polls
+        self.files: Dict[str, Tuple[Dict[str, Any], bytes]] = {}
+        self.batches: Dict[str, Dict[str, Any]] = {}
+        self.requests: List[Tuple[str, str]] = []
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.rate_window = rate_window
+        self.rate_limited = 0
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.malformed_rate = malformed_rate
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.chunk_delay = chunk_delay
+        self.faults = {"error": 0, "throttle": 0, "malformed": 0}
+        self.streams = {"completed": 0, "cancelled": 0}
+        self._rng = random.Random(seed)
+        self._window: List[Tuple[float, int]] = []
+        self._seen_prefixes: set = set()
+        self._ids = itertools.count(1)
+        self._lock = threading.RLock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """Base URL to pass to an OpenAI client."""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeOpenAIServer":
+        """Start serving in a background thread."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving and release the socket."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    def _new_id(self, prefix: str) -> str:
+        with self._lock:
+            return f"{prefix}-{next(self._ids)}"
+
+    def chat_completion(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Answer a chat completion request body.
+
+        Args:
+            body: The request body
+
+        Returns:
+            Dict[str, Any]: A chat completion object
+        """
+        content = self.responder(body)
+        if (
+            self.malformed_rate
+            and not _is_strict(body)
+            and self._draw() < self.malformed_rate
+        ):
+            with self._lock:
+                self.faults["malformed"] += 1
+            content = content[: len(content) // 2]
+        messages = body.get("messages", [])
+        prompt_tokens = sum(len(m.get("content", "")) for m in messages) // 4
+        cached_tokens = self._cached_prefix_tokens(messages)
+        completion_tokens = len(content) // 4
+        if self.prompt_tokens is not None:
+            prompt_tokens = self.prompt_tokens
+            cached_tokens = min(cached_tokens, prompt_tokens)
+        if self.completion_tokens is not None:
+            completion_tokens = self.completion_tokens
+        return {
+            "id": self._new_id("chatcmpl"),
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake-model"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": cached_tokens},
+            },
+        }
+
+    def stream_chunks(
+        self, completion: Dict[str, Any], include_usage: bool = False
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Split a chat completion into the chunks of a streamed response.
+
+        Args:
+            completion: The chat completion object
+            include_usage: Whether a last chunk carries the usage, as with
+                `stream_options: {"include_usage": true}`
+
+        Yields:
+            Dict[str, Any]: The next chat completion chunk
+        """
+        content = completion["choices"][0]["message"]["content"]
+
+        def chunk(choices: List[Dict[str, Any]], **extra: Any) -> Dict[str, Any]:
+            return dict(
+                {
+                    "id": completion["id"],
+                    "object": "chat.completion.chunk",
+                    "created": completion["created"],
+                    "model": completion["model"],
+                    "choices": choices,
+                },
+                **extra,
+            )
+
+        for start in range(0, len(content), STREAM_CHUNK_CHARS):
+            delta = {"content": content[start : start + STREAM_CHUNK_CHARS]}
+            if not start:
+                delta["role"] = "assistant"
+            yield chunk([{"index": 0, "delta": delta, "finish_reason": None}])
+        yield chunk([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        if include_usage:
+            yield chunk([], usage=completion["usage"])
+
+    def _draw(self) -> float:
+        """Draw a uniform number from the seeded generator."""
+        with self._lock:
+            return self._rng.random()
+
+    def inject_fault(self) -> Optional[Tuple[int, Dict[str, Any], Dict[str, str]]]:
+        """
+        Delay a chat request and decide whether it fails.
+
+        Returns:
+            Optional[Tuple[int, Dict[str, Any], Dict[str, str]]]: Status, body
+                and headers of the injected failure, or None to answer normally
+        """
+        if self.latency:
+            with self._lock:
+                delay = self.latency(self._rng)
+            time.sleep(delay)
+        draw = self._draw()
+        if draw < self.error_rate:
+            with self._lock:
+                self.faults["error"] += 1
+            return 500, error_body("Injected server error", "server_error"), {}
+        if draw < self.error_rate + self.throttle_rate:
+            with self._lock:
+                self.faults["throttle"] += 1
+                self.rate_limited += 1
+            error = error_body("Rate limit reached", "rate_limit_error")
+            return 429, error, {"retry-after-ms": "20"}
+        return None
+
+    def admit(self, body: Dict[str, Any]) -> Tuple[bool, Dict[str, str]]:
+        """
+        Apply the server-side rate limits to a chat request.
+
+        Requests and tokens are counted over a sliding window; a request is
+        charged its prompt tokens when admitted.
+
+        Args:
+            body: The request body
+
+        Returns:
+            Tuple[bool, Dict[str, str]]: Whether the request is admitted, and
+                the `x-ratelimit-*` (plus `retry-after-ms` on refusal) headers
+        """
+        if not (self.requests_per_minute or self.tokens_per_minute):
+            return True, {}
+        tokens = sum(len(m.get("content", "")) for m in body.get("messages", [])) // 4
+        with self._lock:
+            now = time.monotonic()
+            self._window = [e for e in self._window if e[0] > now - self.rate_window]
+            used_requests = len(self._window)
+            used_tokens = sum(t for _, t in self._window)
+            full = (
+                self.requests_per_minute
+                and used_requests + 1 > self.requests_per_minute
+            ) or (
+                self.tokens_per_minute and used_tokens + tokens > self.tokens_per_minute
+            )
+            oldest = self._window[0][0] if self._window else now
+            reset = max(0.0, oldest + self.rate_window - now)
+            if not full:
+                self._window.append((now, tokens))
+                used_requests += 1
+                used_tokens += tokens
+            else:
+                self.rate_limited += 1
+
+        headers = {}
+        per_minute = 60.0 / self.rate_window
+        for kind, limit, used in (
+            ("requests", self.requests_per_minute, used_requests),
+            ("tokens", self.tokens_per_minute, used_tokens),
+        ):
+            if limit:
+                headers[f"x-ratelimit-limit-{kind}"] = str(round(limit * per_minute))
+                headers[f"x-ratelimit-remaining-{kind}"] = str(max(0, limit - used))
+                headers[f"x-ratelimit-reset-{kind}"] = f"{reset * 1000:.0f}ms"
+        if full:
+            headers["retry-after-ms"] = f"{reset * 1000:.0f}"
+        return not full, headers
+
+    def _cached_prefix_tokens(self, messages: List[Dict[str, Any]]) -> int:
+        """
+        Simulate provider prompt caching at message granularity.
+
+        Returns the tokens of the longest run of leading messages that was
+        already seen in an earlier request, and remembers every prefix.
+        """
+        digest = hashlib.sha256()
+        cached_chars = chars = 0
+        with self._lock:
+            for message in messages:
+                digest.update(json.dumps(message, sort_keys=True).encode())
+                chars += len(message.get("content", ""))
+                key = digest.hexdigest()
+                if key in self._seen_prefixes:
+                    cached_chars = chars
+                else:
+                    self._seen_prefixes.add(key)
+        return cached_chars // 4
+
+    def create_file(self, filename: str, purpose: str, data: bytes) -> Dict[str, Any]:
+        """Store an uploaded or generated file and return its file object."""
+        file_object = {
+            "id": self._new_id("file"),
+            "object": "file",
+            "bytes": len(data),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed",
+        }
+        self.files[file_object["id"]] = (file_object, data)
+        return file_object
+
+    def create_batch(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Register a batch over an uploaded JSONL file."""
+        if body.get("input_file_id") not in self.files:
+            raise KeyError(body.get("input_file_id"))
+        batch = {
+            "id": self._new_id("batch"),
+            "object": "batch",
+            "endpoint": body.get("endpoint", "/v1/chat/completions"),
+            "input_file_id": body["input_file_id"],
+            "completion_window": body.get("completion_window", "24h"),
+            "status": "validating",
+            "created_at": int(time.time()),
+            "output_file_id": None,
+            "error_file_id": None,
+            "_polls": 0,
+        }
+        self.batches[batch["id"]] = batch
+        return batch
+
+    def retrieve_batch(self, batch_id: str) -> Dict[str, Any]:
+        """Return a batch, running it once it has been polled enough times."""
+        batch = self.batches[batch_id]
+        with self._lock:
+            if batch["status"] in ("validating", "in_progress"):
+                batch["_polls"] += 1
+                batch["status"] = "in_progress"
+                if batch["_polls"] > self.batch_polls:
+                    self._run_batch(batch)
+        return batch
+
+    def _run_batch(self, batch: Dict[str, Any]) -> None:
+        """Answer every request line of a batch and store the output file."""
+        _, data = self.files[batch["input_file_id"]]
+        output_lines = []
+        for line in data.decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            output_lines.append(
+                json.dumps(
+                    {
+                        "id": f"batch_req-{len(output_lines) + 1}",
+                        "custom_id": request["custom_id"],
+                        "response": {
+                            "status_code": 200,
+                            "request_id": f"req-{len(output_lines) + 1}",
+                            "body": self.chat_completion(request["body"]),
+                        },
+                        "error": None,
+                    }
+                )
+            )
+        output = ("\n".join(output_lines) + "\n").encode("utf-8")
+        batch["output_file_id"] = self.create_file(
+            f"{batch['id']}_output.jsonl", "batch_output", output
+        )["id"]
+        batch["status"] = "completed"
+        batch["request_counts"] = {
+            "total": len(output_lines),
+            "completed": len(output_lines),
+            "failed": 0,
+        }
+
+    def _handler_class(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+            def _send(
+                self,
+                status: int,
+                payload: Any,
+                raw: bool = False,
+                headers: Optional[Dict[str, str]] = None,
+            ) -> None:
+                data = payload if raw else json.dumps(public(payload)).encode()
+                self.send_response(status)
+                content_type = "application/octet-stream" if raw else "application/json"
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, request: Dict[str, Any], headers: Dict[str, str]) -> None:
+                completion = server.chat_completion(request)
+                include_usage = (request.get("stream_options") or {}).get(
+                    "include_usage", False
+                )
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                try:
+                    for chunk in server.stream_chunks(completion, include_usage):
+                        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                        if server.chunk_delay:
+                            time.sleep(server.chunk_delay)
+                    self.wfile.write(b"data: [DONE]\n\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    with server._lock:
+                        server.streams["cancelled"] += 1
+                    return
+                with server._lock:
+                    server.streams["completed"] += 1
+
+            def _body(self) -> bytes:
+                return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+            def do_GET(self) -> None:
+                path = self.path.split("?")[0]
+                server.requests.append(("GET", path))
+                try:
+                    if path == "/v1/models":
+                        self._send(200, {"object": "list", "data": [fake_model()]})
+                    elif path.startswith("/v1/models/"):
+                        model = fake_model(path.rsplit("/", 1)[1])
+                        self._send(200, model)
+                    elif path.startswith("/v1/files/") and path.endswith("/content"):
+                        file_id = path.split("/")[3]
+                        self._send(200, server.files[file_id][1], raw=True)
+                    elif path.startswith("/v1/files/"):
+                        self._send(200, server.files[path.split("/")[3]][0])
+                    elif path == "/v1/batches":
+                        batches = list(reversed(server.batches.values()))
+                        self._send(
+                            200,
+                            {
+                                "object": "list",
+                                "data": [public(batch) for batch in batches],
+                                "has_more": False,
+                            },
+                        )
+                    elif path.startswith("/v1/batches/"):
+                        batch = server.retrieve_batch(path.split("/")[3])
+                        self._send(200, batch)
+                    else:
+                        self._send(404, error_body("Unknown path"))
+                except KeyError as e:
+                    self._send(404, error_body(f"Not found: {e}"))
+
+            def do_POST(self) -> None:
+                path = self.path.split("?")[0]
+                server.requests.append(("POST", path))
+                body = self._body()
+                try:
+                    if path == "/v1/chat/completions":
+                        request = json.loads(body)
+                        fault = server.inject_fault()
+                        if fault:
+                            status, error, headers = fault
+                            self._send(status, error, headers=headers)
+                            return
+                        admitted, headers = server.admit(request)
+                        if not admitted:
+                            error = error_body("Rate limit reached", "rate_limit_error")
+                            self._send(429, error, headers=headers)
+                        elif request.get("stream"):
+                            self._stream(request, headers)
+                        else:
+                            completion = server.chat_completion(request)
+                            self._send(200, completion, headers=headers)
+                    elif path == "/v1/files":
+                        fields = parse_multipart(self.headers["Content-Type"], body)
+                        filename, data = fields["file"]
+                        purpose = fields["purpose"][1].decode()
+                        self._send(200, server.create_file(filename, purpose, data))
+                    elif path == "/v1/batches":
+                        self._send(200, server.create_batch(json.loads(body)))
+                    else:
+                        self._send(404, error_body("Unknown path"))
+                except KeyError as e:
+                    self._send(404, error_body(f"Not found: {e}"))
+                except ValueError as e:
+                    self._send(400, error_body(f"Bad request: {e}"))
+
+        return Handler
+
+
+def fake_model(model_id: str = "fake-model") -> Dict[str, Any]:
+    """Build a model object."""
+    return {"id": model_id, "object": "model", "created": 0, "owned_by": "fake"}
+
+
+def error_body(
+    message: str, error_type: str = "invalid_request_error"
+) -> Dict[str, Any]:
+    """Build an OpenAI-style error payload."""
+    return {"error": {"message": message, "type": error_type}}
+
+
+def public(payload: Any) -> Any:
+    """Drop server-private keys (prefixed with `_`) from a response payload."""
+    if isinstance(payload, dict):
+        return {k: v for k, v in payload.items() if not k.startswith("_")}
+    return payload
+
+
+def parse_multipart(content_type: str, body: bytes) -> Dict[str, Tuple[str, bytes]]:
+    """
+    Parse a multipart/form-data request body.
+
+    Args:
+        content_type: The request Content-Type header (with boundary)
+        body: The raw request body
+
+    Returns:
+        Dict[str, Tuple[str, bytes]]: (filename, payload) by form field name
+    """
+    message = BytesParser(policy=HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode() + body
+    )
+    fields = {}
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        fields[name] = (part.get_filename() or "", part.get_payload(decode=True))
+    return fields
@@ -0,0 +1,155 @@
+import json
+import tempfile
+
+import pytest
+
+from src.exporters.persona_exporter import PersonaExporter
+from src.factories.batch_job import BatchJob
+from src.generators.openai import OpenAIGenerator
+from src.testing.fake_openai import FakeOpenAIServer, schema_responder
+
+SCHEMA_PATH = "tests/fixtures/schemas/test_schema.yaml"
+CONFIG_PATH = "tests/fixtures/config/test_generator_config.yaml"
+
+
+@pytest.fixture
+def temp_dir():
+    """Create a temporary directory for test outputs."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        yield tmp_dir
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """Start a local OpenAI stand-in answering with test-schema personas."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    schema = OpenAIGenerator(schema_path=SCHEMA_PATH, config_path=CONFIG_PATH).schema
+    with FakeOpenAIServer(schema_responder(schema), batch_polls=2) as fake:
+        yield fake
+
+
+@pytest.fixture
+def generator(server):
+    """Create a generator that talks to the local stand-in."""
+    return OpenAIGenerator(
+        schema_path=SCHEMA_PATH, config_path=CONFIG_PATH, base_url=server.base_url
+    )
+
+
+def make_job(generator, temp_dir):
+    """Create a batch job exporting into the temporary directory."""
+    return BatchJob(generator, PersonaExporter(output_dir=temp_dir), temp_dir + "/job")
+
+
+def test_prepare_writes_generate_requests(generator, temp_dir):
+    """Test that the input file holds the requests `generate` would send."""
+    job = make_job(generator, temp_dir)
+    path = job.prepare(5, batch_size=2)
+
+    with open(path) as f:
+        requests = [json.loads(line) for line in f]
+
+    assert [r["custom_id"] for r in requests] == [
+        "personas-00000000-2",
+        "personas-00000002-2",
+        "personas-00000004-1",
+    ]
+    assert requests[2]["body"] == generator._request_body(generator._build_messages())
+    assert requests[0]["url"] == "/v1/chat/completions"
+
+
+def test_run_exports_all_personas(generator, temp_dir, server):
+    """Test a full prepare/submit/poll/ingest cycle."""
+    job = make_job(generator, temp_dir)
+    output_path = job.run(7, batch_size=3, poll_interval=0)
+
+    with open(output_path) as f:
+        data = json.load(f)
+
+    assert len(data["personas"]) == 7
+    assert job.status == "ingested"
+    assert generator.usage.requests == 3
+    assert ("POST", "/v1/chat/completions") not in server.requests
+
+
+def test_run_resumes_submitted_job(generator, temp_dir, server):
+    """Test that a new job object resumes without submitting again."""
+    job = make_job(generator, temp_dir)
+    job.prepare(3)
+    job.submit()
+
+    resumed = make_job(generator, temp_dir)
+    assert resumed.status == "submitted"
+    output_path = resumed.run(3, poll_interval=0)
+
+    assert len(server.batches) == 1
+    with open(output_path) as f:
+        assert len(json.load(f)["personas"]) == 3
+
+
+def test_submit_resumes_after_crash(generator, temp_dir, server, monkeypatch):
+    """Test that a crash right after creating the batch does not resubmit."""
+    job = make_job(generator, temp_dir)
+    job.prepare(2)
+    create = generator.client.batches.create
+
+    def create_then_crash(**kwargs):
+        create(**kwargs)
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(generator.client.batches, "create", create_then_crash)
+    with pytest.raises(KeyboardInterrupt):
+        job.submit()
+    monkeypatch.undo()
+
+    resumed = make_job(generator, temp_dir)
+    assert resumed.state["input_file_id"]
+    resumed.run(2, poll_interval=0)
+
+    assert len(server.batches) == 1
+    assert server.requests.count(("POST", "/v1/files")) == 1
+
+
+def test_poll_times_out(generator, temp_dir):
+    """Test that polling gives up after the timeout."""
+    job = make_job(generator, temp_dir)
+    job.prepare(1)
+    job.submit()
+
+    with pytest.raises(TimeoutError):
+        job.poll(interval=0, timeout=0)
+
+
+def test_ingest_drops_failed_results(generator, temp_dir):
+    """Test that failed or invalid result lines are skipped."""
+    job = make_job(generator, temp_dir)
+    results = [
+        {"custom_id": "personas-00000000-1", "response": None, "error": "boom"},
+        {
+            "custom_id": "personas-00000001-1",
+            "response": {
+                "status_code": 200,
+                "body": {
+                    "id": "chatcmpl-1",
+                    "object": "chat.completion",
+                    "created": 0,
+                    "model": "fake-model",
+                    "choices": [
+                        {
+                            "index": 0,
+                            "finish_reason": "stop",
+                            "message": {"role": "assistant", "content": "{}"},
+                        }
+                    ],
+                },
+            },
+            "error": None,
+        },
+    ]
+    with open(job.job_dir / BatchJob.RESULTS_FILE, "w") as f:
+        f.write("\n".join(json.dumps(r) for r in results))
+
+    output_path = job.ingest()
+
+    with open(output_path) as f:
+        assert json.load(f)["personas"] == []
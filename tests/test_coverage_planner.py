@@ -0,0 +1,131 @@
+import itertools
+import tempfile
+
+import numpy as np
+import pytest
+
+from src.factories.coverage_planner import CoveragePlanner
+from src.factories.persona_factory import PersonaFactory
+from src.schemas.loader import SchemaLoader
+from src.testing.fake_openai import FakeOpenAIServer, schema_responder
+
+DIMENSIONS = {
+    "gender": ["female", "male", "non-binary"],
+    "industry": ["tech", "healthcare", "education", "retail"],
+    "hobby": ["cooking", "climbing"],
+    "height": ["tall", "average", "short"],
+}
+
+
+@pytest.fixture
+def temp_dir():
+    """Create a temporary directory for test outputs."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        yield tmp_dir
+
+
+@pytest.fixture
+def default_schema():
+    """The default persona schema."""
+    return SchemaLoader("schemas").load_schema("default_schema")
+
+
+def test_stratified_balances_every_dimension():
+    """Test that each value gets its share of the personas."""
+    planner = CoveragePlanner(DIMENSIONS)
+    rows = planner.plan(12)
+
+    assert rows.shape == (12, 4)
+    for column, values in zip(rows.T, DIMENSIONS.values()):
+        counts = np.bincount(column, minlength=len(values))
+        assert counts.max() - counts.min() <= 1
+
+
+def test_stratified_follows_weights():
+    """Test that weighted values get proportionally more personas."""
+    planner = CoveragePlanner(
+        {"gender": ["female", "male"]}, weights={"gender": {"female": 3}}
+    )
+    rows = planner.plan(100)
+
+    assert np.bincount(rows[:, 0]).tolist() == [75, 25]
+
+
+def test_pairwise_covers_every_pair():
+    """Test that the pairwise plan covers all value pairs with few rows."""
+    planner = CoveragePlanner(DIMENSIONS, strategy="pairwise")
+    rows = planner.plan(16)
+
+    for (i, a), (j, b) in itertools.combinations(enumerate(DIMENSIONS.values()), 2):
+        seen = {(x, y) for x, y in rows[:, [i, j]].tolist()}
+        assert len(seen) == len(a) * len(b)
+    assert planner.coverage(rows)["pairs"] == (53, 53)
+
+
+def test_pairwise_skips_zero_weight_values():
+    """Test that a value weighted 0 is never planned."""
+    planner = CoveragePlanner(
+        DIMENSIONS, weights={"hobby": {"climbing": 0}}, strategy="pairwise"
+    )
+
+    assert not (planner.plan(20)[:, 2] == 1).any()
+
+
+def test_plan_is_reproducible():
+    """Test that the same seed plans the same run."""
+    first = CoveragePlanner(DIMENSIONS, strategy="pairwise", seed=3).plan(10)
+    second = CoveragePlanner(DIMENSIONS, strategy="pairwise", seed=3).plan(10)
+
+    assert (first == second).all()
+
+
+def test_invalid_weights_and_strategy():
+    """Test that unknown values, bad weights and strategies are rejected."""
+    with pytest.raises(ValueError):
+        CoveragePlanner(DIMENSIONS, weights={"gender": {"robot": 1}})
+    with pytest.raises(ValueError):
+        CoveragePlanner(DIMENSIONS, weights={"hobby": {"cooking": 0, "climbing": 0}})
+    with pytest.raises(ValueError):
+        CoveragePlanner(DIMENSIONS, strategy="random")
+
+
+def test_schema_dimensions(default_schema):
+    """Test that characteristic references become dimensions."""
+    planner = CoveragePlanner.for_schema_file(
+        default_schema, "schemas/default_schema.yaml"
+    )
+
+    assert "personal.religion" in planner.names
+    assert (
+        "practices Buddhism" in planner.values[planner.names.index("personal.religion")]
+    )
+    context = planner.contexts(planner.plan(1))[0]
+    assert context.startswith("Give this persona the following traits:")
+    assert "religious beliefs and practices: " in context
+
+
+def test_factory_sends_planned_context(temp_dir, monkeypatch, default_schema):
+    """Test that every request carries its persona's planned traits."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    factory = PersonaFactory(
+        schema_path="schemas/default_schema.yaml",
+        output_dir=temp_dir,
+        coverage="pairwise",
+    )
+    requests = []
+    responder = schema_responder(default_schema)
+
+    def respond(body):
+        requests.append(body["messages"][-1]["content"])
+        return responder(body)
+
+    with FakeOpenAIServer(respond) as server:
+        factory.generator.client = factory.generator.client.with_options(
+            base_url=server.base_url
+        )
+        personas = factory.generate_personas(4, batch_size=2)
+
+    assert len(personas) == 4
+    assert len(requests) == 2
+    assert all("Persona 1: Give this persona" in request for request in requests)
+    assert all("Persona 2: Give this persona" in request for request in requests)
@@ -0,0 +1,113 @@
+import random
+import statistics
+
+import openai
+import pytest
+
+from src.generators.openai import OpenAIGenerator
+from src.generators.rate_limiter import RateLimiter
+from src.testing.fake_openai import (
+    FakeOpenAIServer,
+    lognormal_latency,
+    schema_responder,
+)
+
+
+@pytest.fixture
+def generator(monkeypatch):
+    """Generator for the test schema that fails fast on server errors."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    return OpenAIGenerator(
+        schema_path="tests/fixtures/schemas/test_schema.yaml",
+        config_path="tests/fixtures/config/test_generator_config.yaml",
+        rate_limiter=RateLimiter(max_connection_retries=0),
+    )
+
+
+def connect(generator, server):
+    """Point a generator at a fake server."""
+    generator.client = generator.client.with_options(base_url=server.base_url)
+
+
+def test_lognormal_latency_matches_percentiles():
+    """Test that the drawn latencies follow the requested median and p99."""
+    draw = lognormal_latency(0.1, 1.0)
+    rng = random.Random(0)
+    samples = sorted(draw(rng) for _ in range(20000))
+
+    assert statistics.median(samples) == pytest.approx(0.1, rel=0.05)
+    assert samples[int(len(samples) * 0.99)] == pytest.approx(1.0, rel=0.15)
+
+
+def test_lognormal_latency_rejects_bad_percentiles():
+    """Test that a p99 below the median is rejected."""
+    with pytest.raises(ValueError):
+        lognormal_latency(1.0, 0.5)
+
+
+def test_injected_server_error(generator):
+    """Test that an error rate of 1 fails every chat request with a 500."""
+    server = FakeOpenAIServer(schema_responder(generator.schema), error_rate=1.0)
+    with server:
+        connect(generator, server)
+        with pytest.raises(openai.InternalServerError):
+            generator.generate()
+
+    assert server.faults["error"] == 1
+
+
+def test_injected_throttling_is_retried(generator):
+    """Test that injected 429s are retried until a request gets through."""
+    server = FakeOpenAIServer(
+        schema_responder(generator.schema), throttle_rate=0.5, seed=1
+    )
+    with server:
+        connect(generator, server)
+        personas = [generator.generate() for _ in range(4)]
+
+    assert len(personas) == 4
+    assert server.faults["throttle"] == generator.rate_limiter.retries > 0
+
+
+def test_injected_malformed_json(generator):
+    """Test that a truncated completion fails parsing."""
+    server = FakeOpenAIServer(schema_responder(generator.schema), malformed_rate=1.0)
+    with server:
+        connect(generator, server)
+        with pytest.raises(ValueError, match="parse"):
+            generator.generate()
+
+    assert server.faults["malformed"] == 1
+
+
+def test_reported_token_counts(generator):
+    """Test that configured token counts are reported as the usage."""
+    server = FakeOpenAIServer(
+        schema_responder(generator.schema), prompt_tokens=1000, completion_tokens=250
+    )
+    with server:
+        connect(generator, server)
+        generator.generate()
+
+    assert generator.usage.prompt_tokens == 1000
+    assert generator.usage.completion_tokens == 250
+
+
+def test_streamed_completion(generator):
+    """Test that streamed requests are answered with chunks and usage."""
+    with FakeOpenAIServer(schema_responder(generator.schema)) as server:
+        connect(generator, server)
+        stream = generator.client.chat.completions.create(
+            model="fake-model",
+            messages=[{"role": "user", "content": "Generate a persona"}],
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        chunks = list(stream)
+
+    content = "".join(c.choices[0].delta.content or "" for c in chunks if c.choices)
+    assert content.startswith('{"id": "id of persona 0"')
+    assert len(chunks) > 3
+    assert chunks[-2].choices[0].finish_reason == "stop"
+    assert chunks[-1].usage.completion_tokens == len(content) // 4
+    assert server.streams == {"completed": 1, "cancelled": 0}
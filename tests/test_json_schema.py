@@ -0,0 +1,126 @@
+import pytest
+
+from src.models.schema import Schema
+from src.schemas.json_schema import (
+    is_strict_compatible,
+    response_format,
+    strip_nulls,
+    to_json_schema,
+)
+from src.schemas.loader import SchemaLoader
+
+
+@pytest.fixture
+def schema():
+    """Schema exercising every kind of constraint."""
+    return Schema(
+        name="Compiler Schema",
+        description="Schema for JSON Schema compiler tests",
+        version="1.0.0",
+        fields={
+            "name": {"description": "Name", "type": "string"},
+            "age": {"description": "Age", "type": "number"},
+            "bio": {
+                "description": "Bio",
+                "type": "string",
+                "min_length": 5,
+                "max_length": 20,
+            },
+            "gender": {
+                "description": "Gender",
+                "type": "string",
+                "options": ["female", "male", "non-binary"],
+            },
+            "hobbies": {"description": "Hobbies", "type": "array", "required": False},
+            "work": {
+                "description": "Work",
+                "type": "object",
+                "fields": {
+                    "role": {"description": "Role", "type": "string"},
+                    "remote": {
+                        "description": "Remote",
+                        "type": "boolean",
+                        "required": False,
+                    },
+                },
+            },
+        },
+    )
+
+
+def test_fields_compile_to_json_schema(schema):
+    """Test that types, options, lengths and nested fields are compiled."""
+    compiled = to_json_schema(schema)
+    properties = compiled["properties"]
+
+    assert compiled["additionalProperties"] is False
+    assert compiled["required"] == list(schema.fields)
+    assert properties["age"] == {"description": "Age", "type": "number"}
+    assert properties["bio"]["minLength"] == 5
+    assert properties["bio"]["maxLength"] == 20
+    assert properties["gender"]["enum"] == ["female", "male", "non-binary"]
+    assert properties["work"]["required"] == ["role", "remote"]
+    assert properties["work"]["additionalProperties"] is False
+
+
+def test_optional_fields_are_nullable(schema):
+    """Test that optional fields are required but accept null."""
+    hobbies = to_json_schema(schema)["properties"]["hobbies"]
+    remote = to_json_schema(schema)["properties"]["work"]["properties"]["remote"]
+
+    assert hobbies["anyOf"] == [
+        {"description": "Hobbies", "type": "array", "items": {"type": "string"}},
+        {"type": "null"},
+    ]
+    assert remote["anyOf"][1] == {"type": "null"}
+
+
+def test_repair_format_requests_only_failed_fields(schema):
+    """Test that a repair format holds only the given fields, as values."""
+    compiled = response_format(schema, fields=["hobbies", "age"])
+
+    assert compiled["json_schema"]["name"] == "persona_repair"
+    assert list(compiled["json_schema"]["schema"]["properties"]) == ["hobbies", "age"]
+    assert "anyOf" not in compiled["json_schema"]["schema"]["properties"]["hobbies"]
+
+
+def test_batch_format_wraps_personas(schema):
+    """Test that batches are requested as an object holding an array."""
+    compiled = response_format(schema, batch=True)["json_schema"]
+
+    assert compiled["name"] == "persona_batch"
+    assert compiled["strict"] is True
+    assert compiled["schema"]["properties"]["personas"]["items"] == to_json_schema(
+        schema
+    )
+
+
+def test_free_form_objects_are_not_strict():
+    """Test that objects without declared fields turn strict mode off."""
+    schema = Schema(
+        name="Free Form",
+        description="Object without fields",
+        version="1.0.0",
+        fields={"extra": {"description": "Anything", "type": "object"}},
+    )
+
+    assert not is_strict_compatible(schema)
+    assert response_format(schema)["json_schema"]["strict"] is False
+    assert is_strict_compatible(
+        SchemaLoader("tests/fixtures/schemas").load_schema("test_schema")
+    )
+
+
+def test_strip_nulls_drops_only_optional_fields(schema):
+    """Test that null optional fields are removed, recursively."""
+    persona = {
+        "name": None,
+        "hobbies": None,
+        "work": {"role": "Engineer", "remote": None},
+    }
+
+    assert strip_nulls(persona, schema.fields) == {
+        "name": None,
+        "work": {"role": "Engineer"},
+    }
+    assert strip_nulls([None], schema.fields) == [None]
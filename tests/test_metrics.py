@@ -0,0 +1,124 @@
+import json
+import tempfile
+
+import pytest
+
+from src.factories.persona_factory import PersonaFactory
+from src.monitoring.metrics import METRICS, Histogram, MetricsRegistry
+from src.testing.fake_openai import FakeOpenAIServer, schema_responder
+
+
+@pytest.fixture
+def temp_dir():
+    """Create a temporary directory for test outputs."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        yield tmp_dir
+
+
+@pytest.fixture
+def metrics():
+    """The shared registry, emptied before and after the test."""
+    METRICS.reset()
+    yield METRICS
+    METRICS.reset()
+
+
+def test_histogram_summary():
+    """Test count, sum, extremes and interpolated quantiles."""
+    histogram = Histogram((1, 2, 5, 10))
+    for value in range(1, 11):
+        histogram.observe(value)
+
+    summary = histogram.summary()
+
+    assert summary["count"] == 10
+    assert summary["sum"] == 55
+    assert (summary["min"], summary["max"]) == (1, 10)
+    assert summary["p50"] == pytest.approx(5.0)
+    assert 9 <= summary["p99"] <= 10
+
+
+def test_empty_histogram():
+    """Test that an empty histogram summarizes without quantiles."""
+    histogram = Histogram((1, 2))
+
+    assert histogram.quantile(0.5) == 0.0
+    assert histogram.summary() == {"count": 0, "sum": 0.0}
+
+
+def test_counters_are_labelled():
+    """Test that label sets are distinct series."""
+    registry = MetricsRegistry()
+    registry.inc("failures_total", reason="api")
+    registry.inc("failures_total", 2, reason="validation")
+    registry.inc("failures_total", reason="api")
+
+    assert registry.counter("failures_total", reason="api") == 2
+    assert registry.counter("failures_total", reason="validation") == 2
+    assert registry.counter("failures_total", reason="error") == 0
+
+
+def test_span_records_even_on_error():
+    """Test that a failing stage is still timed."""
+    registry = MetricsRegistry()
+
+    with pytest.raises(RuntimeError):
+        with registry.span("api"):
+            raise RuntimeError("boom")
+
+    assert registry.histogram("stage_seconds", stage="api").count == 1
+
+
+def test_prometheus_snapshot():
+    """Test the text exposition format of counters and histograms."""
+    registry = MetricsRegistry(prefix="test")
+    registry.inc("retries_total", reason='Rate"Limit')
+    registry.observe("request_tokens", 120, kind="prompt")
+
+    text = registry.to_prometheus()
+
+    assert "# TYPE test_retries_total counter" in text
+    assert 'test_retries_total{reason="Rate\\"Limit"} 1' in text
+    assert "# TYPE test_request_tokens histogram" in text
+    assert 'test_request_tokens_bucket{kind="prompt",le="100"} 0' in text
+    assert 'test_request_tokens_bucket{kind="prompt",le="250"} 1' in text
+    assert 'test_request_tokens_bucket{kind="prompt",le="+Inf"} 1' in text
+    assert 'test_request_tokens_sum{kind="prompt"} 120' in text
+    assert 'test_request_tokens_count{kind="prompt"} 1' in text
+
+
+def test_dump_writes_json_and_prometheus(temp_dir):
+    """Test that dump writes both files next to each other."""
+    registry = MetricsRegistry()
+    registry.inc("requests_total")
+
+    json_path, prom_path = registry.dump(f"{temp_dir}/run/metrics.json")
+
+    summary = json.loads(json_path.read_text())
+    assert summary["counters"]["requests_total"] == [{"labels": {}, "value": 1}]
+    assert prom_path.name == "metrics.prom"
+    assert "persona_requests_total 1" in prom_path.read_text()
+
+
+def test_run_records_every_stage(metrics, temp_dir, monkeypatch):
+    """Test that a generation run times each stage and counts its tokens."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    factory = PersonaFactory(
+        schema_path="tests/fixtures/schemas/test_schema.yaml",
+        config_path="tests/fixtures/config/test_generator_config.yaml",
+        output_dir=temp_dir,
+        output_format="jsonl",
+    )
+    with FakeOpenAIServer(schema_responder(factory.generator.schema)) as server:
+        factory.generator.client = factory.generator.client.with_options(
+            base_url=server.base_url
+        )
+        factory.generate_and_export(3)
+
+    for stage in ("schema_load", "config_load", "validate", "export"):
+        assert metrics.histogram("stage_seconds", stage=stage).count >= 1
+    for stage in ("prompt_build", "api", "parse", "slot"):
+        assert metrics.histogram("stage_seconds", stage=stage).count == 3
+    assert metrics.counter("requests_total") == 3
+    assert metrics.counter("personas_total") == 3
+    assert metrics.histogram("persona_tokens", kind="completion").count == 3
@@ -0,0 +1,125 @@
+import json
+import pickle
+import tempfile
+
+import pytest
+
+from src.factories.near_duplicates import NearDuplicateIndex
+from src.factories.persona_factory import PersonaFactory
+from src.testing.fake_openai import FakeOpenAIServer, fake_persona
+
+BIO = (
+    "Maria grew up in a small fishing town on the northern coast, where she "
+    "spent her summers repairing nets with her grandfather before moving to "
+    "the city to study marine biology and later open a seafood restaurant"
+)
+
+
+def make_persona(first_name="Maria", last_name="Lopez", bio=BIO, persona_id="1"):
+    """Build a persona with the compared text fields."""
+    return {
+        "id": persona_id,
+        "first_name": first_name,
+        "last_name": last_name,
+        "bio": bio,
+        "age": 41,
+    }
+
+
+@pytest.fixture
+def temp_dir():
+    """Create a temporary directory for test outputs."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        yield tmp_dir
+
+
+def test_exact_duplicate_is_rejected():
+    """Test that the same text under another id is a duplicate."""
+    index = NearDuplicateIndex()
+
+    assert index.add(make_persona()) is None
+    assert index.add(make_persona(persona_id="2")) == 0
+    assert len(index) == 1
+    assert index.duplicates == 1
+
+
+def test_small_edit_is_a_near_duplicate():
+    """Test that a lightly edited bio is still caught."""
+    index = NearDuplicateIndex(threshold=0.7)
+    index.add(make_persona())
+
+    edited = BIO.replace("open a seafood restaurant", "opened a small restaurant")
+
+    assert index.find(make_persona(bio=edited)) == 0
+
+
+def test_different_personas_are_kept():
+    """Test that unrelated personas are all indexed."""
+    index = NearDuplicateIndex()
+    other = (
+        "Kenji is a retired railway engineer from Osaka who now restores "
+        "vintage motorcycles and teaches weekend classes at the community centre"
+    )
+
+    assert index.add(make_persona()) is None
+    assert index.add(make_persona("Kenji", "Sato", other, "2")) is None
+    assert len(index) == 2
+
+
+def test_fields_restrict_the_comparison():
+    """Test that only the configured fields are compared."""
+    index = NearDuplicateIndex(fields=["first_name", "last_name"])
+    index.add(make_persona())
+
+    assert index.find(make_persona(bio="Something else entirely")) == 0
+    assert index.text(make_persona()) == "Maria Lopez"
+
+
+def test_invalid_parameters():
+    """Test that bad thresholds and band layouts are rejected."""
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(threshold=0)
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(num_perm=64, bands=10)
+
+
+def test_factory_regenerates_duplicates(temp_dir, monkeypatch):
+    """Test that a repeated persona is replaced by a distinct one."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    factory = PersonaFactory(
+        schema_path="tests/fixtures/schemas/test_schema.yaml",
+        config_path="tests/fixtures/config/test_generator_config.yaml",
+        output_dir=temp_dir,
+        dedup_threshold=0.8,
+    )
+    schema = factory.generator.schema
+
+    def respond(body):
+        # Always the same persona, unless asked for a different one
+        regenerate = "already exists" in body["messages"][-1]["content"]
+        return json.dumps(fake_persona(schema, 7 if regenerate else 0))
+
+    with FakeOpenAIServer(respond) as server:
+        factory.generator.client = factory.generator.client.with_options(
+            base_url=server.base_url
+        )
+        personas = factory.generate_personas(3)
+
+    # The second slot is regenerated; the third keeps repeating and is dropped
+    assert len(personas) == 2
+    assert personas[0] != personas[1]
+    assert factory.dedup.duplicates == 4
+
+
+def test_precomputed_signature_and_pickling():
+    """Test that a signer sent to another process signs like the index."""
+    index = NearDuplicateIndex(threshold=0.8, seed=5)
+    index.add(make_persona())
+    signer = pickle.loads(pickle.dumps(index.signer()))
+
+    signature = signer.signature(make_persona(persona_id="2"))
+
+    assert len(signer) == 0
+    assert signature == index.signature(make_persona(persona_id="2"))
+    assert index.add(make_persona(persona_id="2"), signature) == 0
+    assert len(pickle.loads(pickle.dumps(index))) == 1
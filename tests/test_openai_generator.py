@@ -1,8 +1,13 @@
+import json
 from pathlib import Path
+from types import SimpleNamespace
 
 import pytest
+import yaml
 
 from src.generators.openai import OpenAIGenerator
+from src.models.schema import Schema
+from src.testing.fake_openai import FakeOpenAIServer, schema_responder
 
 
 @pytest.fixture
@@ -22,6 +27,38 @@ def test_generator():
     return OpenAIGenerator(schema_path=str(schema_path), config_path=str(config_path))
 
 
+@pytest.fixture
+def offline_generator(monkeypatch):
+    """Create a test-schema generator whose client is never called."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    return OpenAIGenerator(
+        schema_path="tests/fixtures/schemas/test_schema.yaml",
+        config_path="tests/fixtures/config/test_generator_config.yaml",
+    )
+
+
+def make_persona(persona_id):
+    """Build a persona that is valid under the test schema."""
+    return {
+        "id": persona_id,
+        "name": "Test Person",
+        "age": 30,
+        "background": "Grew up by the sea",
+        "professional": {"role": "Engineer"},
+        "appearance": {"description": "Tall"},
+    }
+
+
+def make_completion(content, prompt_tokens=100, completion_tokens=50):
+    """Build an object shaped like a chat completion response."""
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=SimpleNamespace(
+            prompt_tokens=prompt_tokens, completion_tokens=completion_tokens
+        ),
+    )
+
+
 def test_openai_connection():
     """Test that we can connect to OpenAI API."""
     generator = OpenAIGenerator()
@@ -80,3 +117,317 @@ def test_schema_loading():
         OpenAIGenerator(
             schema_path="non_existent_schema.yaml", config_path=str(config_path)
         )
+
+
+def test_batch_messages_append_batch_instruction(offline_generator):
+    """Test that batch requests keep the single prompt and add the count."""
+    single = offline_generator._build_messages()
+    batch = offline_generator._build_messages(count=3)
+
+    assert batch[:2] == single
+    assert "3" in batch[2]["content"]
+
+
+def test_parse_batch_drops_invalid_elements(offline_generator):
+    """Test that one invalid persona does not discard the whole batch."""
+    content = json.dumps([make_persona("1"), {"id": "2"}, make_persona("3")])
+
+    personas = offline_generator._parse_batch(content)
+
+    assert [p["id"] for p in personas] == ["1", "3"]
+
+
+def test_parse_batch_accepts_wrapping_object(offline_generator):
+    """Test that a {"personas": [...]} document is accepted as a batch."""
+    content = json.dumps({"personas": [make_persona("1"), make_persona("2")]})
+
+    assert len(offline_generator._parse_batch(content)) == 2
+
+
+def test_parse_batch_rejects_non_json(offline_generator):
+    """Test that an unparseable batch raises a ValueError."""
+    with pytest.raises(ValueError):
+        offline_generator._parse_batch("not json")
+
+
+def test_generate_batch_accounts_tokens(offline_generator, monkeypatch):
+    """Test that a batch is one request whose tokens are shared by personas."""
+    content = json.dumps([make_persona(str(i)) for i in range(4)])
+    calls = []
+
+    def fake_send(body):
+        calls.append(body)
+        return make_completion(content, prompt_tokens=400, completion_tokens=400), {}
+
+    monkeypatch.setattr(offline_generator, "_send", fake_send)
+
+    personas = offline_generator.generate_batch(4)
+
+    assert len(personas) == 4
+    assert len(calls) == 1
+    assert offline_generator.usage.requests == 1
+    assert offline_generator.usage.personas == 4
+    assert offline_generator.usage.per_persona() == 200
+
+
+def fake_responses(generator, monkeypatch, contents):
+    """Answer successive requests of a generator with the given contents."""
+    calls = []
+
+    def fake_send(body):
+        calls.append(body)
+        return make_completion(contents[len(calls) - 1]), {}
+
+    monkeypatch.setattr(generator, "_send", fake_send)
+    return calls
+
+
+def test_generate_repairs_only_failed_fields(offline_generator, monkeypatch):
+    """Test that an invalid field is regenerated and merged, not the persona."""
+    persona = make_persona("1")
+    persona["age"] = "thirty"
+    calls = fake_responses(
+        offline_generator,
+        monkeypatch,
+        [json.dumps(persona), json.dumps({"age": 30, "name": "Other Name"})],
+    )
+
+    result = offline_generator.generate()
+
+    assert result == dict(make_persona("1"), age=30)
+    repair_prompt = calls[1]["messages"][-1]["content"]
+    assert '"age"' in repair_prompt
+    assert "Field age should be a number" in repair_prompt
+    assert "background" not in repair_prompt
+    assert offline_generator.usage.requests == 2
+    assert offline_generator.usage.personas == 1
+    assert offline_generator.usage.repaired == 1
+
+
+def test_generate_gives_up_after_repair_attempts(offline_generator, monkeypatch):
+    """Test that a persona still invalid after repair is rejected."""
+    persona = make_persona("1")
+    del persona["name"]
+    calls = fake_responses(
+        offline_generator, monkeypatch, [json.dumps(persona), json.dumps({})]
+    )
+
+    with pytest.raises(ValueError):
+        offline_generator.generate()
+
+    assert len(calls) == 2
+    assert offline_generator.usage.personas == 0
+
+
+def test_repair_can_be_disabled(offline_generator, monkeypatch):
+    """Test that max_repair_attempts: 0 restores discard-on-failure."""
+    # Loaded configs are shared through the registry: replace, don't mutate
+    config = offline_generator.config
+    offline_generator.config = config.model_copy(
+        update={
+            "validation": config.validation.model_copy(
+                update={"max_repair_attempts": 0}
+            )
+        }
+    )
+    persona = dict(make_persona("1"), age="thirty")
+    calls = fake_responses(offline_generator, monkeypatch, [json.dumps(persona)])
+
+    with pytest.raises(ValueError):
+        offline_generator.generate()
+
+    assert len(calls) == 1
+
+
+def test_validate_logs_every_violation(offline_generator, capsys):
+    """Test that validation reports all errors, not only the first one."""
+    persona = make_persona("1")
+    del persona["name"]
+    persona["age"] = "thirty"
+
+    assert not offline_generator.validate(persona)
+    assert [e.field for e in offline_generator.validation_errors(persona)] == [
+        "name",
+        "age",
+    ]
+    output = capsys.readouterr().out
+    assert "Missing required field: name" in output
+    assert "Field age should be a number" in output
+
+
+def test_static_prompt_is_rendered_once(offline_generator, monkeypatch):
+    """Test that the schema is serialized once, not on every request."""
+    calls = []
+    original = Schema.model_dump_json
+
+    def counting_dump(self, *args, **kwargs):
+        calls.append(1)
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(Schema, "model_dump_json", counting_dump)
+
+    for i in range(5):
+        offline_generator._build_messages(prompt=f"persona {i}")
+
+    assert len(calls) <= 1
+
+
+def test_static_prompt_follows_replaced_schema(offline_generator):
+    """Test that replacing the schema re-renders the prompt and validator."""
+    before = offline_generator._get_static_user_prompt()
+    schema = offline_generator.schema.model_copy(update={"name": "Other Schema"})
+
+    offline_generator.schema = schema
+
+    assert offline_generator._get_static_user_prompt() != before
+    assert "Other Schema" in offline_generator._get_static_user_prompt()
+    assert offline_generator.validator.schema is schema
+
+
+def test_context_is_the_last_message(offline_generator):
+    """Test that per-persona context follows the shared static prefix."""
+    first = offline_generator._build_messages(prompt="a nurse", count=3)
+    second = offline_generator._build_messages(prompt="a pilot", count=3)
+
+    assert first[:-1] == second[:-1]
+    assert first[-1]["content"] == "Additional context: a nurse\n"
+    assert "a nurse" not in first[1]["content"]
+    assert offline_generator._get_user_prompt("a nurse").endswith(
+        "Additional context: a nurse\n"
+    )
+
+
+def test_cached_tokens_are_reported(offline_generator):
+    """Test that cached prompt tokens from the usage object are accounted."""
+    with FakeOpenAIServer(schema_responder(offline_generator.schema)) as server:
+        generator = OpenAIGenerator(
+            schema_path="tests/fixtures/schemas/test_schema.yaml",
+            config_path="tests/fixtures/config/test_generator_config.yaml",
+            base_url=server.base_url,
+        )
+        generator.generate(prompt="first")
+        generator.generate(prompt="second")
+
+    assert generator.usage.requests == 2
+    assert generator.usage.cached_tokens > 0
+    assert 0 < generator.usage.cache_hit_rate() < 1
+    assert "cached" in generator.usage.summary()
+
+
+def test_connection_check_is_cached(offline_generator, tmp_path):
+    """Test that a successful check is remembered, but not across models."""
+    cache_path = str(tmp_path / "connection.json")
+    with FakeOpenAIServer(schema_responder(offline_generator.schema)) as server:
+        generator = OpenAIGenerator(
+            schema_path="tests/fixtures/schemas/test_schema.yaml",
+            config_path="tests/fixtures/config/test_generator_config.yaml",
+            base_url=server.base_url,
+        )
+        assert generator.verify_access(cache_path)
+        assert generator.verify_access(cache_path)
+        generator.model = "other-model"
+        assert generator.verify_access(cache_path)
+
+    assert server.requests == [
+        ("GET", "/v1/models/gpt-4"),
+        ("GET", "/v1/models/other-model"),
+    ]
+    assert "test-key" not in (tmp_path / "connection.json").read_text()
+
+
+def use_structured_outputs(generator):
+    """Switch a generator's config to the json_schema response format."""
+    config = generator.config
+    generator.config = config.model_copy(
+        update={
+            "response": config.response.model_copy(update={"format": "json_schema"})
+        }
+    )
+
+
+def test_structured_outputs_are_requested(offline_generator):
+    """Test that requests carry the compiled schema and are never malformed."""
+    use_structured_outputs(offline_generator)
+    bodies = []
+    respond = schema_responder(offline_generator.schema)
+
+    def responder(body):
+        bodies.append(body)
+        return respond(body)
+
+    with FakeOpenAIServer(responder, malformed_rate=1.0) as server:
+        offline_generator.client = offline_generator.client.with_options(
+            base_url=server.base_url
+        )
+        persona = offline_generator.generate()
+        personas = offline_generator.generate_batch(3)
+
+    assert offline_generator.validate(persona)
+    assert len(personas) == 3
+    assert server.faults["malformed"] == 0
+    single, batch = (body["response_format"]["json_schema"] for body in bodies)
+    assert single["strict"] and single["name"] == "persona"
+    assert batch["name"] == "persona_batch"
+    batch_prompt = bodies[1]["messages"][-1]["content"]
+    assert '"personas" array' in batch_prompt and "JSON array" not in batch_prompt
+
+
+def test_structured_repair_and_null_optional_fields(offline_generator, monkeypatch):
+    """Test that repairs request the failed fields, and nulls are dropped."""
+    use_structured_outputs(offline_generator)
+    # Loaded schemas are shared through the registry: replace, don't mutate
+    schema = offline_generator.schema.model_copy(deep=True)
+    schema.fields["background"].required = False
+    offline_generator.schema = schema
+    persona = dict(make_persona("1"), age="thirty", background=None)
+    calls = fake_responses(
+        offline_generator,
+        monkeypatch,
+        [json.dumps(persona), json.dumps({"age": 30})],
+    )
+
+    result = offline_generator.generate()
+
+    assert "background" not in result and result["age"] == 30
+    repair_schema = calls[1]["response_format"]["json_schema"]["schema"]
+    assert list(repair_schema["properties"]) == ["age"]
+
+
+def test_refusal_is_a_validation_failure(offline_generator, monkeypatch):
+    """Test that a refused request fails like an unparseable one."""
+    refusal = make_completion(None)
+    refusal.choices[0].message.refusal = "I can't help with that"
+    monkeypatch.setattr(offline_generator, "_send", lambda body: (refusal, {}))
+
+    with pytest.raises(ValueError, match="refused"):
+        offline_generator.generate()
+    assert offline_generator.usage.requests == 1
+
+
+def test_export_formats_with_default_config(monkeypatch):
+    """Test that export doesn't depend on the config's response format."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    generator = OpenAIGenerator(
+        schema_path="tests/fixtures/schemas/test_schema.yaml",
+        config_path="src/generators/config/generator_config.yaml",
+    )
+    persona = make_persona("1")
+
+    assert generator.config.response.format == "json_schema"
+    assert json.loads(generator.export(persona, "json")) == persona
+    assert yaml.safe_load(generator.export(persona, "yaml")) == persona
+    with pytest.raises(ValueError, match="Unsupported export format"):
+        generator.export(persona, "json_schema")
+
+
+def test_client_is_created_on_first_use(monkeypatch):
+    """Test that a generator can be built (e.g. for a dry run) without a key."""
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    generator = OpenAIGenerator(
+        schema_path="tests/fixtures/schemas/test_schema.yaml",
+        config_path="tests/fixtures/config/test_generator_config.yaml",
+    )
+    assert generator._build_messages()
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    assert generator.client.api_key == "test-key"
@@ -0,0 +1,128 @@
+import pytest
+
+from src.exporters.persona_exporter import PersonaExporter
+from src.models.schema import Schema
+from src.testing.fake_openai import fake_persona
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+@pytest.fixture
+def schema():
+    """Schema covering every column type."""
+    return Schema(
+        name="Columns",
+        description="Every field type",
+        version="1.0.0",
+        fields={
+            "name": {"description": "Name"},
+            "gender": {"description": "Gender", "options": ["female", "male"]},
+            "age": {"description": "Age", "type": "number"},
+            "children": {"description": "Children", "type": "integer"},
+            "employed": {"description": "Employed", "type": "boolean"},
+            "skills": {"description": "Skills", "type": "array"},
+            "address": {"description": "Address", "type": "object"},
+            "work": {
+                "description": "Work",
+                "type": "object",
+                "fields": {
+                    "role": {"description": "Role"},
+                    "team_size": {"description": "Team size", "type": "integer"},
+                    "remote": {
+                        "description": "Remote",
+                        "type": "boolean",
+                        "required": False,
+                    },
+                    "perks": {"description": "Perks", "type": "object"},
+                },
+            },
+        },
+    )
+
+
+@pytest.fixture
+def exporter(tmp_path):
+    """Exporter writing to a temporary directory."""
+    return PersonaExporter(output_dir=str(tmp_path))
+
+
+def test_columns_follow_the_schema(exporter, schema):
+    """Test that column types are derived from the schema fields."""
+    path = exporter.export_parquet(
+        [fake_persona(schema, i) for i in range(3)], schema, "personas"
+    )
+
+    arrow_schema = pq.read_schema(path)
+
+    assert path.name == "personas.parquet"
+    assert arrow_schema.field("name").type == pa.string()
+    assert arrow_schema.field("gender").type == pa.dictionary(pa.int32(), pa.string())
+    assert arrow_schema.field("age").type == pa.float64()
+    assert arrow_schema.field("children").type == pa.int64()
+    assert arrow_schema.field("employed").type == pa.bool_()
+    assert arrow_schema.field("skills").type == pa.list_(pa.string())
+    assert arrow_schema.field("address").type == pa.string()
+    work = arrow_schema.field("work").type
+    assert pa.types.is_struct(work)
+    assert work.field("team_size").type == pa.int64()
+    assert work.field("perks").type == pa.string()
+
+
+def test_round_trip(exporter, schema):
+    """Test that exported personas read back unchanged."""
+    personas = [fake_persona(schema, i) for i in range(5)]
+
+    path = exporter.export_parquet(personas, schema)
+
+    assert list(PersonaExporter.iter_export(path)) == personas
+
+
+def test_struct_fields_round_trip(exporter, schema):
+    """Test that optional struct fields and free-form objects read back."""
+    persona = fake_persona(schema, 1)
+    del persona["work"]["remote"]
+
+    path = exporter.export_parquet([persona], schema)
+    (read,) = PersonaExporter.iter_export(path)
+
+    assert read == persona
+    assert isinstance(read["children"], int)
+    work = pq.read_table(path, columns=["work"]).column("work").to_pylist()[0]
+    assert work["remote"] is None
+
+
+def test_row_groups_and_single_columns(exporter, schema):
+    """Test streaming row groups and reading one column on its own."""
+    with exporter.open_parquet(schema, row_group_size=4) as stream:
+        for i in range(10):
+            stream.write(fake_persona(schema, i))
+        assert not stream.path.exists()
+
+    parquet_file = pq.ParquetFile(stream.path)
+    genders = pq.read_table(stream.path, columns=["gender"])
+
+    assert parquet_file.metadata.num_row_groups == 3
+    assert genders.column_names == ["gender"]
+    assert genders.column("gender").to_pylist()[:3] == ["female", "male", "female"]
+    column_chunk = parquet_file.metadata.row_group(0).column(1)
+    assert "RLE_DICTIONARY" in column_chunk.encodings
+
+
+def test_mismatched_values_become_null(exporter, schema):
+    """Test that values of the wrong type are written as null."""
+    path = exporter.export_parquet([{"name": "Ada", "age": "forty"}], schema)
+
+    assert list(PersonaExporter.iter_export(path)) == [{"name": "Ada"}]
+
+
+def test_aborted_stream_is_readable(exporter, schema):
+    """Test that a failing run leaves a valid partial file behind."""
+    with pytest.raises(RuntimeError):
+        with exporter.open_parquet(schema, row_group_size=2) as stream:
+            for i in range(3):
+                stream.write(fake_persona(schema, i))
+            raise RuntimeError("crash")
+
+    assert pq.read_table(stream.part_path).num_rows == 3
+    assert not stream.path.exists()
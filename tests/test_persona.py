@@ -0,0 +1,90 @@
+import builtins
+import json
+
+import pytest
+import yaml
+
+from src.exporters.persona_exporter import PersonaExporter
+from src.models.persona import Persona
+
+
+def make_record(index):
+    """Build an exported persona record."""
+    return {"id": str(index), "first_name": f"Name {index}", "age": "30"}
+
+
+@pytest.fixture
+def exporter(tmp_path):
+    """Exporter writing to a temporary directory."""
+    return PersonaExporter(output_dir=str(tmp_path))
+
+
+def test_from_dict_shares_the_default_schema():
+    """Test that personas reuse one schema instead of reloading it."""
+    first = Persona.from_dict(make_record(1))
+    second = Persona.from_dict(make_record(2))
+
+    assert first.schema is second.schema
+    assert first.schema["name"] == "Default Persona Schema"
+
+
+def test_from_dicts_does_no_file_io(monkeypatch):
+    """Test that bulk rehydration opens no file per record."""
+    Persona.load_schema()
+    opened = []
+    real_open = builtins.open
+
+    def tracking_open(*args, **kwargs):
+        opened.append(args[0])
+        return real_open(*args, **kwargs)
+
+    monkeypatch.setattr(builtins, "open", tracking_open)
+    personas = list(Persona.from_dicts(make_record(i) for i in range(1000)))
+
+    assert len(personas) == 1000
+    assert opened == []
+    assert personas[999].data["id"] == "999"
+
+
+def test_from_dicts_uses_the_given_schema():
+    """Test that an explicit schema is used for every persona."""
+    schema = {"id": {"type": "string", "required": True}}
+
+    personas = list(Persona.from_dicts([make_record(1), make_record(2)], schema))
+
+    assert all(persona.schema is schema for persona in personas)
+    assert all(persona.validate() for persona in personas)
+
+
+@pytest.mark.parametrize("output_format", ["jsonl", "json", "yaml"])
+def test_from_export(exporter, output_format):
+    """Test rehydrating every export format."""
+    records = [make_record(i) for i in range(5)]
+    if output_format == "jsonl":
+        path = exporter.export_jsonl(records, "personas")
+    else:
+        path = exporter.export_multiple(records, output_format, "personas")
+
+    personas = list(Persona.from_export(str(path)))
+
+    assert [persona.to_dict() for persona in personas] == records
+
+
+def test_from_export_rejects_unknown_format(tmp_path):
+    """Test that unsupported extensions are rejected."""
+    path = tmp_path / "personas.csv"
+    path.write_text("id\n1\n")
+
+    with pytest.raises(ValueError):
+        Persona.from_export(str(path))
+
+
+def test_schema_file_is_reparsed_after_a_change(tmp_path):
+    """Test that the shared schema follows edits of the file."""
+    path = tmp_path / "schema.yaml"
+    path.write_text(yaml.safe_dump({"name": "v1"}))
+    assert Persona.load_schema(str(path))["name"] == "v1"
+
+    path.write_text(json.dumps({"name": "version 2"}))
+
+    assert Persona.from_schema_file(str(path)).schema["name"] == "version 2"
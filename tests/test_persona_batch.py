@@ -0,0 +1,99 @@
+import tracemalloc
+
+import pytest
+
+from src.exporters.persona_exporter import PersonaExporter
+from src.models.persona_batch import PersonaBatch
+from src.models.schema import Schema
+from src.schemas.loader import SchemaLoader
+from src.testing.fake_openai import fake_persona
+
+
+@pytest.fixture
+def schema():
+    """Schema covering every column type."""
+    return Schema(
+        name="Batch",
+        description="Every field type",
+        version="1.0.0",
+        fields={
+            "name": {"description": "Name"},
+            "gender": {"description": "Gender", "options": ["female", "male"]},
+            "age": {"description": "Age", "type": "number"},
+            "employed": {"description": "Employed", "type": "boolean"},
+            "skills": {"description": "Skills", "type": "array"},
+            "address": {"description": "Address", "type": "object"},
+        },
+    )
+
+
+@pytest.fixture
+def records(schema):
+    """Personas of the schema."""
+    return [fake_persona(schema, seed) for seed in range(10)]
+
+
+def test_round_trip(schema, records):
+    """Test that personas convert back to identical dictionaries."""
+    batch = PersonaBatch.from_dicts(schema, records)
+
+    assert len(batch) == 10
+    assert batch.to_dicts() == records
+    assert batch[3]["gender"] == "male"
+    assert batch[3]["age"] == 21 and isinstance(batch[3]["age"], int)
+
+
+def test_irregular_values_round_trip(schema):
+    """Test missing fields, wrong types and unknown keys are kept as is."""
+    records = [
+        {"name": "Ada", "gender": "robot", "age": 36.5, "nickname": "A"},
+        {"name": None, "age": "forty", "employed": 1, "skills": "none"},
+        {"name": "Zoë", "age": 2**60, "employed": False, "address": {}},
+    ]
+
+    batch = PersonaBatch.from_dicts(schema, records)
+
+    assert batch.to_dicts() == records
+    assert "gender" not in batch[1]
+    assert dict(batch[0]) == records[0]
+    with pytest.raises(KeyError):
+        batch[1]["gender"]
+
+
+def test_slicing_and_views(schema, records):
+    """Test negative indices, slices and columns."""
+    batch = PersonaBatch.from_dicts(schema, records)
+
+    sliced = batch[2:8:2]
+
+    assert isinstance(sliced, PersonaBatch)
+    assert sliced.schema is batch.schema
+    assert sliced.to_dicts() == records[2:8:2]
+    assert batch[-1].to_dict() == records[-1]
+    assert batch.column("employed") == [r["employed"] for r in records]
+    assert batch.take([9, 0]).to_dicts() == [records[9], records[0]]
+    with pytest.raises(IndexError):
+        batch[10]
+
+
+def test_from_export(tmp_path, schema, records):
+    """Test loading a JSONL export."""
+    path = PersonaExporter(str(tmp_path)).export_jsonl(records, "personas")
+
+    assert PersonaBatch.from_export(schema, path).to_dicts() == records
+
+
+def test_memory_is_a_fraction_of_dicts():
+    """Test that a batch holds the default schema's personas compactly."""
+    schema = SchemaLoader("schemas").load_schema("default_schema")
+    tracemalloc.start()
+    try:
+        records = [fake_persona(schema, seed) for seed in range(5000)]
+        dict_bytes = tracemalloc.get_traced_memory()[0]
+        batch = PersonaBatch.from_dicts(schema, records)
+        batch_bytes = tracemalloc.get_traced_memory()[0] - dict_bytes
+    finally:
+        tracemalloc.stop()
+
+    assert batch_bytes * 3 < dict_bytes
+    assert batch.nbytes * 3 < dict_bytes
@@ -207,3 +207,87 @@ def test_nested_data_export(
         exported_persona = data["personas"][0]
         assert exported_persona["location"]["city"] == "San Francisco"
         assert exported_persona["interests"] == ["coding", "reading", "hiking"]
+
+
+def test_stream_writes_jsonl_atomically(sample_personas, temp_dir):
+    """Test that a stream is only visible under its final name once closed."""
+    exporter = PersonaExporter(output_dir=temp_dir)
+
+    with exporter.open_stream("stream", flush_every=1) as stream:
+        for persona in sample_personas:
+            stream.write(persona)
+        assert stream.part_path.exists()
+        assert not stream.path.exists()
+
+    assert not stream.part_path.exists()
+    assert stream.path.suffix == ".jsonl"
+    assert list(exporter.iter_jsonl(stream.path)) == sample_personas
+
+
+def test_stream_keeps_partial_file_on_error(sample_personas, temp_dir):
+    """Test that records written before a failure survive in the .part file."""
+    exporter = PersonaExporter(output_dir=temp_dir)
+
+    with pytest.raises(RuntimeError):
+        with exporter.open_stream("stream") as stream:
+            stream.write(sample_personas[0])
+            raise RuntimeError("crash")
+
+    assert not stream.path.exists()
+    assert list(exporter.iter_jsonl(stream.part_path)) == sample_personas[:1]
+
+
+def test_stream_does_not_truncate_leftover_part(sample_personas, temp_dir):
+    """Test that rerunning after a crash keeps the interrupted run's records."""
+    exporter = PersonaExporter(output_dir=temp_dir)
+    with pytest.raises(RuntimeError):
+        with exporter.open_stream("stream") as crashed:
+            crashed.write(sample_personas[0])
+            raise RuntimeError("crash")
+
+    with exporter.open_stream("stream") as stream:
+        stream.write(sample_personas[1])
+
+    assert stream.recovered_path == crashed.part_path.with_name("stream.jsonl.part.1")
+    assert list(exporter.iter_jsonl(stream.recovered_path)) == sample_personas[:1]
+    assert list(exporter.iter_jsonl(stream.path)) == sample_personas[1:2]
+
+
+def test_iter_jsonl_skips_truncated_line(sample_personas, temp_dir):
+    """Test that a half-written last line is ignored."""
+    path = Path(temp_dir) / "personas.jsonl"
+    with open(path, "w") as f:
+        f.write(json.dumps(sample_personas[0]) + "\n")
+        f.write(json.dumps(sample_personas[1])[:10])
+
+    assert list(PersonaExporter.iter_jsonl(path)) == sample_personas[:1]
+
+
+def test_iter_jsonl_reads_unterminated_last_line(sample_personas, temp_dir):
+    """Test that a complete last line is read without a trailing newline."""
+    path = Path(temp_dir) / "personas.jsonl"
+    with open(path, "w") as f:
+        f.write(json.dumps(sample_personas[0]) + "\n")
+        f.write(json.dumps(sample_personas[1]))
+
+    assert list(PersonaExporter.iter_jsonl(path)) == sample_personas[:2]
+
+
+def test_compact_matches_export_multiple(sample_personas, temp_dir):
+    """Test that compacting a stream gives the same document as a direct export."""
+    exporter = PersonaExporter(output_dir=temp_dir)
+    jsonl_path = exporter.export_jsonl(iter(sample_personas), "stream")
+
+    for output_format in ["json", "yaml"]:
+        compacted = exporter.compact(jsonl_path, output_format, "compacted")
+        direct = exporter.export_multiple(sample_personas, output_format, "direct")
+        assert compacted.read_text() == direct.read_text()
+
+
+def test_compact_empty_stream(temp_dir):
+    """Test compacting an empty stream."""
+    exporter = PersonaExporter(output_dir=temp_dir)
+    jsonl_path = exporter.export_jsonl([], "empty")
+
+    with open(exporter.compact(jsonl_path, "json")) as f:
+        assert json.load(f) == {"personas": []}
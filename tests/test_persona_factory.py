@@ -1,7 +1,10 @@
+import asyncio
 import json
+import random
 import tempfile
 from pathlib import Path
 
+import openai
 import pytest
 import yaml
 
@@ -23,6 +26,43 @@ def factory(temp_dir):
     )
 
 
+@pytest.fixture
+def stub_factory(temp_dir, monkeypatch):
+    """Create a PersonaFactory whose generator never touches the network."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    factory = PersonaFactory(
+        schema_path="tests/fixtures/schemas/test_schema.yaml", output_dir=temp_dir
+    )
+    state = {"calls": 0, "in_flight": 0, "max_in_flight": 0}
+
+    async def fake_agenerate(prompt=None, slot=None):
+        call = state["calls"]
+        state["calls"] += 1
+        state["in_flight"] += 1
+        state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        try:
+            await asyncio.sleep(random.uniform(0, 0.01))
+            if call == 3:
+                raise ValueError("Generated persona failed validation")
+            return {"id": str(call)}
+        finally:
+            state["in_flight"] -= 1
+
+    async def fake_agenerate_batch(count, prompt=None, slot=None):
+        personas = []
+        for _ in range(count):
+            try:
+                personas.append(await fake_agenerate(prompt))
+            except ValueError:
+                pass
+        return personas
+
+    factory.generator.agenerate = fake_agenerate
+    factory.generator.agenerate_batch = fake_agenerate_batch
+    factory.stub_state = state
+    return factory
+
+
 def test_factory_initialization(factory):
     """Test factory initialization with default parameters."""
     assert factory.schema_path == "tests/fixtures/schemas/test_schema.yaml"
@@ -121,3 +161,88 @@ def test_generate_and_export(factory):
         data = json.load(f)
         assert "personas" in data
         assert len(data["personas"]) == num_personas
+
+
+def test_generate_personas_concurrently_keeps_order(stub_factory):
+    """Test that concurrent generation returns personas in request order."""
+    personas = stub_factory.generate_personas(20, concurrency=5)
+
+    assert stub_factory.stub_state["calls"] == 20
+    assert [p["id"] for p in personas] == [str(i) for i in range(20) if i != 3]
+
+
+def test_generate_personas_respects_concurrency_limit(stub_factory):
+    """Test that no more than `concurrency` requests are in flight."""
+    stub_factory.generate_personas(30, concurrency=4)
+
+    assert stub_factory.stub_state["max_in_flight"] == 4
+
+
+def test_generate_personas_rejects_invalid_concurrency(stub_factory):
+    """Test that a concurrency below 1 is rejected."""
+    with pytest.raises(ValueError):
+        stub_factory.generate_personas(2, concurrency=0)
+
+
+def test_generate_personas_in_batches(stub_factory):
+    """Test that batches cover every persona slot exactly once."""
+    personas = stub_factory.generate_personas(10, concurrency=2, batch_size=4)
+
+    assert stub_factory.stub_state["calls"] == 10
+    assert sorted(int(p["id"]) for p in personas) == [i for i in range(10) if i != 3]
+
+
+def test_api_errors_abort_the_run(stub_factory):
+    """Test that API errors propagate instead of being logged as invalid."""
+
+    async def failing_agenerate(prompt=None, slot=None):
+        raise openai.APIConnectionError(request=None)
+
+    stub_factory.generator.agenerate = failing_agenerate
+
+    with pytest.raises(openai.APIConnectionError):
+        stub_factory.generate_personas(3, concurrency=2)
+
+
+def test_batches_split_run_into_slots():
+    """Test the split of a run into request slots."""
+    assert PersonaFactory._batches(10, 4) == [(0, 4), (4, 4), (8, 2)]
+    assert PersonaFactory._batches(3, 1) == [(0, 1), (1, 1), (2, 1)]
+    with pytest.raises(ValueError):
+        PersonaFactory._batches(3, 0)
+
+
+def test_generate_and_export_streams_jsonl(stub_factory):
+    """Test that the jsonl format streams personas in request order."""
+    stub_factory.output_format = "jsonl"
+    output_path = stub_factory.generate_and_export(8, concurrency=3)
+
+    assert output_path.suffix == ".jsonl"
+    personas = list(stub_factory.exporter.iter_jsonl(output_path))
+    assert [p["id"] for p in personas] == [str(i) for i in range(8) if i != 3]
+
+    compacted = stub_factory.exporter.compact(output_path, "json")
+    with open(compacted) as f:
+        assert json.load(f)["personas"] == personas
+
+
+def test_generate_and_export_streams_parquet(stub_factory):
+    """Test that the parquet format streams personas in request order."""
+    pytest.importorskip("pyarrow")
+    stub_factory.output_format = "parquet"
+    output_path = stub_factory.generate_and_export(8, concurrency=3)
+
+    assert output_path.suffix == ".parquet"
+    personas = list(stub_factory.exporter.iter_export(output_path))
+    assert [p["id"] for p in personas] == [str(i) for i in range(8) if i != 3]
+
+
+def test_generate_and_export_shards(stub_factory):
+    """Test that sharding splits the jsonl stream behind a manifest."""
+    stub_factory.output_format = "jsonl"
+    stub_factory.shard_records = 3
+    output_path = stub_factory.generate_and_export(8, concurrency=3)
+
+    assert output_path.name == "personas.manifest.json"
+    personas = list(stub_factory.exporter.iter_export(output_path))
+    assert [p["id"] for p in personas] == [str(i) for i in range(8) if i != 3]
@@ -0,0 +1,127 @@
+import pytest
+
+from src.models.schema import Schema
+from src.schemas.persona_validator import PersonaValidator, Violation
+
+
+@pytest.fixture
+def schema():
+    """Schema exercising every kind of constraint."""
+    return Schema(
+        name="Validator Schema",
+        description="Schema for validator tests",
+        version="1.0.0",
+        fields={
+            "name": {"description": "Name", "type": "string"},
+            "age": {"description": "Age", "type": "number"},
+            "bio": {
+                "description": "Bio",
+                "type": "string",
+                "min_length": 5,
+                "max_length": 20,
+            },
+            "gender": {
+                "description": "Gender",
+                "type": "string",
+                "options": ["female", "male", "non-binary"],
+            },
+            "hobbies": {"description": "Hobbies", "type": "array", "required": False},
+            "active": {"description": "Active", "type": "boolean", "required": False},
+            "children": {
+                "description": "Children",
+                "type": "integer",
+                "required": False,
+            },
+        },
+    )
+
+
+@pytest.fixture
+def validator(schema):
+    """Compiled validator for the test schema."""
+    return PersonaValidator(schema)
+
+
+@pytest.fixture
+def valid_persona():
+    """Persona satisfying every constraint of the test schema."""
+    return {"name": "Ada", "age": 36, "bio": "Mathematician", "gender": "female"}
+
+
+def test_valid_persona_has_no_errors(validator, valid_persona):
+    """Test that a valid persona produces no violations."""
+    assert validator.errors(valid_persona) == []
+    assert validator.is_valid(valid_persona)
+
+
+def test_optional_fields_may_be_missing(validator, valid_persona):
+    """Test that optional fields are only checked when present."""
+    assert validator.is_valid(valid_persona)
+    assert not validator.is_valid(dict(valid_persona, active="yes"))
+
+
+def test_all_violations_are_reported(validator):
+    """Test that validation does not stop at the first error."""
+    persona = {"age": "old", "bio": "x" * 30, "gender": "unknown", "hobbies": "chess"}
+
+    errors = validator.errors(persona)
+
+    assert [(e.field, e.code) for e in errors] == [
+        ("name", "missing"),
+        ("age", "type"),
+        ("bio", "max_length"),
+        ("gender", "option"),
+        ("hobbies", "type"),
+    ]
+    assert not validator.is_valid(persona)
+
+
+def test_violation_messages(validator, valid_persona):
+    """Test the human-readable messages of each violation kind."""
+    errors = validator.errors(dict(valid_persona, bio="abc", gender="other"))
+
+    assert errors == [
+        Violation("bio", "min_length", "Field bio is too short (min length: 5)"),
+        Violation(
+            "gender",
+            "option",
+            "Field gender value 'other' not in allowed options: "
+            "['female', 'male', 'non-binary']",
+        ),
+    ]
+
+
+def test_unhashable_value_is_not_an_option(validator, valid_persona):
+    """Test that a list value for an options field is a violation, not a crash."""
+    errors = validator.errors(dict(valid_persona, gender=["female"]))
+
+    assert [e.code for e in errors] == ["type"]
+
+
+def test_non_object_persona(validator):
+    """Test that a JSON array or scalar is rejected."""
+    assert not validator.is_valid(["not", "a", "persona"])
+    assert validator.errors("persona")[0].code == "type"
+
+
+def test_field_errors(validator):
+    """Test checking a single field value."""
+    assert validator.field_errors("bio", "Mathematician") == []
+    assert validator.field_errors("bio", "abc")[0].code == "min_length"
+    assert validator.field_errors("unknown", 1) == []
+    assert validator.field_errors("children", 2) == []
+    assert validator.field_errors("children", 2.5)[0].message == (
+        "Field children should be an integer"
+    )
+
+
+def test_validate_many(validator, valid_persona):
+    """Test validating a batch of personas in one call."""
+    personas = [valid_persona, dict(valid_persona, age=None), valid_persona] * 1000
+
+    results = validator.validate_many(personas)
+
+    assert len(results) == 3000
+    assert results[0] == []
+    assert [e.field for e in results[1]] == ["age"]
+    assert sum(1 for errors in results if errors) == 1000
@@ -0,0 +1,99 @@
+import asyncio
+import json
+import tempfile
+import time
+
+import pytest
+
+from src.factories.persona_factory import PersonaFactory
+from src.generators.post_processor import ParseError, PostProcessor
+from src.schemas.loader import SchemaLoader
+from src.testing.fake_openai import FakeOpenAIServer, fake_persona, schema_responder
+
+
+@pytest.fixture
+def temp_dir():
+    """Create a temporary directory for test outputs."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        yield tmp_dir
+
+
+@pytest.fixture
+def schema():
+    """The test persona schema."""
+    return SchemaLoader("tests/fixtures/schemas").load_schema("test_schema")
+
+
+@pytest.fixture
+def processor(schema):
+    """Post-processor with two worker processes."""
+    processor = PostProcessor(schema, processes=2)
+    yield processor
+    processor.close()
+
+
+def test_decode_in_workers(processor, schema):
+    """Test parsing and validating completions in the pool."""
+    valid = fake_persona(schema, 1)
+    invalid = dict(valid, age="forty")
+
+    async def decode():
+        single = await processor.decode_persona(json.dumps(valid))
+        batch = await processor.decode_batch(json.dumps([valid, invalid]))
+        return single, batch
+
+    single, batch = asyncio.run(decode())
+
+    assert single == (valid, [])
+    assert [errors == [] for _, errors in batch] == [True, False]
+    assert batch[1][1][0].field == "age"
+
+
+def test_parse_errors(processor):
+    """Test that malformed content raises ParseError from the workers."""
+    with pytest.raises(ParseError):
+        asyncio.run(processor.decode_persona("{truncated"))
+    with pytest.raises(ValueError):
+        asyncio.run(processor.decode_batch('"not an array"'))
+
+
+def test_pending_jobs_are_bounded(schema):
+    """Test that jobs beyond max_pending wait instead of queueing up."""
+    processor = PostProcessor(schema, processes=4, max_pending=2)
+
+    async def run():
+        await processor._run(time.sleep, 0)  # start the workers
+        started = time.monotonic()
+        await asyncio.gather(*(processor._run(time.sleep, 0.2) for _ in range(4)))
+        return time.monotonic() - started
+
+    try:
+        assert asyncio.run(run()) >= 0.4
+    finally:
+        processor.close()
+
+
+def test_factory_pipeline(temp_dir, monkeypatch):
+    """Test a run whose parsing, validation and dedup signing use workers."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    factory = PersonaFactory(
+        schema_path="tests/fixtures/schemas/test_schema.yaml",
+        config_path="tests/fixtures/config/test_generator_config.yaml",
+        output_dir=temp_dir,
+        dedup_threshold=0.9,
+        processes=2,
+    )
+
+    with factory, FakeOpenAIServer(
+        schema_responder(factory.generator.schema)
+    ) as server:
+        factory.generator.client = factory.generator.client.with_options(
+            base_url=server.base_url
+        )
+        personas = factory.generate_personas(6, concurrency=3, batch_size=2)
+        single = factory.generate_personas(2)
+
+    assert len(personas) == 6
+    assert len(single) == 2
+    assert len(factory.dedup) == 8
+    assert all(factory.generator.validate(persona) for persona in personas)
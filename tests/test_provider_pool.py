@@ -0,0 +1,184 @@
+import asyncio
+
+import openai
+import pytest
+import yaml
+from openai import OpenAI
+
+from src.generators.config.config_loader import ConfigLoader
+from src.generators.openai import OpenAIGenerator
+from src.generators.provider_pool import Provider, ProviderPool
+from src.schemas.loader import SchemaLoader
+from src.testing.fake_openai import FakeOpenAIServer, schema_responder
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_provider(name, weight=1.0):
+    """Build a backend whose client is never called."""
+    return Provider(name, OpenAI(api_key="test-key"), "fake-model", weight=weight)
+
+
+@pytest.fixture
+def responder():
+    """Fake API responder answering with personas of the test schema."""
+    return schema_responder(
+        SchemaLoader("tests/fixtures/schemas").load_schema("test_schema")
+    )
+
+
+def write_config(tmp_path, providers, **routing):
+    """Write the test generator config with a provider pool."""
+    with open("tests/fixtures/config/test_generator_config.yaml") as f:
+        config = yaml.safe_load(f)
+    config["providers"] = providers
+    config["routing"] = routing
+    path = tmp_path / "pool_config.yaml"
+    path.write_text(yaml.safe_dump(config))
+    return str(path)
+
+
+def test_weighted_round_robin():
+    """Test that requests are spread by weight, interleaved."""
+    pool = ProviderPool([make_provider("a", 3), make_provider("b", 1)])
+
+    picks = []
+    for _ in range(8):
+        provider = pool.acquire()
+        picks.append(provider.name)
+        pool.release(provider)
+
+    assert picks == ["a", "a", "b", "a"] * 2
+
+
+def test_least_loaded():
+    """Test that the backend with the fewest requests in flight is picked."""
+    pool = ProviderPool(
+        [make_provider("a"), make_provider("b", 2)], strategy="least-loaded"
+    )
+
+    picks = [pool.acquire().name for _ in range(3)]
+
+    assert sorted(picks) == ["a", "b", "b"]
+
+
+def test_unhealthy_backend_is_skipped_until_cooldown():
+    """Test that consecutive failures take a backend out for a while."""
+    clock = FakeClock()
+    pool = ProviderPool(
+        [make_provider("a"), make_provider("b")],
+        failure_threshold=2,
+        cooldown=10.0,
+        clock=clock,
+    )
+    a = pool.providers[0]
+    for _ in range(2):
+        pool.release(
+            pool.acquire(exclude=["b"]), openai.APIConnectionError(request=None)
+        )
+
+    assert not pool.healthy(a)
+    assert {pool.acquire().name for _ in range(4)} == {"b"}
+    assert pool.acquire(exclude=["b"]) is a  # better than nothing
+
+    clock.now = 10.0
+    pool.release(a)
+    assert pool.healthy(a) and a.failures == 0
+
+
+def test_invalid_pools():
+    """Test that empty pools, duplicate names and unknown strategies fail."""
+    with pytest.raises(ValueError):
+        ProviderPool([])
+    with pytest.raises(ValueError):
+        ProviderPool([make_provider("a"), make_provider("a")])
+    with pytest.raises(ValueError):
+        ProviderPool([make_provider("a")], strategy="random")
+
+
+def test_config_providers(tmp_path, monkeypatch):
+    """Test building a pool from the config, with per-backend settings."""
+    monkeypatch.setenv("KEY_A", "key-a")
+    config_path = write_config(
+        tmp_path,
+        [
+            {"name": "a", "api_key_env": "KEY_A", "weight": 2},
+            {
+                "name": "b",
+                "api_key_env": "KEY_A",
+                "model": "other-model",
+                "rate_limit": {"requests_per_minute": 60},
+            },
+        ],
+        strategy="least-loaded",
+    )
+
+    pool = ProviderPool.from_config(ConfigLoader().load_config(config_path))
+
+    assert pool.strategy == "least-loaded"
+    assert [p.model for p in pool.providers] == ["gpt-4", "other-model"]
+    assert pool.providers[0].client.api_key == "key-a"
+    assert pool.providers[1].rate_limiter.requests.limit == 60
+
+    monkeypatch.delenv("KEY_A")
+    with pytest.raises(ValueError, match="KEY_A"):
+        ProviderPool.from_config(ConfigLoader().load_config(config_path))
+
+
+def test_generator_fails_over(tmp_path, monkeypatch, responder):
+    """Test that requests move to a healthy backend when one fails."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    with FakeOpenAIServer(responder, error_rate=1.0) as down, FakeOpenAIServer(
+        responder
+    ) as up:
+        config_path = write_config(
+            tmp_path,
+            [
+                {"name": "down", "base_url": down.base_url, "weight": 5},
+                {"name": "up", "base_url": up.base_url, "model": "up-model"},
+            ],
+            failure_threshold=2,
+        )
+        generator = OpenAIGenerator(
+            schema_path="tests/fixtures/schemas/test_schema.yaml",
+            config_path=config_path,
+        )
+
+        async def generate():
+            try:
+                return await asyncio.gather(
+                    *(generator.agenerate(slot=i) for i in range(3))
+                )
+            finally:
+                await generator.aclose()
+
+        personas = [generator.generate(slot=i) for i in range(3)]
+        personas += asyncio.run(generate())
+
+    assert len(personas) == 6
+    assert down.faults["error"] == 2
+    assert len([r for r in up.requests if r[0] == "POST"]) == 6
+    assert not generator.pool.healthy(generator.pool.providers[0])
+    assert "down: 2 request(s), 2 error(s) (unhealthy)" in generator.pool.summary()
+
+
+def test_model_defaults_to_config(tmp_path):
+    """Test that the model comes from the generator config."""
+    with open("tests/fixtures/config/test_generator_config.yaml") as f:
+        config = yaml.safe_load(f)
+    config["model"] = "configured-model"
+    path = tmp_path / "model_config.yaml"
+    path.write_text(yaml.safe_dump(config))
+
+    generator = OpenAIGenerator(config_path=str(path))
+
+    assert generator.model == "configured-model"
+    assert OpenAIGenerator(config_path=str(path), model="gpt-4o").model == "gpt-4o"
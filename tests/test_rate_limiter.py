@@ -0,0 +1,178 @@
+from types import SimpleNamespace
+
+import openai
+import pytest
+
+from src.factories.persona_factory import PersonaFactory
+from src.generators.rate_limiter import (
+    RateLimiter,
+    TokenBucket,
+    parse_duration,
+    retry_after,
+)
+from src.testing.fake_openai import FakeOpenAIServer, schema_responder
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def rate_limit_error(headers):
+    """Build a 429 error carrying the given response headers."""
+    response = SimpleNamespace(request=None, status_code=429, headers=headers)
+    return openai.RateLimitError("Rate limit reached", response=response, body=None)
+
+
+def test_parse_duration():
+    """Test the reset duration formats used by the rate-limit headers."""
+    assert parse_duration("1s") == 1.0
+    assert parse_duration("6m0s") == 360.0
+    assert parse_duration("20ms") == pytest.approx(0.02)
+    assert parse_duration("1h2m3.5s") == 3723.5
+    assert parse_duration("2.5") == 2.5
+    assert parse_duration("soon") is None
+    assert parse_duration(None) is None
+
+
+def test_retry_after_prefers_milliseconds():
+    """Test that `retry-after-ms` wins over `retry-after`."""
+    assert retry_after({"retry-after-ms": "1500", "retry-after": "9"}) == 1.5
+    assert retry_after({"retry-after": "2"}) == 2.0
+    assert retry_after({}) is None
+
+
+def test_bucket_allows_burst_then_waits():
+    """Test that a bucket admits its capacity at once, then paces requests."""
+    clock = FakeClock()
+    bucket = TokenBucket(60, clock)
+
+    assert all(bucket.take(1) == 0 for _ in range(60))
+    assert bucket.take(1) == pytest.approx(1.0)
+    assert bucket.take(1) == pytest.approx(2.0)
+
+    clock.now = 10.0
+    assert bucket.take(1) == 0
+
+
+def test_reserve_charges_estimate_and_settles_actual():
+    """Test that the token estimate is corrected from the actual usage."""
+    clock = FakeClock()
+    limiter = RateLimiter(tokens_per_minute=6000, clock=clock)
+
+    assert limiter.reserve(5000) == 0
+    assert limiter.reserve(5000) == pytest.approx(40.0)
+
+    # The first request only used 1000 tokens: 4000 come back
+    limiter.settle(5000, SimpleNamespace(total_tokens=1000))
+    assert limiter.tokens.level == pytest.approx(0.0)
+    assert limiter.throttled == 1
+
+
+def test_estimate_counts_prompt_and_completion():
+    """Test the token estimate of a request."""
+    limiter = RateLimiter(estimated_completion_tokens=100)
+    messages = [{"role": "user", "content": "x" * 400}]
+
+    assert limiter.estimate(messages) == 201
+    assert limiter.estimate(messages, count=3) == 401
+
+
+def test_headers_clamp_and_set_limits():
+    """Test that unset limits are learned and buckets follow the server."""
+    clock = FakeClock()
+    limiter = RateLimiter(clock=clock)
+
+    limiter.settle(
+        10,
+        headers={
+            "x-ratelimit-limit-requests": "100",
+            "x-ratelimit-remaining-requests": "0",
+            "x-ratelimit-reset-requests": "3s",
+            "x-ratelimit-limit-tokens": "1000",
+            "x-ratelimit-remaining-tokens": "400",
+        },
+    )
+
+    assert limiter.requests.limit == 100
+    assert limiter.tokens.level == 400
+    assert limiter.reserve(10) == pytest.approx(3.0)
+
+
+def test_rate_limit_error_pauses_every_caller():
+    """Test that a 429 with Retry-After delays the next reservations."""
+    clock = FakeClock()
+    limiter = RateLimiter(clock=clock)
+
+    delay = limiter.backoff(rate_limit_error({"retry-after": "5"}), 10, attempt=0)
+
+    assert delay == 0
+    assert limiter.reserve(10) == pytest.approx(5.0)
+    assert limiter.retries == 1
+
+
+def test_backoff_without_hint_is_exponential():
+    """Test the jittered exponential backoff of errors without Retry-After."""
+    limiter = RateLimiter(max_backoff=10, max_connection_retries=6)
+    error = openai.APIConnectionError(request=None)
+
+    assert 0.5 <= limiter.backoff(error, 10, attempt=0) <= 1.0
+    assert 4.0 <= limiter.backoff(error, 10, attempt=3) <= 8.0
+    assert limiter.backoff(error, 10, attempt=5) <= 10
+
+
+def test_backoff_gives_up():
+    """Test that non-retryable errors and exhausted retries are raised."""
+    limiter = RateLimiter(max_retries=2)
+
+    with pytest.raises(ValueError):
+        limiter.backoff(ValueError("bad persona"), 10, attempt=0)
+    with pytest.raises(openai.RateLimitError):
+        limiter.backoff(rate_limit_error({}), 10, attempt=2)
+
+
+def test_connection_errors_fail_fast():
+    """Test that an unreachable endpoint is retried fewer times than a 429."""
+    limiter = RateLimiter(max_retries=6, max_connection_retries=1)
+    error = openai.APIConnectionError(request=None)
+
+    assert limiter.backoff(error, 10, attempt=0) <= 1.0
+    with pytest.raises(openai.APIConnectionError):
+        limiter.backoff(error, 10, attempt=1)
+    assert limiter.backoff(rate_limit_error({"retry-after": "0"}), 10, attempt=5) == 0
+
+
+def test_generation_recovers_from_429(temp_dir, monkeypatch):
+    """Test a concurrent run against a server that enforces a request quota."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    factory = PersonaFactory(
+        schema_path="tests/fixtures/schemas/test_schema.yaml",
+        config_path="tests/fixtures/config/test_generator_config.yaml",
+        output_dir=temp_dir,
+    )
+    server = FakeOpenAIServer(
+        schema_responder(factory.generator.schema),
+        requests_per_minute=4,
+        rate_window=0.5,
+    )
+    with server:
+        factory.generator.client = factory.generator.client.with_options(
+            base_url=server.base_url
+        )
+        personas = factory.generate_personas(8, concurrency=4)
+
+    assert len(personas) == 8
+    # 4 requests per 0.5 s window, advertised per minute
+    assert factory.generator.rate_limiter.requests.limit == 480
+    assert server.rate_limited == factory.generator.rate_limiter.retries
+
+
+@pytest.fixture
+def temp_dir(tmp_path):
+    """Temporary output directory."""
+    return str(tmp_path)
@@ -0,0 +1,148 @@
+import os
+from pathlib import Path
+
+import pytest
+import yaml
+
+from src.generators.config.config_loader import ConfigLoader
+from src.schemas.loader import SchemaLoader
+from src.schemas.registry import REGISTRY, Registry
+
+
+def parse(content):
+    """Parse YAML content, standing in for a validated model."""
+    return yaml.safe_load(content)
+
+
+def write(path, data, mtime=None):
+    """Write a YAML file, optionally with a fixed mtime."""
+    path.write_text(yaml.safe_dump(data))
+    if mtime is not None:
+        os.utime(path, ns=(mtime, mtime))
+
+
+def test_unchanged_file_is_parsed_once(tmp_path):
+    """Test that a second load returns the cached object."""
+    registry = Registry()
+    path = tmp_path / "a.yaml"
+    write(path, {"name": "a"})
+
+    first = registry.load("schema", str(path), parse)
+
+    assert registry.load("schema", str(path), parse) is first
+    assert (registry.parses, registry.hits) == (1, 1)
+
+
+def test_changed_file_is_parsed_again(tmp_path):
+    """Test that a new content invalidates the cached object."""
+    registry = Registry()
+    path = tmp_path / "a.yaml"
+    write(path, {"name": "a"}, mtime=1_000_000_000)
+    registry.load("schema", str(path), parse)
+
+    write(path, {"name": "b"}, mtime=2_000_000_000)
+
+    assert registry.load("schema", str(path), parse) == {"name": "b"}
+    assert registry.parses == 2
+
+
+def test_touched_file_is_not_parsed_again(tmp_path):
+    """Test that an mtime change alone is resolved by the content hash."""
+    registry = Registry()
+    path = tmp_path / "a.yaml"
+    write(path, {"name": "a"}, mtime=1_000_000_000)
+    registry.load("schema", str(path), parse)
+
+    os.utime(path, ns=(2_000_000_000, 2_000_000_000))
+    registry.load("schema", str(path), parse)
+
+    assert registry.parses == 1
+
+
+def test_kinds_are_cached_separately(tmp_path):
+    """Test that the same file loaded as two kinds is parsed for each."""
+    registry = Registry()
+    path = tmp_path / "a.yaml"
+    write(path, {"name": "a"})
+
+    registry.load("schema", str(path), parse)
+    registry.load("config", str(path), lambda content: "config")
+
+    assert registry.load("config", str(path), parse) == "config"
+
+
+def test_parse_errors_are_not_cached(tmp_path):
+    """Test that a failing parse propagates and is retried next time."""
+    registry = Registry()
+    path = tmp_path / "a.yaml"
+    write(path, {"name": "a"})
+
+    def fail(content):
+        raise ValueError("invalid")
+
+    with pytest.raises(ValueError):
+        registry.load("schema", str(path), fail)
+    assert registry.load("schema", str(path), parse) == {"name": "a"}
+
+
+def test_missing_file(tmp_path):
+    """Test that a missing file raises FileNotFoundError."""
+    with pytest.raises(FileNotFoundError):
+        Registry().load("schema", str(tmp_path / "missing.yaml"), parse)
+
+
+def test_snapshot_skips_parsing_in_a_new_process(tmp_path):
+    """Test that a fresh registry serves parsed objects from the snapshot."""
+    snapshot = tmp_path / "snapshot.pkl"
+    path = tmp_path / "a.yaml"
+    write(path, {"name": "a"})
+    Registry(str(snapshot)).load("schema", str(path), parse)
+
+    fresh = Registry(str(snapshot))
+
+    def fail(content):
+        raise AssertionError("parsed despite the snapshot")
+
+    assert fresh.load("schema", str(path), fail) == {"name": "a"}
+    assert fresh.parses == 0
+
+
+def test_unreadable_snapshot_is_ignored(tmp_path):
+    """Test that a corrupt snapshot falls back to parsing."""
+    snapshot = tmp_path / "snapshot.pkl"
+    snapshot.write_bytes(b"not a pickle")
+    path = tmp_path / "a.yaml"
+    write(path, {"name": "a"})
+
+    registry = Registry(str(snapshot))
+
+    assert registry.load("schema", str(path), parse) == {"name": "a"}
+    assert registry.parses == 1
+
+
+def test_listing_is_refreshed_when_the_directory_changes(tmp_path):
+    """Test that list_files rescans only after a file is added."""
+    registry = Registry()
+    write(tmp_path / "b.yaml", {})
+    write(tmp_path / "a.yaml", {})
+    (tmp_path / "notes.txt").write_text("")
+
+    assert registry.list_files(str(tmp_path)) == ["a", "b"]
+
+    write(tmp_path / "c.yaml", {})
+    os.utime(tmp_path, ns=(3_000_000_000, 3_000_000_000))
+
+    assert registry.list_files(str(tmp_path)) == ["a", "b", "c"]
+
+
+def test_loaders_share_validated_objects():
+    """Test that the schema and config loaders go through the registry."""
+    schema = SchemaLoader("schemas").load_schema("default_schema")
+    config_path = str(Path("src/generators/config/generator_config.yaml"))
+
+    assert SchemaLoader("schemas").load_schema("default_schema") is schema
+    assert ConfigLoader().load_config(config_path) is ConfigLoader().load_config(
+        config_path
+    )
+    assert "default_schema" in SchemaLoader("schemas").list_schemas()
+    assert REGISTRY.hits >= 2
@@ -0,0 +1,153 @@
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+import pytest
+
+from src.factories.persona_factory import PersonaFactory
+from src.generators.openai import OpenAIGenerator
+from src.generators.response_cache import ResponseCache
+from src.testing.fake_openai import FakeOpenAIServer, schema_responder
+
+SCHEMA_PATH = "tests/fixtures/schemas/test_schema.yaml"
+CONFIG_PATH = "tests/fixtures/config/test_generator_config.yaml"
+
+
+@pytest.fixture
+def temp_dir():
+    """Create a temporary directory for test outputs."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        yield tmp_dir
+
+
+@pytest.fixture
+def schema(monkeypatch):
+    """The test schema, loaded with a dummy API key."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    return OpenAIGenerator(schema_path=SCHEMA_PATH, config_path=CONFIG_PATH).schema
+
+
+def make_factory(temp_dir, base_url, mode, output="export"):
+    """Create a factory with a response cache in the temporary directory."""
+    factory = PersonaFactory(
+        schema_path=SCHEMA_PATH,
+        config_path=CONFIG_PATH,
+        output_dir=str(Path(temp_dir) / output),
+        cache_path=str(Path(temp_dir) / "cache.sqlite"),
+        cache_mode=mode,
+    )
+    factory.generator.client = factory.generator.client.with_options(base_url=base_url)
+    return factory
+
+
+def test_key_depends_on_request_and_slot():
+    """Test that the key covers the request body and the slot index."""
+    body = {"model": "gpt-4", "temperature": 0.9, "messages": [{"content": "x"}]}
+
+    assert ResponseCache.key(body, 0) == ResponseCache.key(dict(body), 0)
+    assert ResponseCache.key(body, 0) != ResponseCache.key(body, 1)
+    assert ResponseCache.key(body, 0) != ResponseCache.key(
+        dict(body, temperature=0.5), 0
+    )
+
+
+def test_get_and_put(temp_dir):
+    """Test storing and reading back a response."""
+    cache = ResponseCache(str(Path(temp_dir) / "cache.sqlite"))
+
+    assert cache.get("a") is None
+    cache.put("a", {"id": "1"})
+
+    assert cache.get("a") == {"id": "1"}
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_cache_persists_across_instances(temp_dir):
+    """Test that responses survive reopening the database."""
+    path = str(Path(temp_dir) / "cache.sqlite")
+    cache = ResponseCache(path)
+    cache.put("a", {"id": "1"})
+    cache.close()
+
+    assert ResponseCache(path).get("a") == {"id": "1"}
+
+
+def test_lru_eviction_by_entries(temp_dir):
+    """Test that the least recently used entry is evicted first."""
+    cache = ResponseCache(str(Path(temp_dir) / "cache.sqlite"), max_entries=2)
+    cache.put("a", {"id": "a"})
+    time.sleep(0.001)
+    cache.put("b", {"id": "b"})
+    time.sleep(0.001)
+    cache.get("a")
+    time.sleep(0.001)
+    cache.put("c", {"id": "c"})
+
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+
+
+def test_lru_eviction_by_size(temp_dir):
+    """Test that the cache stays under its byte bound."""
+    cache = ResponseCache(str(Path(temp_dir) / "cache.sqlite"), max_bytes=250)
+    for i in range(10):
+        cache.put(str(i), {"content": "x" * 100})
+        time.sleep(0.001)
+
+    assert len(cache) == 2
+    assert cache.get("9") is not None
+
+
+def test_replay_miss_raises(temp_dir):
+    """Test that replay mode never falls through to the API."""
+    cache = ResponseCache(str(Path(temp_dir) / "cache.sqlite"), mode="replay")
+
+    with pytest.raises(LookupError):
+        cache.get("missing")
+
+
+def test_invalid_mode(temp_dir):
+    """Test that an unknown mode is rejected."""
+    with pytest.raises(ValueError):
+        ResponseCache(str(Path(temp_dir) / "cache.sqlite"), mode="sometimes")
+
+
+def test_replay_reproduces_recorded_run(schema, temp_dir):
+    """Test that a replayed run exports exactly what the recorded run did."""
+    with FakeOpenAIServer(schema_responder(schema)) as server:
+        recorded = make_factory(temp_dir, server.base_url, "record", "recorded")
+        recorded_path = recorded.generate_and_export(6, concurrency=3)
+        base_url = server.base_url
+
+    # The server is gone: any API call would fail
+    replayed = make_factory(temp_dir, base_url, "replay", "replayed")
+    replayed_path = replayed.generate_and_export(6, concurrency=3)
+
+    assert replayed.cache.hits == 6
+    assert replayed.generator.usage.total_tokens == 0
+    assert replayed_path.read_text() == recorded_path.read_text()
+
+
+def test_read_through_only_calls_api_on_miss(schema, temp_dir):
+    """Test that read-through mode calls the API only for new slots."""
+    with FakeOpenAIServer(schema_responder(schema)) as server:
+        make_factory(temp_dir, server.base_url, "read-through").generate_personas(3)
+        factory = make_factory(temp_dir, server.base_url, "read-through")
+        factory.generate_personas(5)
+        api_calls = server.requests.count(("POST", "/v1/chat/completions"))
+
+    assert api_calls == 5
+    assert (factory.cache.hits, factory.cache.misses) == (3, 2)
+
+
+def test_factory_closes_cache(temp_dir, monkeypatch):
+    """Test that the factory releases its cache connection."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    with make_factory(temp_dir, "http://127.0.0.1:9/v1", "read-through") as factory:
+        factory.cache.put("a", {"id": "1"})
+
+    with pytest.raises(sqlite3.ProgrammingError):
+        len(factory.cache)
+    assert ResponseCache(str(Path(temp_dir) / "cache.sqlite")).get("a") == {"id": "1"}
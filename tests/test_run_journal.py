@@ -0,0 +1,158 @@
+import json
+
+import openai
+import pytest
+
+from src.factories.persona_factory import PersonaFactory
+from src.factories.run_journal import RunJournal
+
+
+@pytest.fixture
+def runs_dir(tmp_path):
+    """Directory holding the run journals."""
+    return str(tmp_path / "runs")
+
+
+@pytest.fixture
+def factory(tmp_path, monkeypatch):
+    """Factory whose generator fails once, like a run dying mid-way."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    factory = PersonaFactory(
+        schema_path="tests/fixtures/schemas/test_schema.yaml",
+        output_dir=str(tmp_path / "export"),
+    )
+    state = {"calls": [], "fail_at": None}
+
+    def fake_generate(prompt=None, slot=None):
+        if slot == state["fail_at"]:
+            state["fail_at"] = None
+            raise openai.APIConnectionError(request=None)
+        state["calls"].append(slot)
+        return {"id": str(slot)}
+
+    factory.generator.generate = fake_generate
+    factory.stub_state = state
+    return factory
+
+
+def test_records_survive_a_reopen(runs_dir):
+    """Test that journaled slots and parameters are read back."""
+    journal = RunJournal.create(runs_dir, {"num_personas": 3}, run_id="run-1")
+    journal.record(0, 1, [{"id": "0"}])
+    journal.record(2, 1, [{"id": "2"}])
+    journal.close()
+
+    resumed = RunJournal.resume(runs_dir, "run-1")
+
+    assert resumed.params == {"num_personas": 3}
+    assert resumed.status == "running"
+    assert resumed.completed() == {0: [{"id": "0"}], 2: [{"id": "2"}]}
+
+
+def test_torn_record_is_dropped(runs_dir):
+    """Test that a record cut short by a crash is ignored and overwritten."""
+    journal = RunJournal.create(runs_dir, {}, run_id="run-1")
+    journal.record(0, 1, [{"id": "0"}])
+    journal.close()
+    with open(journal.journal_path, "a") as f:
+        f.write('{"start": 1, "count": 1, "pers')
+
+    resumed = RunJournal.resume(runs_dir, "run-1")
+    resumed.record(1, 1, [{"id": "1"}])
+    resumed.close()
+
+    assert sorted(RunJournal.resume(runs_dir, "run-1").completed()) == [0, 1]
+
+
+def test_unterminated_record_is_kept(runs_dir):
+    """Test that a complete record missing its newline is kept and ended."""
+    journal = RunJournal.create(runs_dir, {}, run_id="run-1")
+    journal.close()
+    with open(journal.journal_path, "w") as f:
+        f.write('{"start": 0, "count": 1, "personas": [{"id": "0"}]}')
+
+    resumed = RunJournal.resume(runs_dir, "run-1")
+    resumed.record(1, 1, [{"id": "1"}])
+    resumed.close()
+
+    assert sorted(RunJournal.resume(runs_dir, "run-1").completed()) == [0, 1]
+
+
+def test_unknown_and_duplicate_runs(runs_dir):
+    """Test that missing runs and reused ids are rejected."""
+    RunJournal.create(runs_dir, {}, run_id="run-1")
+
+    with pytest.raises(ValueError):
+        RunJournal.resume(runs_dir, "run-2")
+    with pytest.raises(ValueError):
+        RunJournal.create(runs_dir, {}, run_id="run-1")
+
+
+def test_layout_must_match(runs_dir):
+    """Test that a run can't be resumed with other slots."""
+    journal = RunJournal.create(runs_dir, {})
+    journal.check(10, 2)
+
+    with pytest.raises(ValueError):
+        RunJournal.resume(runs_dir, journal.run_id).check(10, 5)
+
+
+def test_resume_generates_only_missing_personas(factory, runs_dir):
+    """Test that a resumed run requests only the slots it was missing."""
+    factory.stub_state["fail_at"] = 3
+    journal = RunJournal.create(runs_dir, {}, run_id="run-1")
+    with pytest.raises(openai.APIConnectionError):
+        factory.generate_and_export(5, journal=journal)
+    journal.close()
+    assert factory.stub_state["calls"] == [0, 1, 2]
+
+    resumed = RunJournal.resume(runs_dir, "run-1")
+    output_path = factory.generate_and_export(5, journal=resumed)
+
+    assert factory.stub_state["calls"] == [0, 1, 2, 3, 4]
+    with open(output_path) as f:
+        personas = json.load(f)["personas"]
+    assert [p["id"] for p in personas] == ["0", "1", "2", "3", "4"]
+    assert RunJournal.resume(runs_dir, "run-1").status == "completed"
+    # The exported personas are no longer duplicated in the journal
+    assert not resumed.journal_path.exists()
+
+
+def test_resume_concurrently(factory, runs_dir):
+    """Test that journaled slots are skipped by concurrent runs too."""
+    journal = RunJournal.create(runs_dir, {}, run_id="run-1")
+    journal.record(0, 2, [{"id": "a"}, {"id": "b"}])
+
+    async def fake_agenerate_batch(count, prompt=None, slot=None):
+        factory.stub_state["calls"].append(slot)
+        return [{"id": f"{slot}-{i}"} for i in range(count)]
+
+    factory.generator.agenerate_batch = fake_agenerate_batch
+    personas = factory.generate_personas(
+        6, concurrency=2, batch_size=2, journal=journal
+    )
+
+    assert sorted(factory.stub_state["calls"]) == [2, 4]
+    assert [p["id"] for p in personas] == ["a", "b", "2-0", "2-1", "4-0", "4-1"]
+    assert sorted(journal.completed()) == [0, 2, 4]
+
+
+def test_resume_removes_the_crashed_stream(factory, runs_dir):
+    """Test that a resumed JSONL run drops the `.part.N` it has replayed."""
+    factory.output_format = "jsonl"
+    factory.stub_state["fail_at"] = 2
+    journal = RunJournal.create(runs_dir, {}, run_id="run-1")
+    with pytest.raises(openai.APIConnectionError):
+        factory.generate_and_export(4, journal=journal)
+    journal.close()
+
+    resumed = RunJournal.resume(runs_dir, "run-1")
+    output_path = factory.generate_and_export(4, journal=resumed)
+
+    assert [p["id"] for p in factory.exporter.iter_jsonl(output_path)] == [
+        "0",
+        "1",
+        "2",
+        "3",
+    ]
+    assert sorted(p.name for p in output_path.parent.iterdir()) == [output_path.name]
@@ -0,0 +1,146 @@
+import gzip
+import hashlib
+import json
+
+import pytest
+
+from src.exporters.persona_exporter import PersonaExporter
+from src.exporters.sharded_writer import (
+    ShardedStreamWriter,
+    iter_shards,
+    load_manifest,
+    map_shards,
+)
+from src.models.schema import Schema
+
+
+def make_persona(index):
+    """Build a persona."""
+    return {"id": str(index), "bio": f"Persona number {index}"}
+
+
+def count_personas(personas):
+    """Count the personas of a shard (runs in a worker process)."""
+    return sum(1 for _ in personas)
+
+
+@pytest.fixture
+def schema():
+    """Schema recorded in the manifest."""
+    return Schema(
+        name="Shards",
+        description="Sharded personas",
+        version="2.1.0",
+        fields={"id": {"description": "Id"}, "bio": {"description": "Bio"}},
+    )
+
+
+def test_shards_by_record_count(tmp_path, schema):
+    """Test splitting a stream into gzip shards with a manifest."""
+    with ShardedStreamWriter(tmp_path, max_records=4, schema=schema) as stream:
+        for i in range(10):
+            stream.write(make_persona(i))
+
+    manifest = json.loads(stream.path.read_text())
+
+    assert stream.path.name == "personas.manifest.json"
+    assert manifest["schema"] == {"name": "Shards", "version": "2.1.0"}
+    assert manifest["complete"] and manifest["records"] == 10
+    assert [shard["records"] for shard in manifest["shards"]] == [4, 4, 2]
+    first = tmp_path / manifest["shards"][0]["path"]
+    assert first.name == "personas-00000.jsonl.gz"
+    assert manifest["shards"][0]["bytes"] == first.stat().st_size
+    assert (
+        manifest["shards"][0]["sha256"]
+        == hashlib.sha256(first.read_bytes()).hexdigest()
+    )
+    with gzip.open(first, "rt") as f:
+        assert json.loads(f.readline()) == make_persona(0)
+
+
+def test_shards_by_size(tmp_path):
+    """Test that shards stay under the target uncompressed size."""
+    line_size = len(json.dumps(make_persona(0))) + 1
+    with ShardedStreamWriter(
+        tmp_path, compression="none", max_bytes=3 * line_size
+    ) as stream:
+        for i in range(7):
+            stream.write(make_persona(i))
+
+    assert [shard["records"] for shard in stream.shards] == [3, 3, 1]
+    assert list(iter_shards(stream.path)) == [make_persona(i) for i in range(7)]
+
+
+def test_corrupt_shard_is_detected(tmp_path):
+    """Test that a shard not matching its checksum fails to read."""
+    with ShardedStreamWriter(tmp_path, compression="none") as stream:
+        stream.write(make_persona(0))
+    shard = tmp_path / stream.shards[0]["path"]
+    shard.write_text(json.dumps(make_persona(1)) + "\n")
+
+    with pytest.raises(ValueError, match="Checksum mismatch"):
+        list(iter_shards(stream.path))
+
+
+def test_map_shards_in_parallel(tmp_path):
+    """Test processing every shard in a worker process."""
+    with ShardedStreamWriter(tmp_path, max_records=3) as stream:
+        for i in range(8):
+            stream.write(make_persona(i))
+
+    assert map_shards(stream.path, count_personas, processes=2) == [3, 3, 2]
+
+
+def test_aborted_stream_writes_incomplete_manifest(tmp_path):
+    """Test that a failing run still lists the shards it wrote."""
+    with pytest.raises(RuntimeError):
+        with ShardedStreamWriter(tmp_path, max_records=2) as stream:
+            for i in range(3):
+                stream.write(make_persona(i))
+            raise RuntimeError("crash")
+
+    manifest = load_manifest(stream.path)
+
+    assert not manifest["complete"]
+    assert manifest["records"] == 3
+    assert len(list(iter_shards(stream.path, allow_incomplete=True))) == 3
+    with pytest.raises(ValueError, match="incomplete"):
+        list(iter_shards(stream.path))
+
+
+def test_rerun_replaces_previous_shards(tmp_path):
+    """Test that a shorter rerun commits its own shards and drops stale ones."""
+    with ShardedStreamWriter(tmp_path, max_records=2) as stream:
+        for i in range(5):
+            stream.write(make_persona(i))
+    with ShardedStreamWriter(tmp_path, max_records=2) as rerun:
+        rerun.write(make_persona(10))
+        # Until the manifest is written, the previous export stays readable
+        assert len(list(iter_shards(stream.path))) == 5
+
+    assert [p["id"] for p in iter_shards(rerun.path)] == ["10"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "personas-00000.jsonl.gz",
+        "personas.manifest.json",
+    ]
+
+
+def test_exporter_reads_and_compacts_shards(tmp_path, schema):
+    """Test that a manifest is accepted wherever an export is read."""
+    exporter = PersonaExporter(str(tmp_path))
+    with exporter.open_shards("run", max_records=2, schema=schema) as stream:
+        for i in range(5):
+            stream.write(make_persona(i))
+
+    compacted = exporter.compact(stream.path, "json", "run")
+
+    assert list(exporter.iter_export(stream.path)) == [
+        make_persona(i) for i in range(5)
+    ]
+    assert json.loads(compacted.read_text())["personas"][4] == make_persona(4)
+
+
+def test_unknown_compression(tmp_path):
+    """Test that unsupported compressions are rejected."""
+    with pytest.raises(ValueError):
+        ShardedStreamWriter(tmp_path, compression="lz4")
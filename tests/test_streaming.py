@@ -0,0 +1,160 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.generators.openai import OpenAIGenerator
+from src.generators.response_cache import ResponseCache
+from src.generators.streaming import IncrementalObjectParser, PersonaStream
+from src.models.schema import Schema
+from src.monitoring.metrics import METRICS
+from src.schemas.persona_validator import PersonaValidator
+from src.testing.fake_openai import FakeOpenAIServer, fake_persona, schema_responder
+
+
+@pytest.fixture
+def generator(monkeypatch):
+    """Streaming generator for the test schema, without repair requests."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    generator = OpenAIGenerator(
+        schema_path="tests/fixtures/schemas/test_schema.yaml",
+        config_path="tests/fixtures/config/test_generator_config.yaml",
+        stream=True,
+    )
+    # Loaded configs are shared through the registry: replace, don't mutate
+    config = generator.config
+    generator.config = config.model_copy(
+        update={
+            "validation": config.validation.model_copy(
+                update={"max_repair_attempts": 0}
+            )
+        }
+    )
+    return generator
+
+
+def feed_in_pieces(text, size):
+    """Feed text to a new parser in pieces of `size` characters."""
+    parser = IncrementalObjectParser()
+    closed = []
+    for start in range(0, len(text), size):
+        closed.extend(parser.feed(text[start : start + size]))
+    return parser, closed
+
+
+def test_parser_closes_fields_in_order():
+    """Test that every member is returned once, whatever the chunking."""
+    persona = {
+        "name": 'Ana "the, {best}"',
+        "age": 30,
+        "work": {"role": "Engineer", "skills": ["a", "b]"]},
+        "active": True,
+        "notes": None,
+    }
+    text = json.dumps(persona, indent=2)
+
+    for size in (1, 3, 7, len(text)):
+        parser, closed = feed_in_pieces(text, size)
+        assert closed == list(persona.items())
+        assert parser.done and parser.fields == persona
+
+
+def test_parser_returns_fields_as_soon_as_they_close():
+    """Test that a field is available before the rest of the object."""
+    parser = IncrementalObjectParser()
+
+    assert parser.feed('{"age": 3') == []
+    assert parser.feed('0, "name": "A') == [("age", 30)]
+    assert not parser.done
+
+
+@pytest.mark.parametrize("text", ["[1, 2]", "Sure! {}", '{"a": tru, "b": 1}'])
+def test_parser_rejects_non_objects(text):
+    """Test that text which can't be a JSON object is rejected early."""
+    with pytest.raises(ValueError):
+        IncrementalObjectParser().feed(text)
+
+
+def test_null_optional_field_keeps_the_stream():
+    """Test that a null optional field is dropped, not treated as invalid."""
+    schema = Schema(
+        name="Optional",
+        description="Optional field",
+        version="1.0.0",
+        fields={
+            "name": {"description": "Name"},
+            "nickname": {"description": "Nickname", "required": False},
+        },
+    )
+    stream = PersonaStream(PersonaValidator(schema), time.monotonic())
+    chunk = SimpleNamespace(
+        usage=None,
+        choices=[
+            SimpleNamespace(
+                finish_reason=None,
+                delta=SimpleNamespace(content='{"nickname": null, "name": 1}'),
+            )
+        ],
+    )
+
+    assert not stream.add(chunk)
+    assert stream.aborted == "field name is invalid"
+
+
+def test_streamed_persona_matches_unstreamed(generator):
+    """Test that streaming yields the same persona and reports its usage."""
+    METRICS.reset()
+    with FakeOpenAIServer(schema_responder(generator.schema)) as server:
+        generator.client = generator.client.with_options(base_url=server.base_url)
+        streamed = generator.generate()
+        generator.stream = False
+        unstreamed = generator.generate()
+
+    assert streamed == fake_persona(generator.schema, 0)
+    assert unstreamed == fake_persona(generator.schema, 1)
+    assert server.streams == {"completed": 1, "cancelled": 0}
+    assert generator.usage.completion_tokens > 0
+    assert METRICS.histogram("time_to_first_field_seconds").count == 1
+
+
+def test_invalid_field_cancels_the_stream(generator, tmp_path):
+    """Test that the response is cut off at the first invalid field."""
+    METRICS.reset()
+    generator.cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    respond = schema_responder(generator.schema)
+
+    def invalid_name(body):
+        persona = json.loads(respond(body))
+        persona["name"] = 42
+        return json.dumps(persona)
+
+    with FakeOpenAIServer(invalid_name, chunk_delay=0.01) as server:
+        generator.client = generator.client.with_options(base_url=server.base_url)
+        with pytest.raises(ValueError, match="failed validation"):
+            generator.generate()
+
+        async def agenerate():
+            try:
+                return await generator.agenerate()
+            finally:
+                await generator.aclose()
+
+        with pytest.raises(ValueError, match="failed validation"):
+            asyncio.run(agenerate())
+
+    # The server notices a cancellation at its next write
+    deadline = time.monotonic() + 5
+    while sum(server.streams.values()) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert server.streams == {"completed": 0, "cancelled": 2}
+    assert METRICS.total("stream_aborts_total") == 2
+    # The id closed, and was valid, before the name
+    assert METRICS.histogram("time_to_first_field_seconds").count == 2
+    # The tokens of the cancelled streams are estimated, and nothing is cached
+    assert METRICS.total("estimated_usage_total") == 2
+    assert generator.usage.requests == 2
+    assert generator.usage.prompt_tokens > 0
+    assert generator.usage.completion_tokens > 0
+    assert len(generator.cache) == 0
@@ -0,0 +1,136 @@
+import json
+import threading
+import time
+
+import pytest
+
+from src.factories.persona_factory import PersonaFactory
+from src.factories.work_queue import WorkQueue
+from src.schemas.loader import SchemaLoader
+from src.testing.fake_openai import FakeOpenAIServer, schema_responder
+
+
+@pytest.fixture
+def responder():
+    """Fake API responder answering with personas of the test schema."""
+    return schema_responder(
+        SchemaLoader("tests/fixtures/schemas").load_schema("test_schema")
+    )
+
+
+@pytest.fixture
+def queue_path(tmp_path):
+    """Path to the shared queue database."""
+    return str(tmp_path / "queue.db")
+
+
+def make_factory(tmp_path, base_url):
+    """Build a worker's factory talking to the fake server."""
+    factory = PersonaFactory(
+        schema_path="tests/fixtures/schemas/test_schema.yaml",
+        config_path="tests/fixtures/config/test_generator_config.yaml",
+        output_dir=str(tmp_path / "export"),
+    )
+    factory.generator.client = factory.generator.client.with_options(base_url=base_url)
+    return factory
+
+
+def test_submit_is_shared(queue_path):
+    """Test that later workers join the job the first one submitted."""
+    with WorkQueue(queue_path) as first, WorkQueue(queue_path) as second:
+        assert first.submit(5, 2, {"format": "json"}) == {"format": "json"}
+        assert second.submit(5, 2, {"format": "yaml"}) == {"format": "json"}
+        assert second.layout == {"num_personas": 5, "batch_size": 2}
+        assert second.counts()["pending"] == 3
+
+        with pytest.raises(ValueError):
+            second.submit(6, 2)
+
+
+def test_expired_lease_is_taken_over(queue_path):
+    """Test that a stale worker can't complete a slot another one took over."""
+    with WorkQueue(queue_path, lease_seconds=0.05) as queue:
+        queue.submit(1)
+        assert queue.claim("a") == (0, 1)
+        assert queue.claim("b") is None
+
+        time.sleep(0.1)
+        assert queue.claim("b") == (0, 1)
+
+        assert queue.heartbeat("a", [0]) == [0]
+        assert queue.heartbeat("b", [0]) == []
+        assert not queue.complete("a", 0, [{"id": "a"}])
+        assert queue.complete("b", 0, [{"id": "b"}])
+        assert list(queue.iter_personas()) == [{"id": "b"}]
+        assert queue.finished
+
+
+def test_released_slots_fail_after_max_attempts(queue_path):
+    """Test that failed claims are retried, then given up on."""
+    with WorkQueue(queue_path, max_attempts=2) as queue:
+        queue.submit(2)
+        for _ in range(2):
+            start, _ = queue.claim("a")
+            assert start == 0
+            queue.release("a", start)
+
+        assert queue.claim("a") == (1, 1)
+        assert queue.counts() == {"pending": 0, "leased": 1, "done": 0, "failed": 1}
+
+
+def test_workers_split_a_job(tmp_path, queue_path, responder, monkeypatch):
+    """Test that several workers generate a job once, and one exports it."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    with FakeOpenAIServer(responder) as server:
+        factories = [make_factory(tmp_path, server.base_url) for _ in range(3)]
+        WorkQueue(queue_path).submit(10, 2)
+        results = [None] * 3
+
+        def work(index):
+            with WorkQueue(queue_path) as queue:
+                results[index] = factories[index].run_worker(
+                    queue, concurrency=2, worker=f"worker-{index}"
+                )
+
+        threads = [threading.Thread(target=work, args=(i,)) for i in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    chat_requests = [r for r in server.requests if r[1].endswith("completions")]
+    assert len(chat_requests) == 5
+    exported = [path for path in results if path is not None]
+    assert len(exported) == 1
+    with open(exported[0]) as f:
+        assert len(json.load(f)["personas"]) == 10
+
+
+def test_worker_takes_over_dead_claims(tmp_path, queue_path, responder, monkeypatch):
+    """Test that the slot of a worker that stopped heartbeating is redone."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    with WorkQueue(queue_path, lease_seconds=0.2) as queue:
+        queue.submit(3)
+        queue.claim("dead-worker")
+        with FakeOpenAIServer(responder) as server:
+            factory = make_factory(tmp_path, server.base_url)
+            factory.output_format = "jsonl"
+            output_path = factory.run_worker(queue)
+
+        assert queue.counts()["done"] == 3
+        assert len(list(factory.exporter.iter_export(output_path))) == 3
+
+
+def test_export_of_a_dead_worker_is_taken_over(queue_path):
+    """Test that the export lease expires like slot leases do."""
+    with WorkQueue(queue_path, lease_seconds=0.05) as queue:
+        queue.submit(1)
+        assert queue.claim_export("dead-worker")
+        assert not queue.claim_export("b")
+
+        time.sleep(0.1)
+        assert queue.claim_export("b")
+        assert not queue.heartbeat_export("dead-worker")
+        assert queue.finish_export("b", "personas.json")
+        assert queue.exported == "personas.json"
+        assert not queue.claim_export("dead-worker")